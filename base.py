@@ -3,11 +3,188 @@
 # Abstract class with common functionality
 # Has reference to parent Zabbix API client, ZabbixClient
 # Contains _call() method that delegates to the client's _request() method
+# Also holds the small helpers shared by the bulk tools in tools/
+
+import re
+
+
+class ZabbixAPIError(Exception):
+    """
+    Raised when a Zabbix API response carries an "error" object.
+
+    Attributes:
+        method (str): API method that failed (e.g. "history.push").
+        code (int): Zabbix error code.
+        message (str): Short error message.
+        data (str): Detailed error description.
+    """
+
+    def __init__(self, method, error):
+        self.method = method
+        self.code = error.get("code")
+        self.message = error.get("message", "")
+        self.data = error.get("data", "")
+        super().__init__(f"{method}: {self.message} {self.data}".strip())
+
+
+# Errors about the request itself (login, session, API method), which no
+# subset of the objects in it would avoid
+_REQUEST_ERRORS = re.compile(
+    r"session terminated|re-login|not authori[sz]ed|api token expired|no permissions to call",
+    re.IGNORECASE,
+)
+_INVALID_PARAMETER = re.compile(r'Invalid parameter "([^"]*)"')
+
+
+def request_error(error):
+    """
+    Tell whether an API error concerns a whole request rather than objects in it.
+
+    Session and authorization failures, malformed requests and invalid
+    parameters outside the object arrays ("/action", but not "/eventids/3"
+    or "/1/name") fail any part of the request just the same. Everything
+    else, including "No permissions to referred object or it does not
+    exist!", may be caused by particular objects.
+
+    Args:
+        error (Exception): Error raised for the request.
+
+    Returns:
+        bool: True when splitting the request would only repeat the error.
+    """
+    if not isinstance(error, ZabbixAPIError):
+        return False
+    if error.code in (-32700, -32600, -32601):  # parse error, invalid request, method not found
+        return True
+    if _REQUEST_ERRORS.search(f"{error.message} {error.data}"):
+        return True
+    match = _INVALID_PARAMETER.search(str(error.data or ""))
+    return bool(match) and not re.search(r"/\d+(/|$)", match.group(1))
+
+
+def unwrap(method, response):
+    """
+    Return the "result" of an API response, raising ZabbixAPIError on "error".
+
+    Args:
+        method (str): API method the response belongs to (used in the error).
+        response (dict): Raw JSON-RPC response as returned by _call().
+
+    Returns:
+        The "result" member of the response.
+    """
+    if "error" in response:
+        raise ZabbixAPIError(method, response["error"])
+    return response.get("result")
+
+
+def chunked(iterable, size):
+    """
+    Yield lists of at most `size` elements from `iterable`.
+
+    Example:
+        >>> list(chunked([1, 2, 3, 4, 5], 2))
+        [[1, 2], [3, 4], [5]]
+    """
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 class ZabbixBase:
     def __init__(self, client):
         self._client = client
 
-    def _call(self, method, skip_auth=False, **params):
+    def _call(self, method, skip_auth=False, raw=False, **params):
+        # Names given where IDs are expected (hostids=["web01"]) are resolved through the client's index
+        resolver = getattr(self._client, "resolver", None)
+        names = []
+        if resolver is not None:
+            params, names = resolver.translate(method, params)
         # Delegate to the client's _request() method
-        return self._client._request(method, params, skip_auth=skip_auth)
\ No newline at end of file
+        # raw=True returns the response text undecoded (used by the typed result mode)
+        if raw:
+            response = self._client._request(method, params, skip_auth=skip_auth, raw=True)
+        else:
+            response = self._client._request(method, params, skip_auth=skip_auth)
+        if names and isinstance(response, dict) and "error" in response:
+            # A cached ID may be stale (object renamed or deleted); look it up again next time
+            resolver.forget(names)
+        return response
+
+    def bulk_create(self, objects, **options):
+        """
+        Create many objects in tuned, parallel chunks.
+
+        Args:
+            objects (list): Objects as taken by create().
+            **options: BulkExecutor options (chunk_size, workers, target_latency, rate, ...).
+
+        Returns:
+            BulkResult: New IDs in input order (None where failed) and per-element failures.
+
+        Example:
+            >>> result = zapi.items.bulk_create(items, chunk_size=500, workers=8)
+            >>> result.ids[0], len(result.failures)
+            ('23664', 0)
+        """
+        return self._bulk(**options).create(objects)
+
+    def bulk_update(self, objects, **options):
+        """
+        Update many objects (each including its ID property) in tuned, parallel chunks.
+
+        Returns:
+            BulkResult: See bulk_create().
+        """
+        return self._bulk(**options).update(objects)
+
+    def bulk_delete(self, ids, **options):
+        """
+        Delete many objects given by ID in tuned, parallel chunks.
+
+        Returns:
+            BulkResult: See bulk_create().
+        """
+        return self._bulk(**options).delete(ids)
+
+    def _bulk(self, **options):
+        try:
+            from .tools.bulk import BulkExecutor
+        except ImportError:
+            from tools.bulk import BulkExecutor
+        return BulkExecutor(self, **options)
+
+    def _call_many(self, method, objects):
+        # Array form of the params: several objects in one create/update call,
+        # or the list of IDs taken by delete
+        resolver = getattr(self._client, "resolver", None)
+        names = []
+        if resolver is not None:
+            translated = []
+            for obj in objects:
+                if isinstance(obj, dict):
+                    obj, used = resolver.translate(method, obj)
+                    names += used
+                translated.append(obj)
+            objects = translated
+        response = self._client._request(method, list(objects))
+        if names and "error" in response:
+            resolver.forget(names)
+        return response
+
+    def _records(self, method, value_type=None, **params):
+        # Typed result mode of get(records=True): the response text is decoded
+        # element by element into a compact RecordSet, see tools/records.py
+        try:
+            from .tools.records import VALUE_TYPE_UNSIGNED, to_records
+        except ImportError:
+            from tools.records import VALUE_TYPE_UNSIGNED, to_records
+        response = self._call(method, raw=True, **params)
+        value_type = VALUE_TYPE_UNSIGNED if value_type is None else value_type
+        return to_records(method, response, schema=self.API_METHOD, value_type=value_type)
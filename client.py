@@ -67,6 +67,7 @@ try:
     from .resources.user_macro import UserMacroResource
     from .resources.value_map import ValueMapResource
     from .resources.web_scenario import WebScenarioResource
+    from .tools.resolver import NameResolver
 except ImportError:
     # if the file is not imported as a module, use the absolute paths
     from config import ZabbixConfig
@@ -129,6 +130,7 @@ except ImportError:
     from resources.user_macro import UserMacroResource
     from resources.value_map import ValueMapResource
     from resources.web_scenario import WebScenarioResource
+    from tools.resolver import NameResolver
 
 
 class ZabbixClient:
@@ -194,16 +196,22 @@ class ZabbixClient:
         self.user_macro = UserMacroResource(self)
         self.value_map = ValueMapResource(self)
         self.web_scenario = WebScenarioResource(self)
+        # Name -> ID index used when resource methods are given names instead of IDs
+        self.resolver = NameResolver(self, ttl=getattr(self.config, "resolver_ttl", 300))
 
         
         self._session = requests.Session()
         self._session.headers.update({
             "Authorization": f"Bearer {api_token or self.config.api_token}",
             "Content-Type": "application/json",
-        })   
+        })
+        # Bulk tools run several requests at once; size the connection pool to match
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=getattr(self.config, "pool_maxsize", 10))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         
 
-    def _request(self, method, params=None, skip_auth=False):
+    def _request(self, method, params=None, skip_auth=False, raw=False):
         payload = {
             "jsonrpc": "2.0",
             "method": method,
@@ -230,4 +238,5 @@ class ZabbixClient:
                 verify=self.config.verify_ssl,
             )
         
-        return response.json()
\ No newline at end of file
+        # raw=True hands back the undecoded text, for callers that stream-decode large results
+        return response.text if raw else response.json()
\ No newline at end of file
@@ -3,8 +3,10 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.harvester import Harvester
 except ImportError:
     from base import ZabbixBase
+    from tools.harvester import Harvester
 
 class AlertResource(ZabbixBase):
     def __init__(self, client):
@@ -52,4 +54,26 @@ class AlertResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/alert/get
         """
-        return self._call(f"{self.API_METHOD}.get", alertid=alertid, **filters)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.get", alertid=alertid, **filters)
+
+    def harvester(self, **options):
+        """
+        Create a harvester that fetches only the records created since its last run.
+        
+        Keyword Args (options):
+            checkpoint (Checkpoint|str, optional): Checkpoint (or path) holding the high-water mark.
+            cursor_key (str, optional): Name of the mark inside the checkpoint (default: "alert").
+            start (int, optional): Clock to start from when no mark is saved (default: now).
+            page_size (int, optional): Records per get() request (default: 1000).
+            overlap (int, optional): Seconds re-read before the mark to catch late records (default: 0).
+            Any other get() parameter is used as a filter.
+        
+        Returns:
+            Harvester: Use run_once(sink) or run(sink, interval) with an NdjsonSink, StdoutSink or callable.
+        
+        Example:
+            >>> from tools.harvester import NdjsonSink
+            >>> harvester = zapi.alerts.harvester(checkpoint="siem.json", overlap=60)
+            >>> harvester.run_once(NdjsonSink("alerts.ndjson"))
+        """
+        return Harvester(self, "alertid", **options)
\ No newline at end of file
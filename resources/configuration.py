@@ -3,8 +3,12 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.config_export import ConfigExporter
+    from ..tools.config_import import ConfigImporter
 except ImportError:
     from base import ZabbixBase
+    from tools.config_export import ConfigExporter
+    from tools.config_import import ConfigImporter
 
 class ConfigurationResource(ZabbixBase):
     def __init__(self, client):
@@ -34,6 +38,30 @@ class ConfigurationResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.export", **filters)
 
+    def exporter(self, output_dir, **options):
+        """
+        Create an exporter that writes the configuration as one file per template, host or group.
+        
+        Args:
+            output_dir (str): Directory receiving the shard files and the export state.
+        
+        Keyword Args (options):
+            shard_by (str, optional): "template", "host", "template_group" or "host_group" (default: "template").
+            format (str, optional): Export format (yaml, xml, json) (default: "yaml").
+            workers (int, optional): Concurrent configuration.export requests (default: 4).
+            overlap (int, optional): Seconds of audit log re-read on every run (default: 60).
+            Any other template.get/host.get parameter limits the exported objects.
+        
+        Returns:
+            ConfigExporter: Use run() to export the shards changed since the previous run.
+        
+        Example:
+            >>> exporter = zapi.configuration.exporter("backup/templates", workers=8)
+            >>> exporter.run()
+            {'exported': 12, 'written': 3, 'skipped': 1488, 'removed': 0}
+        """
+        return ConfigExporter(self._client, output_dir, **options)
+
     def import_configuration(self, **params):
         """
         Import Zabbix configuration.
@@ -79,4 +107,23 @@ class ConfigurationResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/configuration/importcompare
         """
-        return self._call(f"{self.API_METHOD}.importcompare", **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.importcompare", **params)
+
+    def importer(self, **options):
+        """
+        Create an importer that only imports configuration files with real changes.
+        
+        Keyword Args (options):
+            state (Checkpoint|str, optional): Checkpoint (or path) holding the hash of every imported file.
+            rules (dict, optional): Import rules (default: tools.config_import.DEFAULT_RULES).
+            workers (int, optional): Files compared/imported concurrently (default: 4).
+        
+        Returns:
+            ConfigImporter: Use run(paths, dry_run=False) to import files and directories.
+        
+        Example:
+            >>> importer = zapi.configuration.importer(state="templates.import-state.json")
+            >>> importer.run(["templates/"])
+            ImportResult(skipped=1480, unchanged=7, imported=3, failures=0, requests=17)
+        """
+        return ConfigImporter(self._client, **options)
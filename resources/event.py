@@ -3,8 +3,12 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.bulk_acknowledge import EventAcknowledger
+    from ..tools.event_follower import EventFollower
 except ImportError:
     from base import ZabbixBase
+    from tools.bulk_acknowledge import EventAcknowledger
+    from tools.event_follower import EventFollower
 
 class EventResource(ZabbixBase):
     def __init__(self, client):
@@ -12,10 +16,14 @@ class EventResource(ZabbixBase):
 
     API_METHOD = "event"
 
-    def get(self, **filters):
+    def get(self, records=False, **filters):
         """
         Retrieve events according to the given parameters.
         
+        Args:
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
+            
         Keyword Args (filters):
             eventids (list, optional): Return only events with the given IDs.
             groupids (list, optional): Return only events created by objects that belong to the given host groups.
@@ -60,6 +68,8 @@ class EventResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/event/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", **filters)
         return self._call(f"{self.API_METHOD}.get", **filters)
     
     def acknowledge(self, **params):
@@ -85,4 +95,61 @@ class EventResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/event/acknowledge
         """
-        return self._call(f"{self.API_METHOD}.acknowledge", **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.acknowledge", **params)
+
+    def acknowledge_bulk(self, eventids=None, chunk_size=200, workers=4, rate=None, **params):
+        """
+        Acknowledge or close many events in parallel, rate-limited chunks.
+        
+        Args:
+            eventids (list, optional): IDs of events to update. When omitted, the open problems
+                matching the problem.get filters in params are used.
+            chunk_size (int, optional): Events per event.acknowledge request (default: 200).
+            workers (int, optional): Concurrent requests (default: 4).
+            rate (float, optional): Maximum requests per second (default: unlimited).
+        
+        Keyword Args (params):
+            action (int, optional): Acknowledge operation action, as for acknowledge() (default: 2).
+            message (str, optional): Acknowledge message.
+            severity (int, optional): New severity level (0-5).
+            older_than (float, optional): Only select problems that started at least this many minutes ago.
+            Any other problem.get parameter (groupids, hostids, severities, ...) selects the events.
+        
+        Returns:
+            dict: "succeeded" (list of event IDs) and "failed" (event ID -> error message).
+        
+        Example:
+            >>> # Close all problems of host group 42 older than 30 minutes
+            >>> summary = zapi.events.acknowledge_bulk(
+            ...     action=1,
+            ...     message="Closed after outage",
+            ...     groupids=["42"],
+            ...     older_than=30,
+            ...     rate=10
+            ... )
+        """
+        acknowledger = EventAcknowledger(self._client, chunk_size=chunk_size, workers=workers, rate=rate)
+        return acknowledger.acknowledge(eventids, **params)
+
+    def follow(self, **options):
+        """
+        Follow new events using eventid as a monotonic cursor.
+        
+        Keyword Args (options):
+            checkpoint (Checkpoint|str, optional): Checkpoint (or path) that persists the cursor across restarts.
+            cursor_key (str, optional): Name of the cursor inside the checkpoint (default: "events.follow").
+            start (str|int, optional): "now", "beginning" or an eventid, used when no cursor is saved (default: "now").
+            page_size (int, optional): Events per event.get request (default: 1000).
+            min_interval (float, optional): Shortest pause between polls in seconds (default: 1.0).
+            max_interval (float, optional): Longest pause between polls in seconds (default: 30.0).
+            Any other event.get parameter (source, value, severities, hostids, ...) is used as a filter.
+            Tags and hosts are selected by default (selectTags, selectHosts).
+        
+        Returns:
+            EventFollower: Iterable yielding new events, oldest first, without duplicates.
+        
+        Example:
+            >>> for event in zapi.events.follow(checkpoint="events.json", value=1):
+            ...     print(event["eventid"], event["name"], event["tags"])
+        """
+        return EventFollower(self, **options)
\ No newline at end of file
@@ -3,8 +3,14 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.backtest import Backtester
+    from ..tools.history_cleaner import HistoryCleaner
+    from ..tools.history_writer import HistoryWriter
 except ImportError:
     from base import ZabbixBase
+    from tools.backtest import Backtester
+    from tools.history_cleaner import HistoryCleaner
+    from tools.history_writer import HistoryWriter
 
 class HistoryResource(ZabbixBase):
     def __init__(self, client):
@@ -12,6 +18,27 @@ class HistoryResource(ZabbixBase):
 
     API_METHOD = "history"
 
+    def backtester(self, **options):
+        """
+        Create an engine that evaluates trigger expressions over past history or trends.
+        
+        Keyword Args (options):
+            source (str, optional): "history" or "trend" (default: "history").
+            chunk_size (int, optional): Items per history.get request (default: 50).
+            page_size (int, optional): Records per history.get request (default: 100000).
+            workers (int, optional): Concurrent history.get requests (default: 4).
+        
+        Returns:
+            Backtester: Engine whose run(expression, time_from, time_till, ...) reports problem intervals.
+        
+        Example:
+            >>> backtester = zapi.history.backtester()
+            >>> result = backtester.run("avg(/web01/system.cpu.util,5m)>85", time_from, time_till)
+            >>> result.problems, result.intervals[:2]
+            (14, [(1717225260, 1717225860), (1717402200, 1717403100)])
+        """
+        return Backtester(self._client, **options)
+
     def clear(self, **params):
         """
         Clear item history.
@@ -37,10 +64,36 @@ class HistoryResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.clear", **params)
 
-    def get(self, **params):
+    def cleaner(self, **options):
+        """
+        Create a cleanup engine that splits history.clear into small, throttled, resumable batches.
+        
+        Keyword Args (options):
+            batch_size (int, optional): Items per history.clear request (default: 100).
+            max_workers (int, optional): Upper bound of concurrent requests (default: 4).
+            target_latency (float, optional): Latency in seconds above which concurrency is halved (default: 5.0).
+            cooldown (float, optional): Pause in seconds after a slow request (default: 2.0).
+            max_retries (int, optional): Retries per batch (default: 3).
+            checkpoint (Checkpoint|str, optional): Checkpoint (or path) recording finished batches.
+            on_progress (callable, optional): Called with the stats dict after every batch.
+        
+        Returns:
+            HistoryCleaner: Engine whose clear(itemids) runs the cleanup.
+        
+        Example:
+            >>> cleaner = zapi.history.cleaner(batch_size=50, checkpoint="clear.json")
+            >>> cleaner.clear(itemids)
+        """
+        return HistoryCleaner(self, **options)
+
+    def get(self, records=False, **params):
         """
         Retrieve item history data.
         
+        Args:
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
+            
         Keyword Args (params):
             itemids (list, required): IDs of items to retrieve history for.
             history (int, required): History type to retrieve (0: float, 1: string, 2: log, 3: unsigned integer, 4: text).
@@ -65,6 +118,8 @@ class HistoryResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/history/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", value_type=params.get("history"), **params)
         return self._call(f"{self.API_METHOD}.get", **params)
 
     def push(self, **params):
@@ -91,4 +146,28 @@ class HistoryResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/history/push
         """
-        return self._call(f"{self.API_METHOD}.push", **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.push", **params)
+
+    def writer(self, **options):
+        """
+        Create a buffered writer that batches values into concurrent history.push requests.
+        
+        Keyword Args (options):
+            batch_size (int, optional): Records per history.push request (default: 1000).
+            flush_interval (float, optional): Seconds before a partial batch is sent (default: 1.0).
+            max_in_flight (int, optional): Concurrent history.push requests (default: 4).
+            max_buffer (int, optional): Records buffered or in flight before writes block (default: 100000).
+            max_retries (int, optional): Retries for a batch that failed as a whole (default: 3).
+            retry_backoff (float, optional): Base delay in seconds between retries (default: 0.5).
+            on_error (callable, optional): Called with a PushFailure for every rejected record.
+        
+        Returns:
+            HistoryWriter: Writer to feed with write()/write_many(); close it (or use it as a
+            context manager) to flush the remaining records.
+        
+        Example:
+            >>> with zapi.history.writer(batch_size=5000, max_in_flight=8) as writer:
+            ...     writer.write("12345", 42.5)
+            ...     writer.write("12346", "up", clock=timestamp)
+        """
+        return HistoryWriter(self, **options)
\ No newline at end of file
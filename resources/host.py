@@ -3,8 +3,10 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.upsert import upsert
 except ImportError:
     from base import ZabbixBase
+    from tools.upsert import upsert
 
 class HostResource(ZabbixBase):
     def __init__(self, client):
@@ -86,12 +88,14 @@ class HostResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.delete", hostid=hostid)
 
-    def get(self, hostid=None, **filters):
+    def get(self, hostid=None, records=False, **filters):
         """
         Retrieve hosts according to the given parameters.
         
         Args:
             hostid (str|list, optional): Return only hosts with the given IDs.
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
             
         Keyword Args (filters):
             groupids (list, optional): Return only hosts that belong to the given host groups.
@@ -146,6 +150,8 @@ class HostResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/host/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", hostid=hostid, **filters)
         return self._call(f"{self.API_METHOD}.get", hostid=hostid, **filters)
     
     def massadd(self, **params):
@@ -276,4 +282,28 @@ class HostResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/host/update
         """
-        return self._call(f"{self.API_METHOD}.update", hostid=hostid, **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.update", hostid=hostid, **params)
+
+    def upsert(self, objects, **options):
+        """
+        Create the hosts that do not exist yet and update the others.
+
+        Hosts are matched by their technical name (`host`).
+
+        Args:
+            objects (list): Objects as taken by create().
+            **options: upsert() options (lookup_size, chunk_size, workers, target_latency),
+                see tools/upsert.py.
+
+        Returns:
+            UpsertResult: IDs in input order, created/updated indexes and per-object failures.
+
+        Example:
+            >>> result = zapi.host.upsert([
+            ...     {"host": "web01", "name": "Web 01", "groups": [{"groupid": "Linux servers"}]},
+            ...     {"host": "web02", "name": "Web 02", "groups": [{"groupid": "Linux servers"}]},
+            ... ])
+            >>> result
+            UpsertResult(created=1, updated=1, failures=0, requests=3)
+        """
+        return upsert(self, "host", objects, **options)
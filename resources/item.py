@@ -3,8 +3,10 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.upsert import upsert
 except ImportError:
     from base import ZabbixBase
+    from tools.upsert import upsert
 
 class ItemResource(ZabbixBase):
     def __init__(self, client):
@@ -74,12 +76,14 @@ class ItemResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.delete", itemid=itemid)
 
-    def get(self, itemid=None, **filters):
+    def get(self, itemid=None, records=False, **filters):
         """
         Retrieve items according to the given parameters.
         
         Args:
             itemid (str|list, optional): Return only items with the given IDs.
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
             
         Keyword Args (filters):
             groupids (list, optional): Return only items that belong to the given host groups.
@@ -132,6 +136,8 @@ class ItemResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/item/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", itemid=itemid, **filters)
         return self._call(f"{self.API_METHOD}.get", itemid=itemid, **filters)
     
     def update(self, itemid, **params):
@@ -173,4 +179,27 @@ class ItemResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/item/update
         """
-        return self._call(f"{self.API_METHOD}.update", itemid=itemid, **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.update", itemid=itemid, **params)
+
+    def upsert(self, objects, **options):
+        """
+        Create the items that do not exist yet and update the others.
+
+        Items are matched by host and key (`hostid`, which may also be a host name, and `key_`).
+
+        Args:
+            objects (list): Objects as taken by create().
+            **options: upsert() options (lookup_size, chunk_size, workers, target_latency),
+                see tools/upsert.py.
+
+        Returns:
+            UpsertResult: IDs in input order, created/updated indexes and per-object failures.
+
+        Example:
+            >>> result = zapi.items.upsert([
+            ...     {"hostid": "web01", "key_": "app.requests", "name": "Requests", "type": 2, "value_type": 3},
+            ... ], chunk_size=500)
+            >>> result.ids
+            ['23664']
+        """
+        return upsert(self, "item", objects, **options)
@@ -12,10 +12,14 @@ class ProblemResource(ZabbixBase):
 
     API_METHOD = "problem"
 
-    def get(self, **params):
+    def get(self, records=False, **params):
         """
         Retrieve problems according to the given parameters.
         
+        Args:
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
+            
         Keyword Args (params):
             eventids (list, optional): Return only problems with the given event IDs.
             groupids (list, optional): Return only problems that belong to the given host groups.
@@ -56,4 +60,6 @@ class ProblemResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/problem/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", **params)
         return self._call(f"{self.API_METHOD}.get", **params)
\ No newline at end of file
@@ -3,8 +3,10 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.template_graph import TemplateGraph
 except ImportError:
     from base import ZabbixBase
+    from tools.template_graph import TemplateGraph
 
 class TemplateResource(ZabbixBase):
     def __init__(self, client):
@@ -118,6 +120,26 @@ class TemplateResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.get", templateid=templateid, **filters)
 
+    def graph(self, hosts=True, **filters):
+        """
+        Load the template linkage as a dependency graph.
+        
+        Args:
+            hosts (bool, optional): Also load the hosts linked to every template (needed for affected_hosts()).
+        
+        Keyword Args (filters):
+            Any get() parameter limiting the loaded templates (groupids, templateids, ...).
+        
+        Returns:
+            TemplateGraph: Graph with levels(), run(), cycles(), affected_hosts() and affected_templates().
+        
+        Example:
+            >>> graph = zapi.templates.graph()
+            >>> graph.levels(reverse=True)  # deletion order
+            >>> graph.affected_hosts("Linux by Zabbix agent")
+        """
+        return TemplateGraph(self._client, hosts=hosts).load(**filters)
+
     def mass_add(self, **params):
         """
         Mass add related objects to templates.
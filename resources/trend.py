@@ -12,10 +12,14 @@ class TrendResource(ZabbixBase):
 
     API_METHOD = "trend"
     
-    def get(self, **params):
+    def get(self, records=False, **params):
         """
         Retrieve item trend data.
         
+        Args:
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
+            
         Keyword Args (params):
             itemids (list, required): IDs of items to retrieve trends for.
             time_from (int, optional): Return only trend records from this timestamp.
@@ -39,4 +43,6 @@ class TrendResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/trend/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", **params)
         return self._call(f"{self.API_METHOD}.get", **params)
\ No newline at end of file
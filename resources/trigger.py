@@ -3,8 +3,14 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.trigger_graph import TriggerGraph
+    from ..tools.trigger_index import TriggerIndex
+    from ..tools.upsert import upsert
 except ImportError:
     from base import ZabbixBase
+    from tools.trigger_graph import TriggerGraph
+    from tools.trigger_index import TriggerIndex
+    from tools.upsert import upsert
 
 class TriggerResource(ZabbixBase):
     def __init__(self, client):
@@ -69,12 +75,37 @@ class TriggerResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.delete", triggerid=triggerid)
 
-    def get(self, triggerid=None, **filters):
+    def dependency_graph(self, path=None, **options):
+        """
+        Load the trigger dependencies as a graph for suppression, root-cause and cycle queries.
+        
+        Args:
+            path (str, optional): JSON file caching the graph. An existing file is
+                reused and only the triggers changed since (per the audit log) are re-fetched.
+        
+        Keyword Args (options):
+            chunk_size (int, optional): Hosts (or triggers) per trigger.get request (default: 500).
+            workers (int, optional): Concurrent trigger.get requests (default: 4).
+            overlap (int, optional): Seconds of audit log re-read on every refresh (default: 60).
+        
+        Returns:
+            TriggerGraph: Graph with suppressed_by(), root_causes(), roots(), cycles() and refresh().
+        
+        Example:
+            >>> graph = zapi.triggers.dependency_graph(path="trigger-deps.json")
+            >>> graph.root_causes(firing_triggerids)
+            {'17085'}
+        """
+        return TriggerGraph(self._client, path=path, **options).open()
+
+    def get(self, triggerid=None, records=False, **filters):
         """
         Retrieve triggers according to the given parameters.
         
         Args:
             triggerid (str|list, optional): Return only triggers with the given IDs.
+            records (bool, optional): Return a compact RecordSet (tools/records.py)
+                with typed attribute access instead of the raw response.
             
         Keyword Args (filters):
             groupids (list, optional): Return only triggers that belong to the given host groups.
@@ -128,8 +159,33 @@ class TriggerResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/trigger/get
         """
+        if records:
+            return self._records(f"{self.API_METHOD}.get", triggerid=triggerid, **filters)
         return self._call(f"{self.API_METHOD}.get", triggerid=triggerid, **filters)
     
+    def index(self, prototypes=True, chunk_size=500, workers=4, **filters):
+        """
+        Build an in-memory index of triggers, their functions and the items they read.
+        
+        Args:
+            prototypes (bool, optional): Also index trigger prototypes.
+            chunk_size (int, optional): Hosts/templates per trigger.get request.
+            workers (int, optional): Concurrent trigger.get requests.
+        
+        Keyword Args (filters):
+            Any host.get parameter limiting the indexed hosts/templates (groupids, hostids, ...).
+        
+        Returns:
+            TriggerIndex: Index with triggers_for_items(), triggers_for_key(), triggers_using(),
+            impact() and reload(hostids).
+        
+        Example:
+            >>> index = zapi.triggers.index()
+            >>> index.impact(itemids_to_delete)
+            {'17085': [TriggerFunction(functionid='40121', triggerid='17085', itemid='23664', function='last', parameter='$')]}
+        """
+        return TriggerIndex(self._client, prototypes=prototypes, chunk_size=chunk_size, workers=workers).load(**filters)
+
     def update(self, triggerid, **params):
         """
         Update existing triggers.
@@ -166,4 +222,26 @@ class TriggerResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/trigger/update
         """
-        return self._call(f"{self.API_METHOD}.update", triggerid=triggerid, **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.update", triggerid=triggerid, **params)
+
+    def upsert(self, objects, **options):
+        """
+        Create the triggers that do not exist yet and update the others.
+
+        Triggers are matched by name (`description`) and the host of the first
+        function in their expression, so the expression itself can be changed.
+
+        Args:
+            objects (list): Objects as taken by create().
+            **options: upsert() options (lookup_size, chunk_size, workers, target_latency),
+                see tools/upsert.py.
+
+        Returns:
+            UpsertResult: IDs in input order, created/updated indexes and per-object failures.
+
+        Example:
+            >>> zapi.triggers.upsert([
+            ...     {"description": "High CPU", "expression": "last(/web01/system.cpu.util)>90", "priority": 4},
+            ... ])
+        """
+        return upsert(self, "trigger", objects, **options)
@@ -3,8 +3,12 @@
 
 try:
     from ..base import ZabbixBase
+    from ..tools.macros import MacroResolver
+    from ..tools.upsert import upsert
 except ImportError:
     from base import ZabbixBase
+    from tools.macros import MacroResolver
+    from tools.upsert import upsert
 
 class UserMacroResource(ZabbixBase):
     def __init__(self, client):
@@ -141,6 +145,21 @@ class UserMacroResource(ZabbixBase):
         """
         return self._call(f"{self.API_METHOD}.get", **params)
     
+    def resolver(self):
+        """
+        Bulk-load all user macros and template links for resolving macros in memory.
+        
+        Returns:
+            MacroResolver: Resolver with resolve(hostid, macro), resolve_many(hostids, macro),
+            effective(hostid), origin(hostid, macro) and reload(ids) for incremental refreshes.
+        
+        Example:
+            >>> macros = zapi.user_macro.resolver()
+            >>> macros.resolve("10084", '{$VFS.FS.PUSED.MAX.CRIT:"/var"}')
+            '95'
+        """
+        return MacroResolver(self._client).load()
+
     def update(self, **params):
         """
         Update existing user macros (host or template level).
@@ -189,4 +208,44 @@ class UserMacroResource(ZabbixBase):
         See Also:
             Zabbix API Documentation: https://www.zabbix.com/documentation/7.0/en/manual/api/reference/usermacro/updateglobal
         """
-        return self._call(f"{self.API_METHOD}.updateglobal", **params)
\ No newline at end of file
+        return self._call(f"{self.API_METHOD}.updateglobal", **params)
+
+    def upsert(self, objects, **options):
+        """
+        Create the host and template user macros that do not exist yet and update the others.
+
+        Macros are matched by host and macro name (`hostid`, which may also be a
+        host name, and `macro`).
+
+        Args:
+            objects (list): Objects as taken by create().
+            **options: upsert() options (lookup_size, chunk_size, workers, target_latency),
+                see tools/upsert.py.
+
+        Returns:
+            UpsertResult: IDs in input order, created/updated indexes and per-object failures.
+
+        Example:
+            >>> zapi.user_macros.upsert([
+            ...     {"hostid": "10105", "macro": "{$SNMP_COMMUNITY}", "value": "public"},
+            ... ])
+        """
+        return upsert(self, "macro", objects, **options)
+
+    def upsert_global(self, objects, **options):
+        """
+        Create the global user macros that do not exist yet and update the others.
+
+        Global macros are matched by macro name.
+
+        Args:
+            objects (list): Objects as taken by create_global().
+            **options: See upsert().
+
+        Returns:
+            UpsertResult: See upsert().
+
+        Example:
+            >>> zapi.user_macros.upsert_global([{"macro": "{$PROXY}", "value": "proxy01"}])
+        """
+        return upsert(self, "global_macro", objects, **options)
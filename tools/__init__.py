@@ -0,0 +1 @@
+# zabbix_api/tools/__init__.py
\ No newline at end of file
@@ -0,0 +1,515 @@
+# tools/backtest.py
+
+# Offline evaluation of a trigger expression over past data
+# The expression is parsed once, the history (or trends) of every item it
+# references is fetched in bulk - one paged history.get per value type and
+# chunk of items, chunks in parallel - and the expression is then evaluated
+# at every moment Zabbix would have evaluated it: whenever a referenced item
+# received a value, plus on a fixed timer for nodata(). Evaluation is done
+# column-wise: each function call becomes one column of results over all
+# evaluation times, computed in a single pass with prefix sums (avg, sum,
+# count) or monotonic queues (min, max) over two moving window pointers, and
+# operators combine whole columns. The problem/recovery intervals are read
+# off the final column.
+
+import operator
+import re
+import threading
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+    from .ingest import VALUE_TYPE_FLOAT, VALUE_TYPE_UNSIGNED
+    from .resolver import ItemResolver
+    from .trigger_expression import Call, FunctionRef, Macro, Number, Param, Query, String, Unary
+    from .trigger_expression import history_calls, parse, parse_number
+except ImportError:
+    from base import chunked, unwrap
+    from tools.ingest import VALUE_TYPE_FLOAT, VALUE_TYPE_UNSIGNED
+    from tools.resolver import ItemResolver
+    from tools.trigger_expression import Call, FunctionRef, Macro, Number, Param, Query, String, Unary
+    from tools.trigger_expression import history_calls, parse, parse_number
+
+
+HISTORY_FUNCTIONS = ("last", "avg", "min", "max", "sum", "count", "nodata", "change")
+MATH_FUNCTIONS = {"abs": abs, "min": min, "max": max}
+
+# Zabbix compares floating point values with this tolerance
+EPSILON = 0.000001
+
+_PERIOD = re.compile(r"^(#\d+|\d+[smhdw]?)?(?::now-(\d+[smhdw]?))?$")
+
+_USER_MACRO = re.compile(r"\{\$[A-Z0-9_.]+(?::[^{}]*)?\}")
+
+
+def _period(param):
+    # "5m" -> (300, None, 0); "#3" -> (None, 3, 0); "1h:now-1d" -> (3600, None, 86400)
+    match = _PERIOD.match((param or "").strip())
+    if match is None:
+        raise ValueError(f"Unsupported period: {param!r}")
+    period, shift = match.groups()
+    shift = parse_number(shift) if shift else 0
+    if not period:
+        return None, None, shift
+    if period.startswith("#"):
+        return None, int(period[1:]), shift
+    return parse_number(period), None, shift
+
+
+def _parameters(call, macros):
+    # Texts of the non-query arguments of a history function call, with user
+    # macros expanded: nodata(/host/key,{$AGENT.NODATA_TIMEOUT}) -> ["30m"]
+    def expand(match):
+        if match.group() not in macros:
+            raise ValueError(f"Unresolved macro: {match.group()}")
+        return str(macros[match.group()])
+
+    params = [arg.text if isinstance(arg, Param) else arg.value for arg in call.args[1:]]
+    return [_USER_MACRO.sub(expand, param) for param in params]
+
+
+def _matcher(op, pattern):
+    # Predicate of count(/host/key,period,<op>,<pattern>)
+    if op in ("like", "regexp", "iregexp"):
+        if op == "like":
+            return lambda value: pattern in str(value)
+        regex = re.compile(pattern, re.IGNORECASE if op == "iregexp" else 0)
+        return lambda value: regex.search(str(value)) is not None
+    if op == "bitand":
+        mask, _, expected = pattern.partition("/")
+        mask = int(mask)
+        expected = int(expected) if expected else mask
+        return lambda value: int(value) & mask == expected
+    compare = {
+        "eq": lambda a, b: abs(a - b) <= EPSILON, "ne": lambda a, b: abs(a - b) > EPSILON,
+        "gt": operator.gt, "ge": operator.ge, "lt": operator.lt, "le": operator.le,
+    }.get(op)
+    if compare is None:
+        raise ValueError(f"Unsupported count() operator: {op!r}")
+    try:
+        number = float(parse_number(pattern))
+    except (ValueError, IndexError):
+        if op not in ("eq", "ne"):
+            raise ValueError(f"count() operator {op!r} needs a numeric pattern, not {pattern!r}")
+        return (lambda value: value == pattern) if op == "eq" else (lambda value: value != pattern)
+    return lambda value: compare(float(value), number)
+
+
+def _bounds(clocks, ends):
+    # Number of values with clock <= end, for ascending ends, in one pass
+    result, index, count = [], 0, len(clocks)
+    for end in ends:
+        while index < count and clocks[index] <= end:
+            index += 1
+        result.append(index)
+    return result
+
+
+def _prefix(values):
+    sums, total = [0], 0
+    for value in values:
+        total += value
+        sums.append(total)
+    return sums
+
+
+def _extreme(values, lows, highs, better):
+    # Minimum/maximum of values[low:high] for windows whose ends only move forward
+    result, window, added = [], deque(), 0
+    for low, high in zip(lows, highs):
+        while added < high:
+            while window and not better(values[window[-1]], values[added]):
+                window.pop()
+            window.append(added)
+            added += 1
+        while window and window[0] < low:
+            window.popleft()
+        result.append(values[window[0]] if window and low < high else None)
+    return result
+
+
+def _truth(value):
+    if value is None:
+        return None
+    return 1 if (value != 0 if not isinstance(value, str) else value != "") else 0
+
+
+def _compare(op, left, right):
+    if left is None or right is None:
+        return None
+    if isinstance(left, str) or isinstance(right, str):
+        left, right = str(left), str(right)
+        return int({"=": left == right, "<>": left != right}.get(op, False))
+    if op == "=":
+        return int(abs(left - right) <= EPSILON)
+    if op == "<>":
+        return int(abs(left - right) > EPSILON)
+    return int({"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op])
+
+
+def _arithmetic(op, left, right):
+    if left is None or right is None or isinstance(left, str) or isinstance(right, str):
+        return None
+    if op == "/":
+        return left / right if right else None
+    return {"+": operator.add, "-": operator.sub, "*": operator.mul}[op](left, right)
+
+
+def _and(left, right):
+    left, right = _truth(left), _truth(right)
+    if left == 0 or right == 0:
+        return 0
+    return None if left is None or right is None else 1
+
+
+def _or(left, right):
+    left, right = _truth(left), _truth(right)
+    if left == 1 or right == 1:
+        return 1
+    return None if left is None or right is None else 0
+
+
+class _Series:
+    # Values of one item in clock order; trends also keep value_min/value_max
+    __slots__ = ("clocks", "values", "mins", "maxs")
+
+    def __init__(self):
+        self.clocks = []
+        self.values = []
+        self.mins = None
+        self.maxs = None
+
+
+class BacktestResult:
+    """
+    Outcome of a backtest.
+
+    Attributes:
+        intervals (list): (start, end) clock pairs of every problem; end is
+            None when the problem was still open at time_till.
+        evaluations (int): Number of times the expression was evaluated.
+        values (int): Number of history/trend values fetched.
+        time_till (int): End of the tested range.
+    """
+
+    def __init__(self, intervals, evaluations, values, time_till):
+        self.intervals = intervals
+        self.evaluations = evaluations
+        self.values = values
+        self.time_till = time_till
+
+    @property
+    def problems(self):
+        return len(self.intervals)
+
+    @property
+    def problem_time(self):
+        """
+        Seconds spent in the problem state (open problems count until time_till).
+        """
+        return sum((end if end is not None else self.time_till) - start for start, end in self.intervals)
+
+    def __repr__(self):
+        return f"BacktestResult(problems={self.problems}, problem_time={self.problem_time}, evaluations={self.evaluations})"
+
+
+class Backtester:
+    """
+    Evaluate trigger expressions over past history or trend data.
+
+    Args:
+        client (ZabbixClient): Client used for host.get, item.get and history.get/trend.get.
+        source (str, optional): "history" or "trend". Trends are hourly, so
+            periods should be multiples of an hour; min() and max() use the
+            hourly minimum and maximum, the other functions the hourly average.
+        chunk_size (int, optional): Items per history.get request.
+        page_size (int, optional): Records per history.get request; trends are
+            read in windows of as many hours as keep a chunk within it.
+        workers (int, optional): Concurrent history.get requests.
+
+    Example:
+        >>> backtester = zapi.history.backtester()
+        >>> result = backtester.run(
+        ...     "avg(/web01/system.cpu.util,5m)>85",
+        ...     time_from=now - 30 * 86400, time_till=now,
+        ...     recovery_expression="avg(/web01/system.cpu.util,5m)<70",
+        ... )
+        >>> result
+        BacktestResult(problems=14, problem_time=23100, evaluations=43187)
+    """
+
+    def __init__(self, client, source="history", chunk_size=50, page_size=100000, workers=4):
+        if source not in ("history", "trend"):
+            raise ValueError(f"Unknown source: {source}. Must be one of: history, trend")
+        self._client = client
+        self.source = source
+        self.chunk_size = chunk_size
+        self.page_size = page_size
+        self.workers = workers
+        self._items = ItemResolver(client)
+
+    def run(self, expression, time_from, time_till, recovery_expression=None, host=None, macros=None, step=60):
+        """
+        Evaluate an expression over [time_from, time_till] and report its problem intervals.
+
+        Args:
+            expression (str): Trigger expression in the expanded form
+                (avg(/host/key,5m)>10), as returned by trigger.get with expandExpression.
+            time_from (int): Start of the tested range.
+            time_till (int): End of the tested range.
+            recovery_expression (str, optional): Expression that has to be true
+                to close a problem; by default a problem closes when `expression` is false.
+            host (str, optional): Host substituted for an empty host (//key) in
+                item queries, e.g. to test a template's trigger on one host.
+            macros (dict, optional): {macro: value} for user macros in the
+                expression and in function parameters ({$PERIOD}, thresholds of
+                count()), e.g. MacroResolver.effective(hostid).
+            step (int, optional): Seconds between timer evaluations, used when
+                the expression calls nodata().
+
+        Returns:
+            BacktestResult
+
+        Raises:
+            ValueError: On unsupported functions, unknown items or unresolved macros.
+        """
+        trees = [parse(expression)]
+        if recovery_expression:
+            trees.append(parse(recovery_expression))
+        calls = [call for tree in trees for call in history_calls(tree)]
+        for call in calls:
+            if call.name not in HISTORY_FUNCTIONS:
+                raise ValueError(f"Unsupported function: {call.name}(). Supported: {', '.join(HISTORY_FUNCTIONS)}")
+
+        pairs = {self._pair(call.args[0], host) for call in calls}
+        resolved = self._items.resolve(pairs)
+        missing = sorted(pair for pair, item in resolved.items() if item is None)
+        if missing:
+            raise ValueError(f"Unknown items: {', '.join(f'/{h}/{k}' for h, k in missing)}")
+
+        macros = macros or {}
+        lookback = max([self._lookback(call, macros) for call in calls] + [0])
+        series = self._fetch({item for item in resolved.values()}, time_from - lookback, time_till)
+        by_pair = {pair: series[item[0]] for pair, item in resolved.items()}
+
+        times = set()
+        for item_series in series.values():
+            start = bisect_right(item_series.clocks, time_from - 1)
+            times.update(item_series.clocks[start:])
+        if any(call.name == "nodata" for call in calls):
+            times.update(range(time_from, time_till + 1, step))
+        times = sorted(clock for clock in times if time_from <= clock <= time_till)
+
+        columns = [self._column(tree, times, by_pair, host, macros) for tree in trees]
+        intervals = self._intervals(times, columns[0], columns[1] if len(columns) > 1 else None)
+        values = sum(len(item_series.clocks) for item_series in series.values())
+        return BacktestResult(intervals, len(times), values, time_till)
+
+    def _call_column(self, call, times, by_pair, host, macros):
+        series = by_pair[self._pair(call.args[0], host)]
+        params = _parameters(call, macros)
+        period, count, shift = _period(params[0] if params else "")
+        ends = [clock - shift for clock in times]
+        highs = _bounds(series.clocks, ends)
+        values = series.values
+
+        if call.name == "last":
+            n = count or 1
+            return [values[high - n] if high >= n else None for high in highs]
+        if call.name == "change":
+            return [
+                values[high - 1] - values[high - 2] if high >= 2 and not isinstance(values[high - 1], str) else None
+                for high in highs
+            ]
+        if period is None and count is None:
+            raise ValueError(f"{call.name}() needs a period")
+        if count is not None:
+            lows = [max(0, high - count) for high in highs]
+        else:
+            lows = _bounds(series.clocks, [end - period for end in ends])
+        if call.name == "nodata":
+            return [0 if high > low else 1 for low, high in zip(lows, highs)]
+        if call.name == "count":
+            if len(params) < 2:
+                return [high - low for low, high in zip(lows, highs)]
+            if len(params) < 3:
+                raise ValueError("count() with an operator needs a pattern")
+            op = params[1] or "eq"  # count(/host/key,5m,,"0") compares with "eq"
+            match = _matcher(op, params[2])
+            hits = _prefix(1 if match(value) else 0 for value in values)
+            return [hits[high] - hits[low] for low, high in zip(lows, highs)]
+        if values and isinstance(values[0], str):
+            raise ValueError(f"{call.name}() needs a numeric item")
+        if call.name == "min":
+            return _extreme(series.mins or values, lows, highs, operator.le)
+        if call.name == "max":
+            return _extreme(series.maxs or values, lows, highs, operator.ge)
+        sums = _prefix(values)
+        if call.name == "sum":
+            return [sums[high] - sums[low] if high > low else None for low, high in zip(lows, highs)]
+        return [(sums[high] - sums[low]) / (high - low) if high > low else None for low, high in zip(lows, highs)]
+
+    def _column(self, node, times, by_pair, host, macros):
+        size = len(times)
+        if isinstance(node, Number):
+            return [node.value] * size
+        if isinstance(node, String):
+            return [node.value] * size
+        if isinstance(node, Macro):
+            if node.text not in macros:
+                raise ValueError(f"Unresolved macro: {node.text}")
+            value = macros[node.text]
+            try:
+                value = parse_number(value)
+            except (ValueError, IndexError):  # text macros and empty values
+                pass
+            return [value] * size
+        if isinstance(node, FunctionRef):
+            raise ValueError("Expression contains {functionid} references; fetch it with expandExpression=True")
+        if isinstance(node, Call):
+            if node.args and isinstance(node.args[0], Query):
+                return self._call_column(node, times, by_pair, host, macros)
+            function = MATH_FUNCTIONS.get(node.name)
+            if function is None:
+                raise ValueError(f"Unsupported function: {node.name}()")
+            args = [self._column(arg, times, by_pair, host, macros) for arg in node.args]
+            return [None if None in row else function(*row) for row in zip(*args)]
+        if isinstance(node, Unary):
+            operand = self._column(node.operand, times, by_pair, host, macros)
+            if node.op == "not":
+                return [None if value is None else 1 - _truth(value) for value in operand]
+            return [None if value is None or isinstance(value, str) else -value for value in operand]
+        left = self._column(node.left, times, by_pair, host, macros)
+        right = self._column(node.right, times, by_pair, host, macros)
+        if node.op == "and":
+            return list(map(_and, left, right))
+        if node.op == "or":
+            return list(map(_or, left, right))
+        if node.op in ("+", "-", "*", "/"):
+            return [_arithmetic(node.op, a, b) for a, b in zip(left, right)]
+        return [_compare(node.op, a, b) for a, b in zip(left, right)]
+
+    def _fetch(self, items, time_from, time_till):
+        # One paged request stream per value type and chunk of items
+        by_type = {}
+        for itemid, value_type in items:
+            by_type.setdefault(value_type, []).append(itemid)
+        jobs = [(value_type, chunk) for value_type, itemids in by_type.items() for chunk in chunked(sorted(itemids), self.chunk_size)]
+        series = {itemid: _Series() for itemid, _ in items}
+        lock = threading.Lock()
+
+        def fetch(job):
+            value_type, itemids = job
+            convert = float if value_type in (VALUE_TYPE_FLOAT, VALUE_TYPE_UNSIGNED) else str
+            for records in self._pages(value_type, itemids, time_from, time_till):
+                with lock:
+                    for record in records:
+                        item_series = series[record["itemid"]]
+                        item_series.clocks.append(int(record["clock"]))
+                        if self.source == "history":
+                            item_series.values.append(convert(record["value"]))
+                            continue
+                        if item_series.mins is None:
+                            item_series.mins, item_series.maxs = [], []
+                        item_series.values.append(convert(record["value_avg"]))
+                        item_series.mins.append(convert(record["value_min"]))
+                        item_series.maxs.append(convert(record["value_max"]))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(fetch, jobs))
+        return series
+
+    def _intervals(self, times, problem, recovery):
+        intervals, start = [], None
+        for index, clock in enumerate(times):
+            fired = _truth(problem[index])
+            if start is None:
+                if fired == 1:
+                    start = clock
+                continue
+            recovered = _truth(recovery[index]) == 1 if recovery is not None else fired == 0
+            if recovered and fired != 1:
+                intervals.append((start, clock))
+                start = None
+        if start is not None:
+            intervals.append((start, None))
+        return intervals
+
+    def _lookback(self, call, macros):
+        # Seconds of data needed before time_from for the first evaluations
+        params = _parameters(call, macros)
+        period, count, shift = _period(params[0] if params else "")
+        if period is None:
+            # last/change/#N: values are usually far less than a day apart
+            period = 3600 if self.source == "history" else 86400
+        return period + shift
+
+    def _pages(self, value_type, itemids, time_from, time_till):
+        if self.source == "trend":
+            return self._trend_pages(itemids, time_from, time_till)
+        return self._history_pages(value_type, itemids, time_from, time_till)
+
+    def _trend_pages(self, itemids, time_from, time_till):
+        # trend.get rejects sortfield/sortorder: walk the range in windows of
+        # whole hours holding at most page_size records (one per item and
+        # hour) and sort each window locally
+        window = max(1, self.page_size // len(itemids)) * 3600
+        while time_from <= time_till:
+            window_till = min(time_from + window - 1, time_till)
+            records = unwrap("trend.get", self._client.trends.get(
+                output=["itemid", "clock", "value_min", "value_avg", "value_max"],
+                itemids=itemids,
+                time_from=time_from,
+                time_till=window_till,
+            ))
+            if records:
+                records.sort(key=lambda record: int(record["clock"]))
+                yield records
+            time_from = window_till + 1
+
+    def _history_pages(self, value_type, itemids, time_from, time_till):
+        # Page by clock; the next page starts at the last clock seen and the
+        # records already returned for that clock are dropped
+        limit = self.page_size
+        boundary, seen = None, set()
+        while time_from <= time_till:
+            records = unwrap("history.get", self._client.history.get(
+                output=["itemid", "clock", "ns", "value"],
+                history=value_type,
+                itemids=itemids,
+                time_from=time_from,
+                time_till=time_till,
+                sortfield="clock",
+                sortorder="ASC",
+                limit=limit,
+            ))
+
+            page = []
+            for record in records:
+                clock, mark = int(record["clock"]), (record["itemid"], record.get("ns"))
+                if clock == boundary and mark in seen:
+                    continue
+                if clock != boundary:
+                    boundary, seen = clock, set()
+                seen.add(mark)
+                page.append(record)
+            if page:
+                yield page
+            if len(records) < limit:
+                return
+            if not page:
+                limit *= 2
+                continue
+            limit = self.page_size
+            time_from = boundary
+
+    @staticmethod
+    def _pair(query, host):
+        if query.filter is not None or query.host == "*":
+            raise ValueError("Item queries with filters or wildcards (foreach functions) are not supported")
+        name = query.host or host
+        if not name:
+            raise ValueError(f"Item query //{query.key} needs a host; pass host=")
+        return name, query.key
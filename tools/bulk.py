@@ -0,0 +1,216 @@
+# tools/bulk.py
+
+# Chunked, parallel create/update/delete for any resource
+# The Zabbix API takes arrays for create, update and delete, but one huge
+# array can run into max_execution_time while many single-object calls
+# waste round trips. Elements are sent in chunks from a shared queue on a
+# worker pool. The chunk size is tuned while running: it doubles while
+# requests finish well under `target_latency` and halves when they are
+# slower or time out. A chunk the API rejects (the call is rolled back as a
+# whole) is bisected until the failing elements are isolated, so every
+# element ends up either with its ID or with its own error. Errors about
+# the request itself (session, method permissions, invalid parameters
+# outside the elements) fail the chunk as a whole instead.
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import ZabbixAPIError, request_error, unwrap
+    from .rate_limit import RateLimiter
+except ImportError:
+    from base import ZabbixAPIError, request_error, unwrap
+    from tools.rate_limit import RateLimiter
+
+
+BulkFailure = namedtuple("BulkFailure", ["index", "element", "error"])
+
+
+class BulkResult:
+    """
+    Outcome of a bulk call.
+
+    Attributes:
+        ids (list): ID returned for each input element, in input order;
+            None for failed elements.
+        failures (list): BulkFailure(index, element, error) per failed element.
+        requests (int): Number of API requests made.
+    """
+
+    def __init__(self, count):
+        self.ids = [None] * count
+        self.failures = []
+        self.requests = 0
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def __repr__(self):
+        return f"BulkResult(ids={len(self.ids) - len(self.failures)}, failures={len(self.failures)}, requests={self.requests})"
+
+
+class BulkExecutor:
+    """
+    Run create/update/delete of one resource over many elements.
+
+    Args:
+        resource (ZabbixBase): Resource whose API_METHOD is called (e.g. zapi.host).
+        chunk_size (int, optional): Elements per request to start with.
+        min_chunk_size (int, optional): Lower bound of the tuned chunk size.
+        max_chunk_size (int, optional): Upper bound of the tuned chunk size.
+        target_latency (float, optional): Seconds a request should take; the
+            chunk size is tuned towards it. None keeps chunk_size fixed.
+        workers (int, optional): Concurrent requests.
+        rate (float, optional): Maximum requests per second (None: unlimited).
+        max_retries (int, optional): Retries of a chunk after a network error
+            or timeout; the chunk is halved on every retry.
+        retry_backoff (float, optional): Base delay in seconds between retries.
+
+    Note:
+        A create whose request timed out may still have been executed by the
+        server. Its retry then fails with "already exists" for those elements,
+        which are reported as failures rather than created twice.
+
+    Example:
+        >>> executor = BulkExecutor(zapi.items, chunk_size=500, workers=8)
+        >>> result = executor.create(items)
+        >>> result.ids[:3], result.failures[:1]
+        (['23664', '23665', '23666'], [BulkFailure(index=812, element={...}, error=ZabbixAPIError(...))])
+    """
+
+    def __init__(self, resource, chunk_size=100, min_chunk_size=1, max_chunk_size=5000, target_latency=5.0,
+                 workers=4, rate=None, max_retries=2, retry_backoff=0.5):
+        self._resource = resource
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_latency = target_latency
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._limiter = RateLimiter(rate)
+        self._lock = threading.Lock()
+
+    def create(self, objects):
+        """
+        Create objects, returning their new IDs in input order.
+        """
+        return self.run("create", objects)
+
+    def update(self, objects):
+        """
+        Update objects (each including its ID property).
+        """
+        return self.run("update", objects)
+
+    def delete(self, ids):
+        """
+        Delete objects given by ID.
+        """
+        return self.run("delete", [str(objectid) for objectid in ids])
+
+    def run(self, action, elements):
+        """
+        Send `elements` to <API_METHOD>.<action> in tuned chunks on the worker pool.
+
+        Returns:
+            BulkResult: IDs in input order and per-element failures.
+        """
+        elements = list(elements)
+        method = f"{self._resource.API_METHOD}.{action}"
+        result = BulkResult(len(elements))
+        cursor = [0]
+
+        def take():
+            with self._lock:
+                start = cursor[0]
+                cursor[0] = min(len(elements), start + self.chunk_size)
+                return start, cursor[0]
+
+        def work():
+            while True:
+                start, end = take()
+                if start >= end:
+                    return
+                self._send(method, elements, start, end, result, attempt=0)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in [pool.submit(work) for _ in range(self.workers)]:
+                future.result()
+        result.failures.sort(key=lambda failure: failure.index)
+        return result
+
+    def _send(self, method, elements, start, end, result, attempt):
+        error = self._attempt(method, elements, start, end, result)
+        if error is not None:
+            self._handle(method, elements, start, end, result, attempt, error)
+
+    def _attempt(self, method, elements, start, end, result):
+        # One request for elements[start:end]; stores the returned IDs, or returns the error
+        self._limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = self._resource._call_many(method, elements[start:end])
+            ids = unwrap(method, response)
+        except Exception as error:  # API errors, network failures and timeouts
+            self._count(result)
+            return error
+        self._count(result)
+        self._tune(time.monotonic() - started, end - start)
+        # create/update/delete return {"<id property>s": [...]} in request order
+        returned = next(iter(ids.values()), []) if isinstance(ids, dict) else ids
+        with self._lock:
+            for offset, objectid in enumerate(returned or []):
+                result.ids[start + offset] = objectid
+        return None
+
+    def _handle(self, method, elements, start, end, result, attempt, error):
+        if isinstance(error, ZabbixAPIError):
+            self._bisect(method, elements, start, end, result, error)
+            return
+        # Network failures and timeouts
+        self._tune(None)
+        if attempt >= self.max_retries:
+            self._fail(result, elements, start, end, error)
+            return
+        time.sleep(self.retry_backoff * 2 ** attempt)
+        if end - start == 1:
+            self._send(method, elements, start, end, result, attempt + 1)
+            return
+        middle = (start + end) // 2
+        self._send(method, elements, start, middle, result, attempt + 1)
+        self._send(method, elements, middle, end, result, attempt + 1)
+
+    def _bisect(self, method, elements, start, end, result, error):
+        if end - start == 1 or request_error(error):
+            # A single element, or an error about the request itself (session,
+            # method permissions, ...) that smaller chunks would only repeat
+            self._fail(result, elements, start, end, error)
+            return
+        # The call was rolled back as a whole; bisect to find the culprits
+        middle = (start + end) // 2
+        halves = [(start, middle), (middle, end)]
+        errors = [self._attempt(method, elements, low, high, result) for low, high in halves]
+        for (low, high), half_error in zip(halves, errors):
+            if half_error is not None:
+                self._handle(method, elements, low, high, result, 0, half_error)
+
+    def _tune(self, elapsed, size=None):
+        if self.target_latency is None:
+            return
+        with self._lock:
+            if elapsed is None or elapsed > self.target_latency:
+                self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+            elif elapsed < self.target_latency / 2 and size >= self.chunk_size:
+                self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+    def _count(self, result):
+        with self._lock:
+            result.requests += 1
+
+    def _fail(self, result, elements, start, end, error):
+        with self._lock:
+            result.failures.extend(BulkFailure(index, elements[index], error) for index in range(start, end))
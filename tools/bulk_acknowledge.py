@@ -0,0 +1,156 @@
+# tools/bulk_acknowledge.py
+
+# Bulk event.acknowledge for event storms
+# Event IDs are sent in chunks on a worker pool under a request rate limit.
+# Chunks that fail on the network are retried; chunks rejected by the API
+# are split in halves until the events that cause the error are isolated,
+# so one bad event does not fail thousands of good ones. Errors about the
+# request itself (session, method permissions, invalid action) fail the
+# chunk as a whole instead, since any half would fail the same way.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import ZabbixAPIError, chunked, request_error, unwrap
+    from .rate_limit import RateLimiter
+except ImportError:
+    from base import ZabbixAPIError, chunked, request_error, unwrap
+    from tools.rate_limit import RateLimiter
+
+
+# event.acknowledge action flags
+ACTION_CLOSE = 1
+ACTION_ACKNOWLEDGE = 2
+ACTION_MESSAGE = 4
+ACTION_SEVERITY = 8
+ACTION_UNACKNOWLEDGE = 16
+
+
+class EventAcknowledger:
+    """
+    Acknowledge or close large numbers of events in parallel chunks.
+
+    Args:
+        client (ZabbixClient): Client used for problem.get and event.acknowledge.
+        chunk_size (int, optional): Events per event.acknowledge request.
+        workers (int, optional): Concurrent requests.
+        rate (float, optional): Maximum requests per second (None: unlimited).
+        max_retries (int, optional): Retries of a chunk after a network error.
+        retry_backoff (float, optional): Base delay in seconds between retries.
+
+    Example:
+        >>> acknowledger = EventAcknowledger(zapi, chunk_size=200, workers=4, rate=10)
+        >>> summary = acknowledger.acknowledge(
+        ...     action=ACTION_ACKNOWLEDGE | ACTION_MESSAGE, message="Network outage, see INC-1234",
+        ...     groupids=["42"], older_than=30,
+        ... )
+        >>> len(summary["succeeded"]), summary["failed"]
+        (18234, {'912345': 'event.acknowledge: Invalid params. Cannot close problem: ...'})
+    """
+
+    def __init__(self, client, chunk_size=200, workers=4, rate=None, max_retries=3, retry_backoff=1.0):
+        self._client = client
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._limiter = RateLimiter(rate)
+
+    def select(self, older_than=None, **filters):
+        """
+        Return the event IDs of the problems matching problem.get filters.
+
+        Args:
+            older_than (float, optional): Only problems that started at least
+                this many minutes ago.
+            **filters: problem.get filters (groupids, hostids, severities,
+                acknowledged, tags, ...).
+
+        Returns:
+            list: Event IDs of the matching problems.
+        """
+        if older_than is not None:
+            filters["time_till"] = int(time.time() - older_than * 60)
+        problems = unwrap("problem.get", self._client.problems.get(output=["eventid"], **filters))
+        return [problem["eventid"] for problem in problems]
+
+    def acknowledge(self, eventids=None, action=ACTION_ACKNOWLEDGE, message=None, severity=None,
+                    older_than=None, **filters):
+        """
+        Apply an event.acknowledge action to many events.
+
+        Args:
+            eventids (list, optional): Events to update. Selected with select()
+                from `older_than` and `filters` when not given.
+            action (int, optional): Combination of the ACTION_* flags.
+            message (str, optional): Message to add (needs ACTION_MESSAGE).
+            severity (int, optional): New severity (needs ACTION_SEVERITY).
+
+        Returns:
+            dict: "succeeded" (list of event IDs) and "failed" (event ID -> error message).
+        """
+        if eventids is None:
+            eventids = self.select(older_than=older_than, **filters)
+        params = {"action": action, "message": message, "severity": severity}
+        params = {key: value for key, value in params.items() if value is not None}
+
+        summary = {"succeeded": [], "failed": {}}
+        lock = threading.Lock()
+
+        def run(chunk):
+            succeeded, failed = self._acknowledge_chunk(chunk, params)
+            with lock:
+                summary["succeeded"].extend(succeeded)
+                summary["failed"].update(failed)
+
+        unique = list(dict.fromkeys(str(eventid) for eventid in eventids))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(run, chunked(unique, self.chunk_size)))
+        return summary
+
+    def _acknowledge_chunk(self, eventids, params):
+        succeeded, error = self._attempt(eventids, params)
+        if error is None:
+            return succeeded, {}
+        if isinstance(error, ZabbixAPIError):
+            return self._bisect(eventids, params, error)
+        return [], {eventid: str(error) for eventid in eventids}
+
+    def _attempt(self, eventids, params):
+        # One event.acknowledge request, retried on network failures;
+        # returns (succeeded event IDs, error or None)
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            try:
+                result = unwrap("event.acknowledge", self._client.events.acknowledge(eventids=eventids, **params))
+                return [str(eventid) for eventid in (result or {}).get("eventids", eventids)], None
+            except ZabbixAPIError as error:
+                return [], error
+            except Exception as error:  # network failures
+                if attempt >= self.max_retries:
+                    return [], error
+                attempt += 1
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _bisect(self, eventids, params, error):
+        # Split a rejected chunk in halves to find the events the API objects to.
+        # An error about the request itself would only repeat in every half.
+        if len(eventids) == 1 or request_error(error):
+            return [], {eventid: str(error) for eventid in eventids}
+        middle = len(eventids) // 2
+        halves = [eventids[:middle], eventids[middle:]]
+        attempts = [self._attempt(half, params) for half in halves]
+        succeeded, failed = [], {}
+        for half, (half_succeeded, half_error) in zip(halves, attempts):
+            if half_error is None:
+                succeeded += half_succeeded
+            elif isinstance(half_error, ZabbixAPIError):
+                half_succeeded, half_failed = self._bisect(half, params, half_error)
+                succeeded += half_succeeded
+                failed.update(half_failed)
+            else:
+                failed.update((eventid, str(half_error)) for eventid in half)
+        return succeeded, failed
@@ -0,0 +1,279 @@
+# tools/cache.py
+
+# Persistent SQLite cache of configuration objects
+# A ConfigMirror whose objects live in an SQLite file instead of memory.
+# The first run loads everything; later runs open the file, and only when
+# the cache is older than its TTL read the audit log for changes. Objects
+# are indexed by type and ID, by name (host name, item key, ...) and by
+# the host/template they belong to, so lookups do not need to load the
+# whole inventory.
+
+import json
+import sqlite3
+import time
+from collections.abc import MutableMapping
+
+try:
+    from ..base import chunked, unwrap
+    from .mirror import MIRRORED_TYPES, ConfigMirror
+except ImportError:
+    from base import chunked, unwrap
+    from tools.mirror import MIRRORED_TYPES, ConfigMirror
+
+
+SCHEMA_VERSION = "1"
+
+CACHED_TYPES = ("host", "host_group", "template", "item", "trigger", "value_map", "user_macro")
+
+# Property stored in the indexed "name" column, per type
+NAME_FIELDS = {
+    "host": "host",
+    "template": "host",
+    "host_group": "name",
+    "item": "key_",
+    "trigger": "description",
+    "value_map": "name",
+    "user_macro": "macro",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (type, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS objects_name ON objects (type, name);
+CREATE TABLE IF NOT EXISTS owners (
+    type TEXT NOT NULL,
+    hostid TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (type, hostid, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS owners_id ON owners (type, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# SQLite's default limit of host parameters per statement is 999
+MAX_PARAMETERS = 900
+
+
+class _SqliteTable(MutableMapping):
+    # Dict-like view of the objects of one type, as used by ConfigMirror
+
+    def __init__(self, db, name):
+        self._db = db
+        self._name = name
+        self._name_field = NAME_FIELDS.get(name)
+
+    def __getitem__(self, objectid):
+        row = self._db.execute("SELECT data FROM objects WHERE type = ? AND id = ?", (self._name, objectid)).fetchone()
+        if row is None:
+            raise KeyError(objectid)
+        return json.loads(row[0])
+
+    def __setitem__(self, objectid, obj):
+        self.update([(objectid, obj)])
+
+    def __delitem__(self, objectid):
+        cursor = self._db.execute("DELETE FROM objects WHERE type = ? AND id = ?", (self._name, objectid))
+        if not cursor.rowcount:
+            raise KeyError(objectid)
+        self._db.execute("DELETE FROM owners WHERE type = ? AND id = ?", (self._name, objectid))
+
+    def __iter__(self):
+        for (objectid,) in self._db.execute("SELECT id FROM objects WHERE type = ?", (self._name,)):
+            yield objectid
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM objects WHERE type = ?", (self._name,)).fetchone()[0]
+
+    def items(self):
+        for objectid, data in self._db.execute("SELECT id, data FROM objects WHERE type = ?", (self._name,)):
+            yield objectid, json.loads(data)
+
+    def values(self):
+        for (data,) in self._db.execute("SELECT data FROM objects WHERE type = ?", (self._name,)):
+            yield json.loads(data)
+
+    def update(self, pairs=(), **kwargs):
+        pairs = list(pairs.items() if hasattr(pairs, "items") else pairs) + list(kwargs.items())
+        if not pairs:
+            return
+        name = self._name
+        self._db.executemany(
+            "INSERT OR REPLACE INTO objects (type, id, name, data) VALUES (?, ?, ?, ?)",
+            [(name, objectid, obj.get(self._name_field), json.dumps(obj, separators=(",", ":")))
+             for objectid, obj in pairs],
+        )
+        self._db.executemany("DELETE FROM owners WHERE type = ? AND id = ?", [(name, objectid) for objectid, _ in pairs])
+        self._db.executemany(
+            "INSERT OR IGNORE INTO owners (type, hostid, id) VALUES (?, ?, ?)",
+            [(name, hostid, objectid) for objectid, obj in pairs for hostid in ConfigMirror._owners(obj)],
+        )
+
+    def clear(self):
+        self._db.execute("DELETE FROM objects WHERE type = ?", (self._name,))
+        self._db.execute("DELETE FROM owners WHERE type = ?", (self._name,))
+
+    def find(self, name):
+        rows = self._db.execute("SELECT data FROM objects WHERE type = ? AND name = ?", (self._name, name))
+        return [json.loads(data) for (data,) in rows]
+
+    def owned_by(self, hostids):
+        objectids = []
+        for chunk in chunked(sorted(hostids), MAX_PARAMETERS):
+            rows = self._db.execute(
+                f"SELECT DISTINCT id FROM owners WHERE type = ? AND hostid IN ({','.join('?' * len(chunk))})",
+                [self._name, *chunk],
+            )
+            objectids.extend(objectid for (objectid,) in rows)
+        return objectids
+
+
+class ConfigCache(ConfigMirror):
+    """
+    SQLite-backed cache of configuration objects with audit log invalidation.
+
+    open() on an existing cache file is nearly free: nothing is fetched
+    unless the last refresh is older than `ttl` seconds, in which case only
+    the audit log since then and the changed objects are fetched.
+
+    Args:
+        client (ZabbixClient): Client used for the get() calls.
+        path (str, optional): SQLite file holding the cache.
+        types (tuple, optional): Object types to cache, keys of MIRRORED_TYPES.
+        ttl (float, optional): Seconds a refresh stays valid before open()/
+            ensure_fresh() consult the audit log again. 0 always checks.
+        chunk_size (int, optional): IDs per get() request when re-fetching.
+        overlap (int, optional): Seconds of audit log re-read on every refresh.
+
+    Example:
+        >>> cache = ConfigCache(zapi, path="zabbix_cache.sqlite", ttl=300)
+        >>> cache.open()
+        >>> cache.find("host", "web01")[0]["hostid"]
+        '10105'
+        >>> cache.item("10105", "system.cpu.util")["itemid"]
+        '23664'
+    """
+
+    def __init__(self, client, path="zabbix_cache.sqlite", types=CACHED_TYPES, ttl=300, chunk_size=1000, overlap=60):
+        super().__init__(client, types=types, chunk_size=chunk_size, overlap=overlap)
+        self.db_path = path
+        self.ttl = ttl
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        if self._meta("schema_version") != SCHEMA_VERSION:
+            self._reset()
+        self.objects = {name: _SqliteTable(self._db, name) for name in self.types}
+
+    def open(self):
+        """
+        Start from the cache file: full load if it is empty, was built for
+        other types or has a different schema; audit log refresh if it is
+        older than the TTL; nothing otherwise.
+        """
+        marks = self._meta("marks")
+        if marks is None or json.loads(self._meta("types") or "[]") != list(self.types):
+            self.load()
+            return
+        self._marks.state = json.loads(marks)
+        self._harvester = self._make_harvester()
+        self.ensure_fresh()
+
+    def ensure_fresh(self):
+        """
+        Refresh from the audit log if the last refresh is older than the TTL.
+
+        Returns:
+            bool: True if a refresh was done.
+        """
+        if time.time() - float(self._meta("refreshed_at") or 0) < self.ttl:
+            return False
+        self.refresh()
+        return True
+
+    def verify(self):
+        """
+        Compare object counts with countOutput and reload the types that differ.
+
+        Returns:
+            list: Types that were reloaded.
+        """
+        reloaded = []
+        for name in self.types:
+            spec = MIRRORED_TYPES[name]
+            count = int(unwrap(spec["method"], getattr(self._client, spec["resource"]).get(countOutput=True)))
+            if count != len(self.objects[name]):
+                objects = self._get(name, **spec["params"])
+                self.objects[name].clear()
+                self.objects[name].update((obj[spec["id"]], obj) for obj in objects)
+                reloaded.append(name)
+        if reloaded:
+            self.save()
+        return reloaded
+
+    def save(self):
+        """
+        Commit the cached objects together with the audit log mark.
+        """
+        self._set_meta("marks", json.dumps(self._marks.state))
+        self._set_meta("types", json.dumps(list(self.types)))
+        self._set_meta("refreshed_at", str(time.time()))
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def get(self, name, objectid):
+        """
+        Return a cached object by type and ID, or None.
+        """
+        return self.objects[name].get(str(objectid))
+
+    def find(self, name, value):
+        """
+        Return the cached objects of a type whose indexed name matches
+        (host/template: technical name, item: key, trigger: description,
+        host group/value map: name, user macro: macro).
+        """
+        return self.objects[name].find(value)
+
+    def children(self, name, hostid):
+        """
+        Return the cached objects of a type that belong to a host or template.
+        """
+        table = self.objects[name]
+        return [table[objectid] for objectid in table.owned_by({str(hostid)})]
+
+    def item(self, hostid, key):
+        """
+        Return the cached item with the given key on a host or template, or None.
+        """
+        row = self._db.execute(
+            "SELECT o.data FROM objects o JOIN owners w ON w.type = o.type AND w.id = o.id "
+            "WHERE o.type = 'item' AND o.name = ? AND w.hostid = ?",
+            (key, str(hostid)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _owned(self, name, owners):
+        return self.objects[name].owned_by(owners)
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _reset(self):
+        self._db.executescript("DELETE FROM objects; DELETE FROM owners; DELETE FROM meta;")
+        self._set_meta("schema_version", SCHEMA_VERSION)
+        self._db.commit()
@@ -0,0 +1,63 @@
+# tools/checkpoint.py
+
+# Small JSON state file used by the resumable bulk tools
+# Writes go to a temporary file first and are then renamed over the old
+# one, so an interrupted run never leaves a half-written checkpoint behind.
+
+import json
+import os
+import tempfile
+import threading
+
+
+class Checkpoint:
+    """
+    Persistent key/value state stored as a JSON file.
+
+    Args:
+        path (str, optional): File to load from and save to. Without a path
+            the checkpoint only lives in memory and save() is a no-op.
+
+    Example:
+        >>> checkpoint = Checkpoint("ingest.checkpoint.json")
+        >>> checkpoint.get("metrics.csv", {})
+        {}
+        >>> checkpoint.set("metrics.csv", {"offset": 1048576, "rows": 25000})
+        >>> checkpoint.save()
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.state = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.state = json.load(file)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self.state.get(key, default)
+
+    def set(self, key, value, save=False):
+        with self._lock:
+            self.state[key] = value
+        if save:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self.state, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
@@ -0,0 +1,258 @@
+# tools/config_export.py
+
+# Sharded, incremental configuration.export
+# Instead of one export of everything, the configuration is split into
+# shards (one per template, host, host group or template group) that are
+# exported concurrently and written to their own file as soon as they
+# arrive, so memory holds at most `workers` shards at a time. A state file
+# keeps the members and the content hash of every shard plus the time of
+# the last run. On the next run the audit log since then tells which hosts
+# and templates changed (changes to items, triggers, graphs, ... are mapped
+# to their host or template); shards without changes are not exported at
+# all, and shards whose export hashes the same are not rewritten.
+
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+    from .harvester import Harvester
+    from .checkpoint import Checkpoint
+except ImportError:
+    from base import chunked, unwrap
+    from tools.harvester import Harvester
+    from tools.checkpoint import Checkpoint
+
+
+SHARD_TYPES = ("template", "host", "template_group", "host_group")
+
+EXTENSIONS = {"yaml": "yaml", "xml": "xml", "json": "json"}
+
+# Audit log resource types of hosts/templates and of host/template groups
+RESOURCE_HOST = "4"
+RESOURCE_TEMPLATE = "30"
+RESOURCE_HOST_GROUP = "14"
+RESOURCE_TEMPLATE_GROUP = "50"
+
+# Audit log resource types of objects that belong to a host or template:
+# client attribute, API method, ID parameter and get() parameters returning the owner
+OWNED_RESOURCES = {
+    "15": ("items", "item.get", "itemids", {"output": ["hostid"]}),
+    "36": ("item_prototype", "itemprototype.get", "itemids", {"output": ["hostid"]}),
+    "52": ("lld_rule", "discoveryrule.get", "itemids", {"output": ["hostid"]}),
+    "13": ("triggers", "trigger.get", "triggerids", {"output": ["triggerid"], "selectHosts": ["hostid"]}),
+    "31": ("trigger_prototype", "triggerprototype.get", "triggerids", {"output": ["triggerid"], "selectHosts": ["hostid"]}),
+    "6": ("graphs", "graph.get", "graphids", {"output": ["graphid"], "selectHosts": ["hostid"]}),
+    "35": ("graph_prototype", "graphprototype.get", "graphids", {"output": ["graphid"], "selectHosts": ["hostid"]}),
+    "22": ("web_scenario", "httptest.get", "httptestids", {"output": ["hostid"]}),
+    "17": ("value_map", "valuemap.get", "valuemapids", {"output": ["hostid"]}),
+    "29": ("user_macro", "usermacro.get", "hostmacroids", {"output": ["hostid"]}),
+    "37": ("host_prototype", "hostprototype.get", "hostids", {"output": ["hostid"], "selectParentHost": ["hostid"]}),
+    "43": ("template_dashboard", "templatedashboard.get", "dashboardids", {"output": ["templateid"]}),
+}
+
+
+def _owners(obj):
+    if "parentHost" in obj:
+        return {obj["parentHost"]["hostid"]}
+    if "hosts" in obj:
+        return {host["hostid"] for host in obj["hosts"]}
+    return {obj.get("hostid") or obj.get("templateid")} - {None}
+
+
+def _file_name(objectid, name):
+    # Object names may contain characters that are not valid in file names;
+    # the ID keeps names that sanitize alike ("a/b", "a:b") apart
+    return f"{objectid}-" + (re.sub(r"[^\w.\- ]", "_", name).strip() or "_")
+
+
+class ConfigExporter:
+    """
+    Export the configuration as one file per shard, skipping unchanged shards.
+
+    Args:
+        client (ZabbixClient): Client used for the get, auditlog.get and export calls.
+        output_dir (str): Directory receiving the shard files and the state file.
+        shard_by (str, optional): "template", "host", "template_group" or "host_group".
+            With group shards every template/host is exported with its first group.
+        format (str, optional): "yaml", "xml" or "json".
+        workers (int, optional): Concurrent configuration.export requests.
+        overlap (int, optional): Seconds of audit log re-read on every run.
+        **filters: get() filters limiting the exported templates/hosts (groupids, ...).
+
+    Example:
+        >>> exporter = ConfigExporter(zapi, "backup/templates", shard_by="template", workers=8)
+        >>> exporter.run()
+        {'exported': 12, 'written': 3, 'skipped': 1488, 'removed': 0}
+    """
+
+    def __init__(self, client, output_dir, shard_by="template", format="yaml", workers=4, overlap=60, **filters):
+        if shard_by not in SHARD_TYPES:
+            raise ValueError(f"Unknown shard type: {shard_by}. Must be one of: {', '.join(SHARD_TYPES)}")
+        if format not in EXTENSIONS:
+            raise ValueError(f"Unknown format: {format}. Must be one of: {', '.join(EXTENSIONS)}")
+        self._client = client
+        self.output_dir = output_dir
+        self.shard_by = shard_by
+        self.format = format
+        self.workers = workers
+        self.overlap = overlap
+        self.filters = filters
+        os.makedirs(output_dir, exist_ok=True)
+        self._state = Checkpoint(os.path.join(output_dir, ".export-state.json"))
+
+    def shards(self):
+        """
+        Return the current shards as {shard name: {"id": ..., "members": [...], "options": {...}}}.
+        """
+        objects_kind = "templates" if self.shard_by in ("template", "template_group") else "hosts"
+        if objects_kind == "templates":
+            objects = unwrap("template.get", self._client.templates.get(
+                output=["templateid", "host"], selectTemplateGroups=["groupid", "name"], **self.filters,
+            ))
+            id_field, groups_field = "templateid", "templategroups"
+        else:
+            objects = unwrap("host.get", self._client.host.get(
+                output=["hostid", "host"], selectHostGroups=["groupid", "name"], **self.filters,
+            ))
+            id_field, groups_field = "hostid", "hostgroups"
+
+        shards = {}
+        if self.shard_by in ("template", "host"):
+            for obj in objects:
+                shards[obj["host"]] = {
+                    "id": obj[id_field],
+                    "members": [obj[id_field]],
+                    "groups": sorted(group["groupid"] for group in obj.get(groups_field, [])),
+                    "options": {objects_kind: [obj[id_field]]},
+                }
+            return shards
+
+        group_option = "template_groups" if objects_kind == "templates" else "host_groups"
+        for obj in objects:
+            groups = sorted(obj.get(groups_field, []), key=lambda group: int(group["groupid"]))
+            if not groups:
+                continue
+            group = groups[0]
+            shard = shards.setdefault(group["name"], {
+                "id": group["groupid"],
+                "members": [], "groups": [group["groupid"]], "options": {group_option: [group["groupid"]], objects_kind: []},
+            })
+            shard["members"].append(obj[id_field])
+            shard["options"][objects_kind].append(obj[id_field])
+        return shards
+
+    def run(self, force=False):
+        """
+        Export the shards that changed since the last run.
+
+        Args:
+            force (bool, optional): Export every shard regardless of the audit log.
+
+        Returns:
+            dict: Counts of shards "exported" (requested), "written" (content
+            changed), "skipped" (no change in the audit log) and "removed"
+            (files of shards that no longer exist).
+        """
+        started = int(time.time())
+        saved = self._state.get("shards") or {}
+        last_clock = self._state.get("clock")
+        shards = self.shards()
+
+        changed_members, changed_groups, complete = set(), set(), False
+        if last_clock is not None and not force:
+            changed_members, changed_groups, complete = self._changes(last_clock)
+
+        todo = []
+        stats = {"exported": 0, "written": 0, "skipped": 0, "removed": 0}
+        for name, shard in shards.items():
+            previous = saved.get(name)
+            unchanged = (
+                complete
+                and previous is not None
+                and previous["members"] == shard["members"]
+                and previous["file"] == os.path.relpath(self._path(name, shard["id"]), self.output_dir)
+                and os.path.exists(self._path(name, shard["id"]))
+                and not changed_members.intersection(shard["members"])
+                and not changed_groups.intersection(shard["groups"])
+            )
+            if unchanged:
+                stats["skipped"] += 1
+            else:
+                todo.append(name)
+
+        def export(name):
+            options = shards[name]["options"]
+            path = self._path(name, shards[name]["id"])
+            source = unwrap("configuration.export", self._client.configuration.export(format=self.format, options=options))
+            digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+            previous = saved.get(name)
+            if previous is None or previous["hash"] != digest or not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".part", "w", encoding="utf-8") as file:
+                    file.write(source)
+                os.replace(path + ".part", path)
+                return name, digest, True
+            return name, digest, False
+
+        hashes = {name: saved[name]["hash"] for name in shards if name in saved}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for name, digest, written in pool.map(export, todo):
+                hashes[name] = digest
+                stats["exported"] += 1
+                stats["written"] += written
+
+        files = {name: os.path.relpath(self._path(name, shard["id"]), self.output_dir) for name, shard in shards.items()}
+        for name, previous in saved.items():
+            path = os.path.join(self.output_dir, previous["file"])
+            if files.get(name) != previous["file"] and os.path.exists(path):
+                os.remove(path)
+                stats["removed"] += 1
+
+        self._state.set("shards", {
+            name: {"members": shard["members"], "hash": hashes.get(name), "file": files[name]}
+            for name, shard in shards.items()
+        })
+        self._state.set("clock", started - self.overlap, save=True)
+        return stats
+
+    def _changes(self, since):
+        # Hosts/templates and groups touched by audit log records since `since`.
+        # `complete` is False when some record could not be attributed (e.g. a
+        # deleted item), in which case every shard is exported again.
+        members, groups, complete = set(), set(), True
+        owned = {}
+        harvester = Harvester(
+            self._client.auditlogs, "auditid", checkpoint=Checkpoint(), start=since,
+            output=["auditid", "clock", "action", "resourcetype", "resourceid"],
+        )
+
+        def collect(records):
+            for record in records:
+                resourcetype = str(record["resourcetype"])
+                if resourcetype in (RESOURCE_HOST, RESOURCE_TEMPLATE):
+                    members.add(record["resourceid"])
+                elif resourcetype in (RESOURCE_HOST_GROUP, RESOURCE_TEMPLATE_GROUP):
+                    groups.add(record["resourceid"])
+                elif resourcetype in OWNED_RESOURCES:
+                    owned.setdefault(resourcetype, set()).add(record["resourceid"])
+
+        harvester.run_once(collect)
+        for resourcetype, ids in owned.items():
+            attribute, method, ids_param, params = OWNED_RESOURCES[resourcetype]
+            found = 0
+            for chunk in chunked(sorted(ids), 1000):
+                objects = unwrap(method, getattr(self._client, attribute).get(**params, **{ids_param: chunk}))
+                for obj in objects:
+                    members.update(_owners(obj))
+                found += len(objects)
+            if found < len(ids):
+                complete = False
+        return members, groups, complete
+
+    def _path(self, name, objectid):
+        folder = self.shard_by + "s"
+        return os.path.join(self.output_dir, folder, f"{_file_name(objectid, name)}.{EXTENSIONS[self.format]}")
@@ -0,0 +1,250 @@
+# tools/config_import.py
+
+# Diff-aware configuration.import of many files
+# Every file's source (together with the import rules) is hashed and
+# compared with the hash recorded after its last successful import, so
+# untouched files cost nothing. Changed files are first checked with
+# configuration.importcompare and only imported when Zabbix reports a real
+# difference. Files are processed in template dependency order: a file
+# linking a template defined in another changed file waits for it, while
+# independent files are compared and imported concurrently
+# (DependencyGraph.run).
+
+import hashlib
+import json
+import os
+import threading
+import xml.etree.ElementTree as ElementTree
+
+try:
+    from ..base import unwrap
+    from .checkpoint import Checkpoint
+    from .dependency import DependencyGraph
+except ImportError:
+    from base import unwrap
+    from tools.checkpoint import Checkpoint
+    from tools.dependency import DependencyGraph
+
+
+FORMATS = {".yaml": "yaml", ".yml": "yaml", ".xml": "xml", ".json": "json"}
+
+_UPDATE = {"createMissing": True, "updateExisting": True}
+_SYNC = {"createMissing": True, "updateExisting": True, "deleteMissing": True}
+
+# Rules for keeping templates in line with their files: objects missing from
+# a file are removed from its templates, linkage to other templates is kept
+DEFAULT_RULES = {
+    "template_groups": _UPDATE,
+    "host_groups": _UPDATE,
+    "templates": _UPDATE,
+    "templateLinkage": {"createMissing": True, "deleteMissing": False},
+    "templateDashboards": _SYNC,
+    "valueMaps": _SYNC,
+    "items": _SYNC,
+    "discoveryRules": _SYNC,
+    "triggers": _SYNC,
+    "graphs": _SYNC,
+    "httptests": _SYNC,
+}
+
+
+def _parse(source, format):
+    # Export document as a dict; XML is reduced to the parts read by _templates()
+    if format == "json":
+        return json.loads(source)
+    if format == "yaml":
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML exports requires PyYAML (pip install pyyaml)")
+        return yaml.safe_load(source)
+    root = ElementTree.fromstring(source)
+    document = {}
+    for kind in ("templates", "hosts"):
+        document[kind] = [
+            {
+                "template": element.findtext("template"),
+                "templates": [{"name": linked.findtext("name")} for linked in element.findall("templates/template")],
+            }
+            for element in root.findall(f"{kind}/{kind[:-1]}")
+        ]
+    return {"zabbix_export": document}
+
+
+def _templates(document):
+    """
+    Return (templates defined, templates linked) by an export document.
+    """
+    export = (document or {}).get("zabbix_export", {})
+    defined, linked = set(), set()
+    for kind in ("templates", "hosts"):
+        for obj in export.get(kind) or []:
+            if kind == "templates" and obj.get("template"):
+                defined.add(obj["template"])
+            linked.update(link["name"] for link in obj.get("templates") or [])
+    return defined, linked - defined
+
+
+def _has_changes(diff):
+    # importcompare returns empty arrays/objects for objects without changes
+    if isinstance(diff, dict):
+        return any(_has_changes(value) for value in diff.values())
+    if isinstance(diff, list):
+        return bool(diff)
+    return diff not in (None, "")
+
+
+class ImportResult:
+    """
+    Outcome of an import run.
+
+    Attributes:
+        skipped (list): Files whose source did not change since their last import.
+        unchanged (list): Changed files for which importcompare found no difference.
+        imported (list): Files that were imported.
+        diffs (dict): importcompare result per file with differences.
+        failures (dict): Error per failed file; files depending on a failed
+            file are not attempted and fail with a ValueError.
+        requests (int): Number of API requests made.
+    """
+
+    def __init__(self):
+        self.skipped = []
+        self.unchanged = []
+        self.imported = []
+        self.diffs = {}
+        self.failures = {}
+        self.requests = 0
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def __repr__(self):
+        return (f"ImportResult(skipped={len(self.skipped)}, unchanged={len(self.unchanged)}, "
+                f"imported={len(self.imported)}, failures={len(self.failures)}, requests={self.requests})")
+
+
+class ConfigImporter:
+    """
+    Import configuration files, skipping those without changes.
+
+    Args:
+        client (ZabbixClient): Client used for the importcompare and import calls.
+        state (Checkpoint|str, optional): Checkpoint (or path) holding the hash
+            of every imported file.
+        rules (dict, optional): Import rules (default: DEFAULT_RULES).
+        workers (int, optional): Files compared/imported concurrently.
+
+    Example:
+        >>> importer = ConfigImporter(zapi, state="templates.import-state.json", workers=8)
+        >>> importer.run(["templates/"])
+        ImportResult(skipped=1480, unchanged=7, imported=3, failures=0, requests=17)
+    """
+
+    def __init__(self, client, state=None, rules=None, workers=4):
+        self._client = client
+        self.state = state if isinstance(state, Checkpoint) else Checkpoint(state)
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.workers = workers
+
+    def files(self, paths):
+        """
+        Return the export files given by `paths` (files or directories, searched recursively).
+        """
+        files = []
+        for path in paths:
+            if not os.path.isdir(path):
+                files.append(path)
+                continue
+            for directory, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(directory, name) for name in sorted(names)
+                    if os.path.splitext(name)[1].lower() in FORMATS
+                )
+        return sorted(files)
+
+    def order(self, sources):
+        """
+        Group files into levels: every file only links templates defined in
+        files of earlier levels (or already present in Zabbix).
+
+        Args:
+            sources (dict): {path: (format, source)}.
+
+        Returns:
+            list: Lists of paths; the files of one level are independent.
+
+        Raises:
+            ValueError: If the files link their templates in a cycle.
+        """
+        return self._graph(sources).levels()
+
+    def run(self, paths, dry_run=False):
+        """
+        Compare and import the files that changed since their last import.
+
+        Args:
+            paths (list): Files or directories with exported configuration.
+            dry_run (bool, optional): Only run importcompare; diffs are
+                reported but nothing is imported and the state is kept.
+
+        Returns:
+            ImportResult
+        """
+        result = ImportResult()
+        rules_hash = json.dumps(self.rules, sort_keys=True)
+        sources, hashes = {}, {}
+        for path in self.files(paths):
+            format = FORMATS.get(os.path.splitext(path)[1].lower())
+            if format is None:
+                raise ValueError(f"Unknown configuration format of {path}. Must be one of: {', '.join(FORMATS)}")
+            with open(path, encoding="utf-8") as file:
+                source = file.read()
+            digest = hashlib.sha256((rules_hash + source).encode("utf-8")).hexdigest()
+            if self.state.get(path) == digest:
+                result.skipped.append(path)
+                continue
+            sources[path] = (format, source)
+            hashes[path] = digest
+
+        lock = threading.Lock()
+
+        def process(path):
+            format, source = sources[path]
+            with lock:
+                result.requests += 1
+            diff = unwrap("configuration.importcompare", self._client.configuration.import_compare(
+                format=format, source=source, rules=self.rules,
+            ))
+            if _has_changes(diff) and not dry_run:
+                with lock:
+                    result.requests += 1
+                unwrap("configuration.import", self._client.configuration.import_configuration(
+                    format=format, source=source, rules=self.rules,
+                ))
+            if not dry_run:
+                self.state.set(path, hashes[path], save=True)
+            return diff
+
+        scheduled = self._graph(sources).run(process, workers=self.workers)
+        result.failures = scheduled.failures
+        for path, diff in sorted(scheduled.results.items()):
+            if not _has_changes(diff):
+                result.unchanged.append(path)
+                continue
+            result.diffs[path] = diff
+            if not dry_run:
+                result.imported.append(path)
+        return result
+
+    def _graph(self, sources):
+        # A file requires the files defining the templates it links
+        defined, linked = {}, {}
+        for path, (format, source) in sources.items():
+            templates, linked[path] = _templates(_parse(source, format))
+            defined.update((template, path) for template in templates)
+        graph = DependencyGraph()
+        for path, links in linked.items():
+            graph.add(path, requires={defined[link] for link in links if link in defined} - {path})
+        return graph
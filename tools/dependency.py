@@ -0,0 +1,305 @@
+# tools/dependency.py
+
+# Directed dependency graph with a parallel scheduler
+# Nodes are any hashable IDs; an edge "a requires b" means b has to be
+# handled before a (a template before the templates linking it, a file
+# before the files using its templates). Besides ordering and cycle
+# detection, the graph answers transitive queries ("everything that
+# requires x") by breadth-first search over adjacency sets, and runs an
+# operation over the nodes on a worker pool, starting every node as soon as
+# the nodes it requires are done.
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class ScheduleResult:
+    """
+    Outcome of DependencyGraph.run().
+
+    Attributes:
+        results (dict): Return value of the operation per node that succeeded.
+        failures (dict): Exception per node that failed; nodes requiring a
+            failed node are not run and fail with a ValueError.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.failures = {}
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def __repr__(self):
+        return f"ScheduleResult(results={len(self.results)}, failures={len(self.failures)})"
+
+
+class DependencyGraph:
+    """
+    Graph of nodes and the nodes they require.
+
+    Example:
+        >>> graph = DependencyGraph()
+        >>> graph.add("web", requires=["linux", "nginx"])
+        >>> graph.add("nginx", requires=["linux"])
+        >>> graph.levels()
+        [['linux'], ['nginx'], ['web']]
+        >>> graph.dependents("linux")
+        {'nginx', 'web'}
+    """
+
+    def __init__(self):
+        self._requires = {}
+        self._required_by = {}
+
+    def __contains__(self, node):
+        return node in self._requires
+
+    def __iter__(self):
+        return iter(self._requires)
+
+    def __len__(self):
+        return len(self._requires)
+
+    def add(self, node, requires=()):
+        """
+        Add a node (if new) and edges to the nodes it requires.
+        """
+        self._requires.setdefault(node, set())
+        self._required_by.setdefault(node, set())
+        for required in requires:
+            self._requires.setdefault(required, set())
+            self._required_by.setdefault(required, set()).add(node)
+            self._requires[node].add(required)
+
+    def cycles(self):
+        """
+        Return the cycles of the graph, each as a sorted list of its nodes
+        (strongly connected components with more than one node, or a node requiring itself).
+        """
+        # Iterative Tarjan, so deep template chains do not hit the recursion limit
+        index, lowlink, on_stack, stack, cycles = {}, {}, set(), [], []
+        counter = 0
+        for root in self._requires:
+            if root in index:
+                continue
+            work = [(root, iter(self._requires[root]))]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, edges = work[-1]
+                for required in edges:
+                    if required not in index:
+                        index[required] = lowlink[required] = counter
+                        counter += 1
+                        stack.append(required)
+                        on_stack.add(required)
+                        work.append((required, iter(self._requires[required])))
+                        break
+                    if required in on_stack:
+                        lowlink[node] = min(lowlink[node], index[required])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self._requires[node]:
+                            cycles.append(sorted(component, key=str))
+        return cycles
+
+    def dependencies(self, nodes):
+        """
+        Return every node required by `nodes`, directly or transitively.
+
+        Args:
+            nodes: A node or an iterable of nodes.
+        """
+        return self._reach(nodes, self._requires)
+
+    def dependents(self, nodes):
+        """
+        Return every node requiring `nodes`, directly or transitively.
+
+        Args:
+            nodes: A node or an iterable of nodes.
+        """
+        return self._reach(nodes, self._required_by)
+
+    def levels(self, nodes=None, reverse=False):
+        """
+        Group nodes into levels; the nodes of a level only require nodes of earlier levels.
+
+        Args:
+            nodes (iterable, optional): Order only these nodes (default: all).
+                Requirements through nodes left out are still respected.
+            reverse (bool, optional): Dependents first (e.g. for deletion).
+
+        Returns:
+            list: Lists of nodes, sorted within a level.
+
+        Raises:
+            ValueError: If the nodes require each other in a cycle.
+        """
+        return self._layers(self._restricted(nodes, reverse))
+
+    def remove(self, node):
+        """
+        Remove a node and its edges in both directions.
+        """
+        for required in self._requires.pop(node, ()):
+            self._required_by[required].discard(node)
+        for dependent in self._required_by.pop(node, ()):
+            self._requires[dependent].discard(node)
+
+    def replace(self, node, requires=()):
+        """
+        Set the nodes `node` requires, dropping its previous requirements.
+        """
+        for required in self._requires.get(node, ()):
+            self._required_by[required].discard(node)
+        self._requires[node] = set()
+        self.add(node, requires)
+
+    def requires(self, node):
+        """
+        Return the nodes `node` requires directly.
+        """
+        return set(self._requires.get(node, ()))
+
+    def required_by(self, node):
+        """
+        Return the nodes requiring `node` directly.
+        """
+        return set(self._required_by.get(node, ()))
+
+    def run(self, operation, nodes=None, workers=4, reverse=False):
+        """
+        Call operation(node) for the nodes in dependency order on a worker pool.
+
+        A node starts as soon as every node it requires has finished, so
+        independent chains do not wait for each other.
+
+        Args:
+            operation (callable): Called with each node; exceptions mark the node as failed.
+            nodes (iterable, optional): Run only these nodes (default: all).
+            workers (int, optional): Concurrent operations.
+            reverse (bool, optional): Run dependents first (e.g. for deletion).
+
+        Returns:
+            ScheduleResult
+
+        Raises:
+            ValueError: If the nodes require each other in a cycle.
+        """
+        requires = self._restricted(nodes, reverse)
+        self._layers(requires)  # refuse cycles before running anything
+        waiting = {node: len(required) for node, required in requires.items()}
+        unblocks = self._unblocks(requires)
+        result = ScheduleResult()
+
+        def skip(failed):
+            # Fail every node that (transitively) waits for a failed one
+            queue = deque([failed])
+            while queue:
+                for blocked in unblocks[queue.popleft()]:
+                    if blocked not in result.failures:
+                        result.failures[blocked] = ValueError(f"Not run, requires failed {failed}")
+                        queue.append(blocked)
+
+        ready = sorted((node for node, count in waiting.items() if not count), key=str)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while ready or running:
+                for node in ready:
+                    running[pool.submit(operation, node)] = node
+                ready = []
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    try:
+                        result.results[node] = future.result()
+                    except Exception as error:
+                        result.failures[node] = error
+                        skip(node)
+                        continue
+                    for blocked in unblocks[node]:
+                        waiting[blocked] -= 1
+                        if not waiting[blocked] and blocked not in result.failures:
+                            ready.append(blocked)
+                ready.sort(key=str)
+        return result
+
+    def _layers(self, requires):
+        # Kahn's algorithm: a node is placed once its last requirement is,
+        # in the level after it
+        waiting = {node: len(required) for node, required in requires.items()}
+        unblocks = self._unblocks(requires)
+        levels, placed = [], 0
+        level = sorted((node for node, count in waiting.items() if not count), key=str)
+        while level:
+            levels.append(level)
+            placed += len(level)
+            following = []
+            for node in level:
+                for blocked in unblocks[node]:
+                    waiting[blocked] -= 1
+                    if not waiting[blocked]:
+                        following.append(blocked)
+            level = sorted(following, key=str)
+        if placed < len(requires):
+            remaining = sorted((node for node, count in waiting.items() if count), key=str)
+            raise ValueError(f"Dependency cycle, cannot order: {', '.join(map(str, remaining))}")
+        return levels
+
+    def _unblocks(self, requires):
+        # node -> nodes waiting for it, within a _restricted() selection
+        unblocks = {node: set() for node in requires}
+        for node, required in requires.items():
+            for other in required:
+                unblocks[other].add(node)
+        return unblocks
+
+    def _reach(self, nodes, edges):
+        try:
+            single = nodes in self._requires
+        except TypeError:  # a list or set of nodes
+            single = False
+        start = [nodes] if single or isinstance(nodes, str) else list(nodes)
+        found, queue = set(), deque(start)
+        while queue:
+            for other in edges.get(queue.popleft(), ()):
+                if other not in found:
+                    found.add(other)
+                    queue.append(other)
+        return found
+
+    def _restricted(self, nodes, reverse):
+        # Requirements among `nodes` only; a path through nodes outside the
+        # selection still counts, so a -> (b) -> c keeps c before a
+        edges = self._required_by if reverse else self._requires
+        selected = set(self._requires) if nodes is None else set(nodes)
+        requires = {}
+        for node in selected:
+            found, seen, queue = set(), set(), deque(edges.get(node, ()))
+            while queue:
+                other = queue.popleft()
+                if other in seen:
+                    continue
+                seen.add(other)
+                if other in selected:
+                    found.add(other)
+                else:
+                    queue.extend(edges.get(other, ()))
+            requires[node] = found
+        return requires
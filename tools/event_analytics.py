@@ -0,0 +1,241 @@
+# tools/event_analytics.py
+
+# One-pass analytics over trigger events: MTTR, duration distributions,
+# flapping and the noisiest triggers
+# Events are streamed page by page in eventid order. A problem event waits
+# in a small pending table until the recovery event named by its r_eventid
+# shows up; problems whose recovery lies beyond the analysed range get
+# their recovery clock fetched in one batch at the end. Durations are
+# folded into fixed-size log histograms, so memory depends on the number
+# of triggers, hosts and tags, not on the number of events.
+
+import heapq
+import math
+
+try:
+    from ..base import chunked, unwrap
+    from .event_follower import iter_event_pages
+except ImportError:
+    from base import chunked, unwrap
+    from tools.event_follower import iter_event_pages
+
+
+# Histogram resolution: buckets per doubling of the duration
+BUCKETS_PER_DOUBLING = 4
+
+DIMENSIONS = ("trigger", "host", "tag")
+
+
+class DurationStats:
+    """
+    Running count/sum/min/max and a log histogram of problem durations.
+
+    Percentiles are estimated from the histogram with a relative error of
+    about 2 ** (1 / BUCKETS_PER_DOUBLING) - 1 (~19%).
+    """
+
+    __slots__ = ("problems", "recovered", "flaps", "total", "minimum", "maximum", "buckets")
+
+    def __init__(self):
+        self.problems = 0
+        self.recovered = 0
+        self.flaps = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = {}
+
+    def add(self, duration, flap_threshold):
+        self.recovered += 1
+        self.total += duration
+        self.minimum = duration if self.minimum is None else min(self.minimum, duration)
+        self.maximum = duration if self.maximum is None else max(self.maximum, duration)
+        bucket = -1 if duration <= 0 else int(math.log2(duration) * BUCKETS_PER_DOUBLING)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        if duration < flap_threshold:
+            self.flaps += 1
+
+    @property
+    def mttr(self):
+        return self.total / self.recovered if self.recovered else None
+
+    def percentile(self, fraction):
+        if not self.recovered:
+            return None
+        rank = fraction * self.recovered
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                if bucket < 0:
+                    return 0
+                # Upper edge of the bucket, clamped to the observed range
+                return min(self.maximum, max(self.minimum, 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING)))
+        return self.maximum
+
+
+class EventAnalytics:
+    """
+    Pair trigger problem events with their recovery events and aggregate them.
+
+    Statistics are kept per trigger, per host and per tag (tag, value).
+    A problem counts as a flap when it recovered within `flap_threshold`
+    seconds.
+
+    Args:
+        flap_threshold (int, optional): Seconds under which a problem counts as a flap.
+
+    Example:
+        >>> analytics = EventAnalytics(flap_threshold=300)
+        >>> analytics.run(zapi, time_from=month_start, time_till=month_end, groupids=["4"])
+        >>> analytics.top_noisy(10)
+        [('18345', 'High CPU on web01', 412), ...]
+        >>> columns = analytics.table("host")
+        >>> columns["mttr"][:3]
+        [312.5, 1800.0, 45.2]
+    """
+
+    def __init__(self, flap_threshold=300):
+        self.flap_threshold = flap_threshold
+        self.stats = {dimension: {} for dimension in DIMENSIONS}
+        self.names = {}  # triggerid -> latest event name
+        self.open_problems = 0
+        self._pending = {}  # r_eventid -> [(clock, keys)], one OK event can close several problems
+        self._events = 0
+
+    def run(self, client, time_from=None, time_till=None, page_size=5000, **filters):
+        """
+        Stream trigger events from event.get and feed them to add().
+
+        Args:
+            client (ZabbixClient): Client used for event.get.
+            time_from (int, optional): Only events created at or after this time.
+            time_till (int, optional): Only events created at or before this time.
+            page_size (int, optional): Events per event.get request.
+            **filters: Additional event.get filters (groupids, hostids, tags, ...).
+
+        Returns:
+            EventAnalytics: self, to allow chaining.
+        """
+        params = {
+            "source": 0,
+            "object": 0,
+            "output": ["eventid", "objectid", "clock", "value", "name", "r_eventid"],
+            "selectHosts": ["hostid"],
+            "selectTags": "extend",
+            "time_from": time_from,
+            "time_till": time_till,
+            **filters,
+        }
+        params = {key: value for key, value in params.items() if value is not None}
+        for page in iter_event_pages(client.events, 0, page_size, **params):
+            for event in page:
+                self.add(event)
+        self.finish(client)
+        return self
+
+    def add(self, event):
+        """
+        Account for a single event (problem or recovery).
+        """
+        self._events += 1
+        if event["value"] == "1":
+            triggerid = event["objectid"]
+            self.names[triggerid] = event.get("name", "")
+            keys = [("trigger", triggerid)]
+            keys += [("host", host["hostid"]) for host in event.get("hosts", [])]
+            keys += [("tag", (tag["tag"], tag.get("value", ""))) for tag in event.get("tags", [])]
+            for dimension, key in keys:
+                self._stats(dimension, key).problems += 1
+            r_eventid = event.get("r_eventid", "0")
+            if r_eventid == "0":
+                self.open_problems += 1
+            else:
+                self._pending.setdefault(r_eventid, []).append((int(event["clock"]), keys))
+        else:
+            for clock, keys in self._pending.pop(event["eventid"], ()):
+                self._record(int(event["clock"]) - clock, keys)
+
+    def finish(self, client=None, chunk_size=1000):
+        """
+        Resolve problems whose recovery event was not part of the stream.
+
+        With a client, the missing recovery events are fetched in chunks;
+        without one, those problems are dropped from the duration statistics.
+        """
+        if client is not None:
+            for chunk in chunked(list(self._pending), chunk_size):
+                events = unwrap("event.get", client.events.get(output=["eventid", "clock"], eventids=chunk))
+                for event in events:
+                    for clock, keys in self._pending.pop(event["eventid"]):
+                        self._record(int(event["clock"]) - clock, keys)
+        self._pending.clear()
+
+    def top_noisy(self, n=10):
+        """
+        Return the `n` triggers with the most problem events as (triggerid, name, problems).
+        """
+        triggers = self.stats["trigger"]
+        top = heapq.nlargest(n, triggers.items(), key=lambda entry: entry[1].problems)
+        return [(triggerid, self.names.get(triggerid, ""), stats.problems) for triggerid, stats in top]
+
+    def top_flapping(self, n=10):
+        """
+        Return the `n` triggers with the most flaps as (triggerid, name, flaps).
+        """
+        triggers = self.stats["trigger"]
+        top = heapq.nlargest(n, triggers.items(), key=lambda entry: entry[1].flaps)
+        return [(triggerid, self.names.get(triggerid, ""), stats.flaps) for triggerid, stats in top if stats.flaps]
+
+    def table(self, dimension="trigger"):
+        """
+        Return the statistics of one dimension as columns (dict of equal-length lists).
+
+        Columns: key (triggerid, hostid, or tag and value for "tag"), problems,
+        recovered, flaps, mttr, min, p50, p90, p99, max; plus name for triggers.
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}. Must be one of: {', '.join(DIMENSIONS)}")
+        columns = {"tag": [], "value": []} if dimension == "tag" else {"key": []}
+        if dimension == "trigger":
+            columns["name"] = []
+        for name in ("problems", "recovered", "flaps", "mttr", "min", "p50", "p90", "p99", "max"):
+            columns[name] = []
+        for key, stats in self.stats[dimension].items():
+            if dimension == "tag":
+                columns["tag"].append(key[0])
+                columns["value"].append(key[1])
+            else:
+                columns["key"].append(key)
+            if dimension == "trigger":
+                columns["name"].append(self.names.get(key, ""))
+            columns["problems"].append(stats.problems)
+            columns["recovered"].append(stats.recovered)
+            columns["flaps"].append(stats.flaps)
+            columns["mttr"].append(stats.mttr)
+            columns["min"].append(stats.minimum)
+            columns["p50"].append(stats.percentile(0.5))
+            columns["p90"].append(stats.percentile(0.9))
+            columns["p99"].append(stats.percentile(0.99))
+            columns["max"].append(stats.maximum)
+        return columns
+
+    def to_arrow(self, dimension="trigger"):
+        """
+        Return table() as a pyarrow Table (requires pyarrow).
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("to_arrow() requires pyarrow (pip install pyarrow)")
+        return pa.table(self.table(dimension))
+
+    def _stats(self, dimension, key):
+        stats = self.stats[dimension].get(key)
+        if stats is None:
+            stats = self.stats[dimension][key] = DurationStats()
+        return stats
+
+    def _record(self, duration, keys):
+        for dimension, key in keys:
+            self._stats(dimension, key).add(duration, self.flap_threshold)
@@ -0,0 +1,222 @@
+# tools/event_follower.py
+
+# Tail of new events, driven by an eventid cursor
+# Every poll asks event.get for events after the last eventid seen, sorted
+# by eventid, so clock skew cannot make events disappear or repeat. Tags
+# and hosts are selected in the same request. The poll interval shrinks
+# while events keep coming and grows while it is quiet.
+
+import threading
+
+try:
+    from ..base import unwrap
+    from .checkpoint import Checkpoint
+except ImportError:
+    from base import unwrap
+    from tools.checkpoint import Checkpoint
+
+
+# event.get parameters that select events by where they come from. A
+# recovery event matches them just like the problem it closes, while
+# problem attributes (severities, tags) do not carry over to it: recovery
+# events have severity 0 and may lack the problem's tags.
+SCOPE_FILTERS = ("source", "object", "objectids", "groupids", "hostids")
+
+# Tag filter operators (tags[].operator)
+TAG_CONTAINS = 0
+TAG_EQUALS = 1
+TAG_NOT_LIKE = 2
+TAG_NOT_EQUAL = 3
+TAG_EXISTS = 4
+TAG_NOT_EXISTS = 5
+
+# Tag filter evaluation types (evaltype)
+EVALTYPE_AND_OR = 0
+EVALTYPE_OR = 2
+
+
+def scope_filters(filters):
+    """
+    Return the part of event.get/problem.get `filters` that recovery events
+    match as well, i.e. what is safe to pass to an event stream that has to
+    see recoveries.
+    """
+    return {name: value for name, value in filters.items() if name in SCOPE_FILTERS}
+
+
+def matches_problem(event, filters):
+    """
+    Check a problem event against the severities and tags/evaltype filters
+    of problem.get, as the server would apply them.
+
+    Args:
+        event (dict): Event with "severity" and "tags" (as selected with selectTags).
+        filters (dict): problem.get/event.get parameters; other keys are ignored.
+    """
+    severities = filters.get("severities")
+    if severities is not None:
+        if isinstance(severities, (str, int)):
+            severities = [severities]
+        if int(event.get("severity", 0)) not in {int(severity) for severity in severities}:
+            return False
+    conditions = filters.get("tags")
+    if not conditions:
+        return True
+    tags = event.get("tags", [])
+    if int(filters.get("evaltype", EVALTYPE_AND_OR)) == EVALTYPE_OR:
+        return any(_tag_matches(tags, condition) for condition in conditions)
+    # And/Or: conditions on the same tag name are ORed, different names ANDed
+    groups = {}
+    for condition in conditions:
+        groups.setdefault(condition["tag"], []).append(condition)
+    return all(any(_tag_matches(tags, condition) for condition in group) for group in groups.values())
+
+
+def _tag_matches(tags, condition):
+    operator = int(condition.get("operator", TAG_CONTAINS))
+    value = str(condition.get("value", ""))
+    values = [tag.get("value", "") for tag in tags if tag["tag"] == condition["tag"]]
+    if operator == TAG_EXISTS:
+        return bool(values)
+    if operator == TAG_NOT_EXISTS:
+        return not values
+    if operator in (TAG_CONTAINS, TAG_NOT_LIKE):
+        found = any(value.lower() in tag_value.lower() for tag_value in values)
+    else:
+        found = value in values
+    return found if operator in (TAG_CONTAINS, TAG_EQUALS) else not found
+
+
+def iter_event_pages(events, cursor=0, page_size=1000, stopped=None, **filters):
+    """
+    Yield pages of events with an eventid above `cursor`, in eventid order.
+
+    Args:
+        events (EventResource): Resource used for event.get.
+        cursor (int, optional): Only events after this eventid are returned.
+        page_size (int, optional): Events per event.get request.
+        stopped (callable, optional): Checked between pages; paging ends when it returns True.
+        **filters: Additional event.get parameters.
+    """
+    cursor = int(cursor)
+    while True:
+        page = unwrap("event.get", events.get(
+            **filters,
+            eventid_from=str(cursor + 1),
+            sortfield="eventid",
+            sortorder="ASC",
+            limit=page_size,
+        ))
+        if page:
+            yield page
+            cursor = int(page[-1]["eventid"])
+        if len(page) < page_size or (stopped and stopped()):
+            return
+
+
+class EventFollower:
+    """
+    Iterate over new events as they are created, resuming from a persisted cursor.
+
+    The cursor is the last eventid handed to the caller. It is advanced once
+    the caller asks for the next event, and saved to the checkpoint after
+    every page and when iteration stops, so a restart continues with the
+    first event that was not consumed yet. The only event that can be
+    delivered twice is the one being handled when the process stopped.
+
+    Args:
+        events (EventResource): Resource used for event.get.
+        checkpoint (Checkpoint|str, optional): Checkpoint (or path) holding the cursor.
+        cursor_key (str, optional): Name of the cursor inside the checkpoint,
+            to let several followers share one file.
+        start (str|int, optional): Where to begin without a saved cursor:
+            "now" (only new events), "beginning" or an eventid to start after.
+        page_size (int, optional): Events per event.get request.
+        min_interval (float, optional): Shortest pause between polls, in seconds.
+        max_interval (float, optional): Longest pause between polls, in seconds.
+        **filters: Additional event.get parameters (source, value, severities,
+            hostids, selectTags, selectHosts, output, ...).
+
+    Example:
+        >>> for event in zapi.events.follow(checkpoint="events.json", value=1, severities=[4, 5]):
+        ...     notify(event["name"], event["hosts"], event["tags"])
+    """
+
+    def __init__(self, events, checkpoint=None, cursor_key="events.follow", start="now", page_size=1000,
+                 min_interval=1.0, max_interval=30.0, **filters):
+        self._events = events
+        self.checkpoint = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+        self.cursor_key = cursor_key
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.filters = {
+            "output": "extend",
+            "selectTags": "extend",
+            "selectHosts": ["hostid", "host", "name"],
+            **filters,
+        }
+        self._stopped = threading.Event()
+        saved = self.checkpoint.get(cursor_key)
+        self.cursor = int(saved) if saved is not None else self._start_cursor(start)
+
+    def __iter__(self):
+        try:
+            while not self._stopped.is_set():
+                received = 0
+                for page in self._pages():
+                    for event in page:
+                        yield event
+                        self.cursor = int(event["eventid"])
+                        received += 1
+                    self.save()
+                self._adapt(received)
+                self._stopped.wait(self.interval)
+        finally:
+            self.save()
+
+    def poll(self):
+        """
+        Fetch all events created since the cursor and advance it.
+
+        Returns:
+            list: New events, oldest first.
+        """
+        events = [event for page in self._pages() for event in page]
+        if events:
+            self.cursor = int(events[-1]["eventid"])
+            self.save()
+        self._adapt(len(events))
+        return events
+
+    def stop(self):
+        """
+        End the iteration after the current poll.
+        """
+        self._stopped.set()
+
+    def save(self):
+        """
+        Persist the cursor.
+        """
+        self.checkpoint.set(self.cursor_key, str(self.cursor), save=True)
+
+    def _start_cursor(self, start):
+        if start == "beginning":
+            return 0
+        if start == "now":
+            latest = unwrap("event.get", self._events.get(
+                output=["eventid"], sortfield="eventid", sortorder="DESC", limit=1,
+            ))
+            return int(latest[0]["eventid"]) if latest else 0
+        return int(start)
+
+    def _pages(self):
+        return iter_event_pages(self._events, self.cursor, self.page_size, self._stopped.is_set, **self.filters)
+
+    def _adapt(self, received):
+        if received:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
@@ -0,0 +1,294 @@
+# tools/export.py
+
+# Streaming export of history.get / trend.get data to Parquet or compressed CSV
+# The requested range is split into one partition per item and UTC day
+# (<output_dir>/itemid=<id>/date=<YYYY-MM-DD>.<ext>). Partitions are
+# exported concurrently; inside a partition the data is fetched page by
+# page and written straight to the file, so memory use depends on the
+# page size and the number of workers, not on the size of the export.
+
+import csv
+import gzip
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from ..base import unwrap
+    from .ingest import VALUE_TYPE_FLOAT, VALUE_TYPE_UNSIGNED
+    from .resolver import ItemResolver
+except ImportError:
+    from base import unwrap
+    from tools.ingest import VALUE_TYPE_FLOAT, VALUE_TYPE_UNSIGNED
+    from tools.resolver import ItemResolver
+
+
+DAY = 86400
+
+HISTORY_COLUMNS = ["itemid", "clock", "ns", "value"]
+TREND_COLUMNS = ["itemid", "clock", "num", "value_min", "value_avg", "value_max"]
+
+
+def _number(value_type):
+    # Converter for numeric value columns; other value types stay strings
+    if value_type == VALUE_TYPE_FLOAT:
+        return float
+    if value_type == VALUE_TYPE_UNSIGNED:
+        return int
+    return str
+
+
+class _CsvSink:
+    # CSV writer on top of a plain, gzip or zstd compressed file
+
+    def __init__(self, path, columns, compression):
+        if compression == "gzip":
+            self._file = gzip.open(path, "wt", encoding="utf-8", newline="")
+        elif compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("zstd compression requires zstandard (pip install zstandard)")
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+            self._file = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetSink:
+    # Parquet writer that emits one row group per `row_group_size` rows
+
+    def __init__(self, path, columns, value_type, row_group_size, compression):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        value = {VALUE_TYPE_FLOAT: pa.float64(), VALUE_TYPE_UNSIGNED: pa.uint64()}.get(value_type, pa.string())
+        types = {"itemid": pa.uint64(), "clock": pa.int64(), "ns": pa.int32(), "num": pa.int32()}
+        self._pa = pa
+        self._schema = pa.schema([(column, types.get(column, value)) for column in columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression=compression)
+        self._row_group_size = row_group_size
+        self._rows = []
+
+    def write(self, rows):
+        self._rows.extend(rows)
+        while len(self._rows) >= self._row_group_size:
+            self._flush(self._rows[:self._row_group_size])
+            del self._rows[:self._row_group_size]
+
+    def close(self):
+        if self._rows:
+            self._flush(self._rows)
+            self._rows = []
+        self._writer.close()
+
+    def _flush(self, rows):
+        arrays = [list(column) for column in zip(*rows)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+
+class HistoryExporter:
+    """
+    Export history or trend data to Parquet or CSV files, partitioned by item and day.
+
+    Args:
+        client (ZabbixClient): Client whose history/trends resources are used.
+        output_dir (str): Directory that receives the partition files.
+        source (str, optional): "history" or "trend".
+        format (str, optional): "parquet" or "csv".
+        compression (str, optional): "gzip" or "zstd" for CSV; any pyarrow
+            codec ("snappy", "zstd", ...) for Parquet, "none" to disable.
+            Defaults to "snappy" for Parquet and "gzip" for CSV.
+        page_size (int, optional): Records requested per get() call; for trends,
+            the hours covered by one trend.get call.
+        row_group_size (int, optional): Rows per Parquet row group.
+        workers (int, optional): Partitions exported concurrently.
+        overwrite (bool, optional): Re-export partitions whose file already exists.
+
+    Example:
+        >>> exporter = HistoryExporter(zapi, "/data/lake/history", format="parquet", workers=8)
+        >>> exporter.export(["23664", "23665"], time_from=1704067200, time_till=1706745599)
+        {'files': 62, 'rows': 5356800, 'skipped': 0}
+    """
+
+    def __init__(self, client, output_dir, source="history", format="parquet", compression=None,
+                 page_size=50000, row_group_size=100000, workers=4, overwrite=False):
+        if source not in ("history", "trend"):
+            raise ValueError(f"Unknown source: {source}. Must be one of: history, trend")
+        if format not in ("parquet", "csv"):
+            raise ValueError(f"Unknown format: {format}. Must be one of: parquet, csv")
+        self._client = client
+        self.output_dir = output_dir
+        self.source = source
+        self.format = format
+        self.compression = compression if compression is not None else ("snappy" if format == "parquet" else "gzip")
+        self.page_size = page_size
+        self.row_group_size = row_group_size
+        self.workers = workers
+        self.overwrite = overwrite
+        self.columns = HISTORY_COLUMNS if source == "history" else TREND_COLUMNS
+
+    def export(self, itemids, time_from, time_till, value_types=None):
+        """
+        Export all data of the given items between two timestamps (inclusive).
+
+        Args:
+            itemids (list): IDs of the items to export.
+            time_from (int): Start of the range (Unix timestamp).
+            time_till (int): End of the range (Unix timestamp).
+            value_types (dict, optional): itemid -> value_type. Looked up with
+                item.get when not given.
+
+        Returns:
+            dict: Number of files written, rows exported and partitions skipped
+            because their file already existed.
+        """
+        itemids = [str(itemid) for itemid in itemids]
+        if value_types is None:
+            value_types = ItemResolver(self._client).value_types(itemids)
+        missing = [itemid for itemid in itemids if value_types.get(itemid) is None]
+        if missing:
+            raise ValueError(f"Unknown items: {', '.join(missing)}")
+
+        partitions = [
+            (itemid, int(value_types[itemid]), start, end)
+            for itemid in itemids
+            for start, end in self._days(time_from, time_till)
+        ]
+        totals = {"files": 0, "rows": 0, "skipped": 0}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for rows in executor.map(lambda partition: self._export_partition(*partition), partitions):
+                if rows is None:
+                    totals["skipped"] += 1
+                else:
+                    totals["files"] += 1
+                    totals["rows"] += rows
+        return totals
+
+    def partition_path(self, itemid, day_start):
+        """
+        Return the file path of an item/day partition.
+        """
+        day = datetime.fromtimestamp(day_start, tz=timezone.utc).strftime("%Y-%m-%d")
+        extension = "parquet" if self.format == "parquet" else "csv"
+        if self.format == "csv" and self.compression in ("gzip", "zstd"):
+            extension += ".gz" if self.compression == "gzip" else ".zst"
+        return os.path.join(self.output_dir, f"itemid={itemid}", f"date={day}.{extension}")
+
+    def _days(self, time_from, time_till):
+        start = time_from
+        while start <= time_till:
+            end = min(start - start % DAY + DAY - 1, time_till)
+            yield start, end
+            start = end + 1
+
+    def _export_partition(self, itemid, value_type, time_from, time_till):
+        path = self.partition_path(itemid, time_from)
+        if os.path.exists(path) and not self.overwrite:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name so an interrupted export never
+        # leaves a truncated file that looks complete
+        temp_path = path + ".part"
+        if self.format == "parquet":
+            sink = _ParquetSink(temp_path, self.columns, value_type, self.row_group_size, self.compression)
+        else:
+            sink = _CsvSink(temp_path, self.columns, self.compression)
+        rows = 0
+        try:
+            for page in self._pages(itemid, value_type, time_from, time_till):
+                sink.write(page)
+                rows += len(page)
+        finally:
+            sink.close()
+        os.replace(temp_path, path)
+        return rows
+
+    def _pages(self, itemid, value_type, time_from, time_till):
+        if self.source == "trend":
+            return self._trend_pages(itemid, value_type, time_from, time_till)
+        return self._history_pages(itemid, value_type, time_from, time_till)
+
+    def _trend_pages(self, itemid, value_type, time_from, time_till):
+        # trend.get rejects sortfield/sortorder, so the range is walked in
+        # fixed windows of page_size hours instead: an item has one trend
+        # record per hour, which bounds every window to a page. Each window
+        # is sorted locally.
+        convert = _number(value_type)
+        window = self.page_size * 3600
+        while time_from <= time_till:
+            window_till = min(time_from + window - 1, time_till)
+            records = unwrap("trend.get", self._client.trends.get(
+                output="extend",
+                itemids=[itemid],
+                time_from=time_from,
+                time_till=window_till,
+            ))
+            if records:
+                records.sort(key=lambda record: int(record["clock"]))
+                yield [self._row(record, convert) for record in records]
+            time_from = window_till + 1
+
+    def _history_pages(self, itemid, value_type, time_from, time_till):
+        # Page through the range by clock. The next page starts at the last
+        # clock seen, so records on that clock are fetched twice; the ones
+        # already written are recognised by their ns and dropped.
+        convert = _number(value_type)
+        limit = self.page_size
+        boundary, seen = None, set()
+        while time_from <= time_till:
+            params = {
+                "output": "extend",
+                "itemids": [itemid],
+                "time_from": time_from,
+                "time_till": time_till,
+                "history": value_type,
+                "sortfield": "clock",
+                "sortorder": "ASC",
+                "limit": limit,
+            }
+            records = unwrap("history.get", self._client.history.get(**params))
+
+            page = []
+            for record in records:
+                clock, ns = int(record["clock"]), int(record.get("ns", 0))
+                if clock == boundary and ns in seen:
+                    continue
+                if clock != boundary:
+                    boundary, seen = clock, set()
+                seen.add(ns)
+                page.append(self._row(record, convert))
+            if page:
+                yield page
+
+            if len(records) < limit:
+                return
+            if not page:
+                # A full page of records sharing one clock; ask for more at once
+                limit *= 2
+                continue
+            limit = self.page_size
+            time_from = boundary
+
+    def _row(self, record, convert):
+        if self.source == "history":
+            return (int(record["itemid"]), int(record["clock"]), int(record.get("ns", 0)), convert(record["value"]))
+        return (
+            int(record["itemid"]),
+            int(record["clock"]),
+            int(record["num"]),
+            convert(record["value_min"]),
+            convert(record["value_avg"]),
+            convert(record["value_max"]),
+        )
@@ -0,0 +1,163 @@
+# tools/history_cleaner.py
+
+# Chunked, throttled history.clear
+# Large cleanups are cut into batches of items that run on a small pool of
+# workers. In Zabbix 7.0 history.clear takes nothing but an array of item
+# IDs, so a batch is exactly that; clearing part of a time range is not
+# possible through the API. The number of concurrent requests
+# adapts to the observed latency: slow responses mean the database is
+# struggling, so concurrency is halved and the next request waits a bit;
+# fast responses let it grow back to the configured maximum.
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+    from .checkpoint import Checkpoint
+except ImportError:
+    from base import chunked, unwrap
+    from tools.checkpoint import Checkpoint
+
+
+class _AdaptiveLimiter:
+    # Concurrency limit that shrinks on slow responses and grows on fast ones
+
+    def __init__(self, maximum, target_latency, cooldown):
+        self.maximum = maximum
+        self.limit = maximum
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+        self._active = 0
+        self._resume_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, latency):
+        with self._condition:
+            self._active -= 1
+            if latency > self.target_latency:
+                self.limit = max(1, self.limit // 2)
+                self._resume_at = time.monotonic() + self.cooldown
+            elif self.limit < self.maximum:
+                self.limit += 1
+            self._condition.notify_all()
+
+
+class HistoryCleaner:
+    """
+    Clear history for many items in small, throttled history.clear requests.
+
+    The work is split into batches of `batch_size` items. Batches run on up to
+    `max_workers` threads; when a request takes longer than
+    `target_latency` seconds the concurrency is halved and new requests
+    pause for `cooldown` seconds. Finished batches are stored in the
+    checkpoint, so running the same cleanup again only sends what is left.
+
+    Args:
+        history (HistoryResource): Resource used for history.clear.
+        batch_size (int, optional): Items per history.clear request.
+        max_workers (int, optional): Upper bound of concurrent requests.
+        target_latency (float, optional): Latency in seconds above which the cleaner backs off.
+        cooldown (float, optional): Pause in seconds after a slow request.
+        max_retries (int, optional): Retries per batch before it is reported as failed.
+        checkpoint (Checkpoint|str, optional): Checkpoint (or path) recording finished batches.
+        on_progress (callable, optional): Called with the stats dict after every batch.
+
+    Example:
+        >>> cleaner = zapi.history.cleaner(batch_size=50, max_workers=4, checkpoint="clear.json")
+        >>> cleaner.clear(itemids)
+        {'batches': 120, 'done': 120, 'failed': 0, 'cleared': 6000, 'limit': 4}
+    """
+
+    def __init__(self, history, batch_size=100, max_workers=4, target_latency=5.0,
+                 cooldown=2.0, max_retries=3, checkpoint=None, on_progress=None):
+        self._history = history
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.checkpoint = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+        self.on_progress = on_progress
+        self._limiter = _AdaptiveLimiter(max_workers, target_latency, cooldown)
+        self._lock = threading.Lock()
+        self.errors = []
+
+    def plan(self, itemids):
+        """
+        Return the list of batches clear() would send, as lists of item IDs.
+        """
+        itemids = sorted({str(itemid) for itemid in itemids}, key=lambda itemid: (len(itemid), itemid))
+        return list(chunked(itemids, self.batch_size))
+
+    def clear(self, itemids, time_from=None, time_till=None):
+        """
+        Clear the whole history of the given items.
+
+        Returns:
+            dict: Number of batches, batches finished (including ones finished
+            by an earlier run), batches that failed, items cleared as confirmed
+            by the server in this run and the final concurrency limit.
+
+        Raises:
+            ValueError: If time_from or time_till is given; history.clear
+                cannot clear part of an item's history.
+        """
+        if time_from is not None or time_till is not None:
+            raise ValueError("history.clear only clears the whole history of an item; "
+                             "clearing a time window is not supported by the API")
+        batches = self.plan(itemids)
+        key = "history.clear:" + hashlib.sha1(json.dumps(batches).encode()).hexdigest()
+        finished = set(self.checkpoint.get(key, []))
+        stats = {"batches": len(batches), "done": len(finished), "failed": 0, "cleared": 0,
+                 "limit": self._limiter.limit}
+
+        def run(index):
+            try:
+                cleared = self._clear_batch(batches[index])
+            except Exception as error:  # transport failures and API errors alike
+                with self._lock:
+                    stats["failed"] += 1
+                    self.errors.append((batches[index], str(error)))
+                return
+            with self._lock:
+                finished.add(index)
+                stats["done"] += 1
+                stats["cleared"] += cleared
+                stats["limit"] = self._limiter.limit
+                self.checkpoint.set(key, sorted(finished))
+                self.checkpoint.save()
+                if self.on_progress:
+                    self.on_progress(dict(stats))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index in range(len(batches)):
+                if index not in finished:
+                    executor.submit(run, index)
+        return stats
+
+    def _clear_batch(self, itemids):
+        attempt = 0
+        while True:
+            self._limiter.acquire()
+            started = time.monotonic()
+            try:
+                result = unwrap("history.clear", self._history._call_many("history.clear", itemids))
+            except Exception:
+                # Failures count as slow responses so the cleaner backs off
+                self._limiter.release(float("inf"))
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                continue
+            self._limiter.release(time.monotonic() - started)
+            return len((result or {}).get("itemids", itemids))
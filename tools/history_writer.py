@@ -0,0 +1,254 @@
+# tools/history_writer.py
+
+# Buffered writer for history.push
+# Collects values in memory and sends them in batches on a small pool of
+# worker threads, so callers can push values one by one without paying a
+# round trip per value.
+
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import unwrap
+except ImportError:
+    from base import unwrap
+
+
+# A record that history.push rejected, together with the reason
+PushFailure = namedtuple("PushFailure", ["record", "error"])
+
+
+class HistoryWriter:
+    """
+    Buffer history records and push them to Zabbix in concurrent batches.
+
+    Records are flushed when `batch_size` records are buffered or when
+    `flush_interval` seconds have passed, whichever comes first. At most
+    `max_in_flight` history.push requests run at the same time. Once
+    `max_buffer` records are buffered or in flight, write() blocks until
+    room frees up (backpressure).
+
+    Whole batches that fail (network error, API error) are retried with
+    exponential backoff. Values rejected individually by the server (e.g.
+    disabled item) are not retried; they are recorded in `errors` and
+    passed to `on_error`.
+
+    Args:
+        history (HistoryResource): Resource used to send the batches.
+        batch_size (int, optional): Records per history.push request.
+        flush_interval (float, optional): Seconds before a partial batch is sent.
+        max_in_flight (int, optional): Concurrent history.push requests.
+        max_buffer (int, optional): Records buffered or in flight before write() blocks.
+        max_retries (int, optional): Retries for a batch that failed as a whole.
+        retry_backoff (float, optional): Base delay in seconds between retries.
+        on_error (callable, optional): Called with a PushFailure for every rejected record.
+        max_errors (int, optional): Number of most recent failures kept in `errors`.
+
+    Example:
+        >>> with zapi.history.writer(batch_size=5000, max_in_flight=8) as writer:
+        ...     for itemid, value in readings:
+        ...         writer.write(itemid, value)
+        >>> writer.stats()
+        {'sent': 120000, 'failed': 0, 'lost': 0, 'retries': 0, 'pending': 0}
+    """
+
+    def __init__(self, history, batch_size=1000, flush_interval=1.0, max_in_flight=4,
+                 max_buffer=100000, max_retries=3, retry_backoff=0.5, on_error=None,
+                 max_errors=10000):
+        self._history = history
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, batch_size)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.on_error = on_error
+        self.errors = deque(maxlen=max_errors)
+
+        self._buffer = deque()
+        self._pending = 0  # buffered + in flight
+        self._sent = 0
+        self._failed = 0
+        self._lost = 0
+        self._retries = 0
+        self._closed = False
+        self._flush_requested = False
+
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+
+        self._slots = threading.Semaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="history-writer", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, itemid, value, clock=None, ns=None, timeout=None):
+        """
+        Buffer a single value.
+
+        Args:
+            itemid (str): ID of the item the value belongs to.
+            value: Value to push.
+            clock (int, optional): Unix timestamp of the value, defaults to now.
+            ns (int, optional): Nanoseconds part of the timestamp.
+            timeout (float, optional): Seconds to wait for buffer room before
+                raising TimeoutError. Waits indefinitely by default.
+        """
+        if clock is None:
+            now = time.time_ns()
+            clock, ns = now // 1_000_000_000, now % 1_000_000_000
+        self._put([{"itemid": itemid, "clock": clock, "ns": ns or 0, "value": value}], timeout)
+
+    def write_many(self, records, timeout=None):
+        """
+        Buffer several history records at once.
+
+        Args:
+            records (list): Records in history.push format (itemid, clock, ns, value).
+            timeout (float, optional): Seconds to wait for buffer room before
+                raising TimeoutError. Waits indefinitely by default.
+        """
+        self._put(list(records), timeout)
+
+    def flush(self, timeout=None):
+        """
+        Send everything buffered so far and wait until all requests finished.
+
+        Returns:
+            bool: False if `timeout` expired before the writer was idle.
+        """
+        with self._lock:
+            self._flush_requested = True
+            self._wakeup.notify()
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout=None):
+        """
+        Flush the remaining records and stop the worker threads.
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            self._not_full.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Return counters for records sent, failed, retried and still pending.
+
+        "failed" counts every record that did not reach the server; "lost" is
+        the part of it from whole batches given up on after the retries (as
+        opposed to values the server refused one by one).
+        """
+        with self._lock:
+            return {
+                "sent": self._sent,
+                "failed": self._failed,
+                "lost": self._lost,
+                "retries": self._retries,
+                "pending": self._pending,
+            }
+
+    def _put(self, records, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._not_full:
+            start = 0
+            while start < len(records):
+                if self._closed:
+                    raise RuntimeError("HistoryWriter is closed")
+                room = self.max_buffer - self._pending
+                if room <= 0:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("HistoryWriter buffer is full")
+                    self._not_full.wait(remaining)
+                    continue
+                taken = records[start:start + room]
+                self._buffer.extend(taken)
+                self._pending += len(taken)
+                start += len(taken)
+                if len(self._buffer) >= self.batch_size:
+                    self._wakeup.notify()
+
+    def _dispatch(self):
+        # Single thread that cuts the buffer into batches and hands them to the pool
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                while (not self._closed and not self._flush_requested
+                       and len(self._buffer) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                if not self._buffer:
+                    self._flush_requested = False
+                    if self._closed:
+                        return
+                    continue
+                size = min(self.batch_size, len(self._buffer))
+                batch = [self._buffer.popleft() for _ in range(size)]
+            # Blocks while max_in_flight requests are running
+            self._slots.acquire()
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = unwrap("history.push", self._history.push(history=batch))
+                    break
+                except Exception as error:  # transport failures and API errors alike
+                    if attempt >= self.max_retries:
+                        self._record_failures([PushFailure(record, str(error)) for record in batch], lost=True)
+                        return
+                    attempt += 1
+                    with self._lock:
+                        self._retries += 1
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            self._report(batch, result)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._pending -= len(batch)
+                self._not_full.notify_all()
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def _report(self, batch, result):
+        # history.push answers with one entry per record, in input order;
+        # an entry with an "error" key means that record was rejected
+        data = (result or {}).get("data") or []
+        failures = [
+            PushFailure(record, entry["error"])
+            for record, entry in zip(batch, data)
+            if isinstance(entry, dict) and entry.get("error")
+        ]
+        with self._lock:
+            self._sent += len(batch) - len(failures)
+        if failures:
+            self._record_failures(failures)
+
+    def _record_failures(self, failures, lost=False):
+        with self._lock:
+            self._failed += len(failures)
+            if lost:
+                self._lost += len(failures)
+            self.errors.extend(failures)
+        if self.on_error:
+            for failure in failures:
+                self.on_error(failure)
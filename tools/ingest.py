@@ -0,0 +1,405 @@
+# tools/ingest.py
+
+# Streaming ingestion of history files (CSV, NDJSON, Parquet) into history.push
+# Files are read in bounded chunks, rows are mapped to item IDs through a
+# cached ItemResolver, values are coerced to the item's value type and the
+# records are pushed through a HistoryWriter. After every chunk that
+# reached the server, the file offset is stored in a checkpoint so an
+# interrupted backfill can resume. Values the server refuses one by one are
+# reported as rejected rows; a batch lost after the writer's retries stops
+# the file before its chunk.
+#
+# Command line usage (from the repository root):
+#   python -m tools.ingest metrics.csv backfill/*.ndjson --environment prod \
+#       --checkpoint backfill.checkpoint.json --workers 8
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from datetime import datetime, timezone
+
+try:
+    from ..base import chunked
+    from .checkpoint import Checkpoint
+    from .resolver import ItemResolver
+except ImportError:
+    from base import chunked
+    from tools.checkpoint import Checkpoint
+    from tools.resolver import ItemResolver
+
+
+# Item value types (item.value_type)
+VALUE_TYPE_FLOAT = 0
+VALUE_TYPE_CHAR = 1
+VALUE_TYPE_LOG = 2
+VALUE_TYPE_UNSIGNED = 3
+VALUE_TYPE_TEXT = 4
+VALUE_TYPE_BINARY = 5
+
+UNSIGNED_MAX = 2 ** 64 - 1
+CHAR_MAX_LENGTH = 255
+
+# Default mapping of record fields to file columns
+DEFAULT_COLUMNS = {
+    "itemid": "itemid",
+    "host": "host",
+    "key": "key",
+    "clock": "clock",
+    "ns": "ns",
+    "value": "value",
+}
+
+
+def coerce_value(value, value_type):
+    """
+    Convert a raw value to what history.push expects for the given value type.
+
+    Raises:
+        ValueError: If the value does not fit the value type.
+    """
+    if value is None or value == "":
+        raise ValueError("empty value")
+    if value_type == VALUE_TYPE_FLOAT:
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"non-finite float {value!r}")
+        return number
+    if value_type == VALUE_TYPE_UNSIGNED:
+        try:
+            number = int(value)
+        except ValueError:
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError(f"non-integer value {value!r} for unsigned item")
+            number = int(number)
+        if not 0 <= number <= UNSIGNED_MAX:
+            raise ValueError(f"value {value!r} out of unsigned range")
+        return number
+    if value_type == VALUE_TYPE_CHAR:
+        text = str(value)
+        if len(text) > CHAR_MAX_LENGTH:
+            raise ValueError(f"character value longer than {CHAR_MAX_LENGTH}")
+        return text
+    if value_type in (VALUE_TYPE_LOG, VALUE_TYPE_TEXT):
+        return str(value)
+    raise ValueError(f"value type {value_type} cannot be pushed")
+
+
+def parse_clock(clock, ns=None):
+    """
+    Split a timestamp into (clock, ns).
+
+    Accepts Unix timestamps (int, float or numeric string) and ISO 8601
+    strings; naive ISO timestamps are taken as UTC.
+    """
+    if clock is None or clock == "":
+        raise ValueError("missing clock")
+    if isinstance(clock, datetime):
+        moment = clock
+    else:
+        try:
+            seconds = float(clock)
+        except ValueError:
+            moment = datetime.fromisoformat(str(clock))
+        else:
+            whole = int(seconds)
+            if ns in (None, ""):
+                return whole, int(round((seconds - whole) * 1_000_000_000))
+            return whole, int(ns)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    whole = int(moment.timestamp())
+    return whole, int(ns) if ns not in (None, "") else moment.microsecond * 1000
+
+
+def read_csv(path, offset=0, delimiter=","):
+    """
+    Yield (row, next_offset) for each row of a CSV file with a header line.
+
+    The offset is a byte position, so resuming does not re-parse the rows
+    before it.
+    """
+    with open(path, "rb") as file:
+        header = next(csv.reader([file.readline().decode("utf-8-sig")], delimiter=delimiter))
+        if offset:
+            file.seek(offset)
+        lines = (line.decode("utf-8") for line in iter(file.readline, b""))
+        for fields in csv.reader(lines, delimiter=delimiter):
+            if fields:
+                yield dict(zip(header, fields)), file.tell()
+
+
+def read_ndjson(path, offset=0):
+    """
+    Yield (row, next_offset) for each JSON object of a newline-delimited JSON file.
+    """
+    with open(path, "rb") as file:
+        if offset:
+            file.seek(offset)
+        for line in iter(file.readline, b""):
+            if line.strip():
+                yield json.loads(line), file.tell()
+
+
+def read_parquet(path, offset=0, batch_size=65536):
+    """
+    Yield (row, next_offset) for each row of a Parquet file.
+
+    The offset is a row number; row groups before it are skipped without
+    being read. Requires pyarrow.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+
+    parquet = pq.ParquetFile(path)
+    position = 0
+    first_group = parquet.num_row_groups
+    for index in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(index).num_rows
+        if position + rows > offset:
+            first_group = index
+            break
+        position += rows
+    groups = list(range(first_group, parquet.num_row_groups))
+    if not groups:
+        return
+    for batch in parquet.iter_batches(batch_size=batch_size, row_groups=groups):
+        for row in batch.to_pylist():
+            position += 1
+            if position > offset:
+                yield row, position
+
+
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+    "parquet": read_parquet,
+}
+
+
+def detect_format(path):
+    """
+    Guess the file format from its extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    if extension in (".csv", ".tsv", ".txt"):
+        return "csv"
+    raise ValueError(f"Cannot detect the format of {path}, pass format= explicitly")
+
+
+class IngestPipeline:
+    """
+    Stream history files into Zabbix through history.push.
+
+    Every row needs a value, a clock and either an itemid or a host name and
+    item key. Rows that cannot be mapped to an item or whose value does not
+    fit the item's value type are rejected and reported through `on_reject`.
+
+    Args:
+        client (ZabbixClient): Client used to resolve items and push history.
+        checkpoint (Checkpoint|str, optional): Checkpoint (or path to one) that
+            stores per-file progress. Completed files are skipped on later runs.
+        chunk_size (int, optional): Rows read, pushed and checkpointed at a time.
+        columns (dict, optional): Overrides of DEFAULT_COLUMNS, e.g. {"key": "item_key"}.
+        resolver (ItemResolver, optional): Shared resolver, one is created otherwise.
+        on_reject (callable, optional): Called with (row, reason) for every rejected row.
+        on_progress (callable, optional): Called with (path, state) after every chunk.
+        **writer_options: Passed to HistoryWriter (batch_size, max_in_flight, ...).
+
+    Example:
+        >>> pipeline = IngestPipeline(zapi, checkpoint="backfill.json", max_in_flight=8)
+        >>> pipeline.run(["2024-01.csv", "2024-02.parquet"])
+        {'rows': 2000000, 'pushed': 1999950, 'rejected': 50, 'failed': 0}
+    """
+
+    def __init__(self, client, checkpoint=None, chunk_size=50000, columns=None, resolver=None,
+                 on_reject=None, on_progress=None, **writer_options):
+        self._client = client
+        self.checkpoint = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+        self.chunk_size = chunk_size
+        self.columns = {**DEFAULT_COLUMNS, **(columns or {})}
+        self.resolver = resolver or ItemResolver(client)
+        self.on_reject = on_reject
+        self.on_progress = on_progress
+        self.writer_options = writer_options
+
+    def run(self, paths, format=None):
+        """
+        Ingest several files, one after another, through a shared writer.
+
+        Returns:
+            dict: Totals of rows read, records pushed, rows rejected (locally
+            or refused by the server) and records lost in batches that failed
+            as a whole.
+        """
+        totals = {"rows": 0, "pushed": 0, "rejected": 0, "failed": 0}
+        refused = []
+        on_error = self.writer_options.get("on_error")
+
+        def collect(failure):
+            refused.append(failure)
+            if on_error:
+                on_error(failure)
+
+        with self._client.history.writer(**{**self.writer_options, "on_error": collect}) as writer:
+            for path in paths:
+                state = self._ingest(path, format, writer, refused)
+                for name in ("rows", "pushed", "rejected"):
+                    totals[name] += state["session_" + name]
+        totals["failed"] = writer.stats()["lost"]
+        return totals
+
+    def ingest(self, path, format=None):
+        """
+        Ingest a single file, see run().
+        """
+        return self.run([path], format)
+
+    def _ingest(self, path, format, writer, refused):
+        key = os.path.abspath(path)
+        state = dict(self.checkpoint.get(key) or {"offset": 0, "rows": 0, "pushed": 0, "rejected": 0})
+        state.update(session_rows=0, session_pushed=0, session_rejected=0)
+        if state.get("done"):
+            return state
+
+        reader = READERS[format or detect_format(path)]
+        for rows in chunked(reader(path, state["offset"]), self.chunk_size):
+            records, rejected, sources = self._prepare(row for row, _ in rows)
+            lost = writer.stats()["lost"]
+            refused.clear()
+            writer.write_many(records)
+            # Only checkpoint once everything up to this offset reached the server
+            writer.flush()
+            if writer.stats()["lost"] > lost:
+                # A batch of this chunk was given up on after retries: stop here,
+                # leaving the checkpoint before the chunk so that a later run
+                # pushes it again instead of skipping it
+                return state
+            # Values the server refused one by one (wrong item type, value out
+            # of range, ...) would be refused again; they are rejected rows
+            for failure in refused:
+                rejected += 1
+                if self.on_reject:
+                    self.on_reject(sources.get(id(failure.record), failure.record), failure.error)
+            state["offset"] = rows[-1][1]
+            pushed = len(records) - len(refused)
+            for name, count in (("rows", len(rows)), ("pushed", pushed), ("rejected", rejected)):
+                state[name] += count
+                state["session_" + name] += count
+            self._save(key, state)
+            if self.on_progress:
+                self.on_progress(path, state)
+        state["done"] = True
+        self._save(key, state)
+        return state
+
+    def _save(self, key, state):
+        persisted = {name: value for name, value in state.items() if not name.startswith("session_")}
+        self.checkpoint.set(key, persisted, save=True)
+
+    def _prepare(self, rows):
+        columns = self.columns
+        rows = list(rows)
+        pairs = set()
+        itemids = set()
+        for row in rows:
+            if row.get(columns["itemid"]) not in (None, ""):
+                itemids.add(str(row[columns["itemid"]]))
+            elif columns["host"] in row and columns["key"] in row:
+                pairs.add((row[columns["host"]], row[columns["key"]]))
+        resolved = self.resolver.resolve(pairs) if pairs else {}
+        value_types = self.resolver.value_types(itemids) if itemids else {}
+
+        records = []
+        rejected = 0
+        sources = {}  # id(record) -> row, to report rows the server refuses
+        for row in rows:
+            try:
+                itemid = row.get(columns["itemid"])
+                if itemid not in (None, ""):
+                    itemid = str(itemid)
+                    value_type = value_types[itemid]
+                    if value_type is None:
+                        raise ValueError(f"unknown itemid {itemid}")
+                else:
+                    if columns["host"] not in row or columns["key"] not in row:
+                        raise ValueError("row has neither itemid nor host and key")
+                    item = resolved[(row[columns["host"]], row[columns["key"]])]
+                    if item is None:
+                        raise ValueError(f"unknown item {row[columns['key']]!r} on host {row[columns['host']]!r}")
+                    itemid, value_type = item
+                clock, ns = parse_clock(row.get(columns["clock"]), row.get(columns["ns"]))
+                value = coerce_value(row.get(columns["value"]), value_type)
+            except (TypeError, ValueError) as error:
+                rejected += 1
+                if self.on_reject:
+                    self.on_reject(row, str(error))
+                continue
+            record = {"itemid": itemid, "clock": clock, "ns": ns, "value": value}
+            records.append(record)
+            sources[id(record)] = row
+        return records, rejected, sources
+
+
+def main(argv=None):
+    try:
+        from ..client import ZabbixClient
+    except ImportError:
+        from client import ZabbixClient
+
+    parser = argparse.ArgumentParser(description="Backfill history files into Zabbix through history.push.")
+    parser.add_argument("paths", nargs="+", help="CSV, NDJSON or Parquet files to ingest")
+    parser.add_argument("--environment", default="dev", help="Configuration environment (default: dev)")
+    parser.add_argument("--format", choices=sorted(READERS), help="File format (default: from extension)")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume interrupted runs")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per checkpointed chunk")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per history.push request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent history.push requests")
+    parser.add_argument("--column", action="append", default=[], metavar="FIELD=COLUMN",
+                        help="Map a record field to a file column, e.g. key=item_key")
+    parser.add_argument("--rejects", help="Write rejected rows to this NDJSON file")
+    args = parser.parse_args(argv)
+
+    columns = dict(mapping.split("=", 1) for mapping in args.column)
+    rejects = open(args.rejects, "a", encoding="utf-8") if args.rejects else None
+
+    def on_reject(row, reason):
+        if rejects:
+            rejects.write(json.dumps({"row": row, "reason": reason}, default=str) + "\n")
+
+    def on_progress(path, state):
+        print(f"{path}: {state['rows']} rows, {state['pushed']} pushed, {state['rejected']} rejected",
+              file=sys.stderr)
+
+    client = ZabbixClient(environment=args.environment)
+    pipeline = IngestPipeline(
+        client,
+        checkpoint=args.checkpoint,
+        chunk_size=args.chunk_size,
+        columns=columns,
+        on_reject=on_reject,
+        on_progress=on_progress,
+        batch_size=args.batch_size,
+        max_in_flight=args.workers,
+        max_buffer=max(args.chunk_size, args.batch_size * args.workers * 2),
+    )
+    try:
+        totals = pipeline.run(args.paths, args.format)
+    finally:
+        if rejects:
+            rejects.close()
+    print(json.dumps(totals))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
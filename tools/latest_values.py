@@ -0,0 +1,147 @@
+# tools/latest_values.py
+
+# In-memory table of the last value of many items
+# Each refresh asks item.get for nothing but itemid/lastvalue/lastclock/lastns,
+# split into ID chunks fetched in parallel, and reports only the items
+# whose lastclock/lastns moved since the previous refresh.
+
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+except ImportError:
+    from base import chunked, unwrap
+
+
+# A value that changed between two refreshes
+LatestValue = namedtuple("LatestValue", ["itemid", "value", "clock", "ns"])
+
+FIELDS = ["itemid", "lastvalue", "lastclock", "lastns"]
+
+
+class LatestValues:
+    """
+    Keep the last value of a large set of items up to date.
+
+    Items are given either as IDs or as item.get filters (hostids, groupids,
+    ...). Filters are expanded to item IDs once, with output=["itemid"];
+    call reload_items() to pick up new items. Values are held in a compact
+    table: clocks in arrays, values in a list, both indexed by slot.
+
+    Args:
+        client (ZabbixClient): Client used for item.get.
+        itemids (list, optional): Items to track.
+        chunk_size (int, optional): Item IDs per item.get request.
+        workers (int, optional): Concurrent item.get requests.
+        **filters: item.get filters selecting the items to track when no IDs are given.
+
+    Example:
+        >>> latest = LatestValues(zapi, groupids=["4"], chunk_size=5000, workers=8)
+        >>> for changes in latest.stream(interval=30):
+        ...     publish([change._asdict() for change in changes])
+    """
+
+    def __init__(self, client, itemids=None, chunk_size=5000, workers=4, **filters):
+        if itemids is None and not filters:
+            raise ValueError("Pass itemids or item.get filters to select the items to track")
+        self._client = client
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.filters = filters
+        self._filtered = itemids is None
+        self._itemids = [str(itemid) for itemid in itemids] if itemids is not None else None
+        self._slots = {}  # itemid -> slot
+        self._ids = []
+        self._values = []
+        self._clocks = array("q")
+        self._ns = array("l")
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, itemid):
+        return str(itemid) in self._slots
+
+    def get(self, itemid):
+        """
+        Return the cached LatestValue of an item, or None if it has no value yet.
+        """
+        slot = self._slots.get(str(itemid))
+        if slot is None or not self._clocks[slot]:
+            return None
+        return LatestValue(self._ids[slot], self._values[slot], self._clocks[slot], self._ns[slot])
+
+    def items(self):
+        """
+        Iterate over the LatestValue of every item that has a value.
+        """
+        for slot, itemid in enumerate(self._ids):
+            if self._clocks[slot]:
+                yield LatestValue(itemid, self._values[slot], self._clocks[slot], self._ns[slot])
+
+    def reload_items(self):
+        """
+        Expand the item.get filters to item IDs again (no-op for a fixed ID list).
+        """
+        if self._filtered:
+            self._itemids = None
+        self._resolve_itemids()
+
+    def refresh(self):
+        """
+        Fetch the latest values and update the table.
+
+        Returns:
+            list: LatestValue for every item whose lastclock/lastns changed.
+            The first refresh reports every item that has a value.
+        """
+        itemids = self._resolve_itemids()
+        changes = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for items in executor.map(self._fetch, chunked(itemids, self.chunk_size)):
+                for item in items:
+                    change = self._update(item)
+                    if change:
+                        changes.append(change)
+        return changes
+
+    def stream(self, interval=30.0):
+        """
+        Refresh every `interval` seconds and yield the list of changes each time.
+        """
+        while True:
+            started = time.monotonic()
+            yield self.refresh()
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def _resolve_itemids(self):
+        if self._itemids is None:
+            items = unwrap("item.get", self._client.items.get(output=["itemid"], **self.filters))
+            self._itemids = [item["itemid"] for item in items]
+        return self._itemids
+
+    def _fetch(self, itemids):
+        return unwrap("item.get", self._client.items.get(output=FIELDS, itemids=itemids))
+
+    def _update(self, item):
+        itemid = item["itemid"]
+        clock = int(item.get("lastclock") or 0)
+        ns = int(item.get("lastns") or 0)
+        slot = self._slots.get(itemid)
+        if slot is None:
+            slot = self._slots[itemid] = len(self._ids)
+            self._ids.append(itemid)
+            self._values.append(None)
+            self._clocks.append(0)
+            self._ns.append(0)
+        elif self._clocks[slot] == clock and self._ns[slot] == ns:
+            return None
+        if not clock:
+            return None
+        self._values[slot] = item.get("lastvalue")
+        self._clocks[slot] = clock
+        self._ns[slot] = ns
+        return LatestValue(itemid, self._values[slot], clock, ns)
@@ -0,0 +1,281 @@
+# tools/macros.py
+
+# Local resolution of user macros
+# The effective value of {$MACRO} on a host comes from the host's own
+# macros, then the macros of its templates (level by level: the directly
+# linked templates sorted by ID, then the templates those link, ...), then
+# the global macros. For a context macro {$MACRO:"ctx"} every level of the
+# chain is searched for the exact context, then for a matching regex
+# context, before the next level; only if no level has either is the chain
+# searched for the macro without context. Instead of asking the API step by
+# step, all macros and template links are bulk-loaded once (four requests)
+# and every host is resolved in memory. Inheritance chains and resolved
+# values are cached per host and dropped only for the hosts a reload
+# touches.
+
+import re
+import threading
+
+try:
+    from ..base import unwrap
+    from .template_graph import TemplateGraph
+except ImportError:
+    from base import unwrap
+    from tools.template_graph import TemplateGraph
+
+
+GLOBAL = "global"
+
+# Cached result of a macro that is not defined anywhere
+_MISSING = object()
+
+MACRO = re.compile(r"^\{\$([A-Z0-9_.]+)(?::\s*(.*?))?\}$", re.DOTALL)
+
+
+def parse_macro(macro):
+    """
+    Split a user macro into (name, context, is_regex).
+
+    Example:
+        >>> parse_macro('{$LOW_SPACE_LIMIT:"/var"}')
+        ('LOW_SPACE_LIMIT', '/var', False)
+        >>> parse_macro('{$LOW_SPACE_LIMIT:regex:"^/var"}')
+        ('LOW_SPACE_LIMIT', '^/var', True)
+        >>> parse_macro('{$LOW_SPACE_LIMIT}')
+        ('LOW_SPACE_LIMIT', None, False)
+    """
+    match = MACRO.match(macro.strip())
+    if match is None:
+        raise ValueError(f"Not a user macro: {macro!r}")
+    name, context = match.groups()
+    if context is None:
+        return name, None, False
+    is_regex = context.startswith("regex:")
+    if is_regex:
+        context = context[len("regex:"):].lstrip()
+    if context.startswith('"') and context.endswith('"') and len(context) >= 2:
+        context = context[1:-1].replace('\\"', '"')
+    return name, context, is_regex
+
+
+class _Macros:
+    # Macros of one host, template or the global level, indexed by name
+    __slots__ = ("plain", "exact", "regex")
+
+    def __init__(self):
+        self.plain = {}
+        self.exact = {}
+        self.regex = {}
+
+    def add(self, macro, value):
+        name, context, is_regex = parse_macro(macro)
+        if context is None:
+            self.plain[name] = value
+        elif is_regex:
+            try:
+                pattern = re.compile(context)
+            except re.error:  # PCRE syntax Python does not support; never matches
+                return
+            self.regex.setdefault(name, []).append((pattern, value))
+        else:
+            self.exact[(name, context)] = value
+
+
+class MacroResolver:
+    """
+    Resolve user macros of many hosts in memory.
+
+    Args:
+        client (ZabbixClient): Client used for usermacro.get, host.get and template.get.
+
+    Example:
+        >>> macros = zapi.user_macro.resolver()
+        >>> macros.resolve("10084", '{$LOW_SPACE_LIMIT:"/var"}')
+        '15'
+        >>> macros.resolve_many(hostids, "{$SNMP_COMMUNITY}")
+        {'10084': 'public', '10085': 'private', ...}
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.templates = TemplateGraph(client, hosts=False)
+        self._macros = {}       # hostid/templateid/GLOBAL -> _Macros
+        self._links = {}        # hostid -> templateids linked directly
+        self._chains = {}       # hostid/templateid -> owners in resolution order
+        self._resolved = {}     # hostid -> {macro: value}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Load every host, template and global macro and the template links.
+
+        Returns:
+            MacroResolver: self.
+        """
+        self.templates = TemplateGraph(self._client, hosts=False).load()
+        hosts = unwrap("host.get", self._client.host.get(output=["hostid"], selectParentTemplates=["templateid"]))
+        macros = unwrap("usermacro.get", self._client.user_macro.get(output=["hostid", "macro", "value"]))
+        global_macros = unwrap("usermacro.get", self._client.user_macro.get(output=["macro", "value"], globalmacro=True))
+        with self._lock:
+            self._links = {host["hostid"]: [parent["templateid"] for parent in host["parentTemplates"]] for host in hosts}
+            self._macros = {}
+            self._index(macros, global_macros)
+            self._chains.clear()
+            self._resolved.clear()
+        return self
+
+    def chain(self, hostid):
+        """
+        Return the owners searched for macros of a host or template, in order
+        (the host itself, its templates level by level, then GLOBAL).
+        """
+        hostid = str(hostid)
+        with self._lock:
+            chain = self._chains.get(hostid)
+            if chain is None:
+                chain = self._chains[hostid] = self._build_chain(hostid)
+            return chain
+
+    def effective(self, hostid):
+        """
+        Return {macro: value} of every macro defined for a host, its templates
+        or globally, with the value that applies to the host.
+        """
+        effective = {}
+        for owner in reversed(self.chain(hostid)):
+            macros = self._macros.get(owner)
+            if macros is None:
+                continue
+            effective.update((f"{{${name}}}", value) for name, value in macros.plain.items())
+            effective.update((f'{{${name}:"{context}"}}', value) for (name, context), value in macros.exact.items())
+            effective.update(
+                (f'{{${name}:regex:"{pattern.pattern}"}}', value)
+                for name, patterns in macros.regex.items() for pattern, value in patterns
+            )
+        return effective
+
+    def origin(self, hostid, macro):
+        """
+        Return the owner (host ID, template ID or GLOBAL) whose definition of
+        `macro` applies to a host, or None if the macro is not defined.
+        """
+        return self._lookup(hostid, macro)[1]
+
+    def reload(self, ids):
+        """
+        Re-read the macros and template links of some hosts and/or templates,
+        dropping the cached results of every host that inherits from them.
+
+        Args:
+            ids (list): Host and template IDs.
+        """
+        ids = [str(objectid) for objectid in ids]
+        hosts = unwrap("host.get", self._client.host.get(
+            output=["hostid"], selectParentTemplates=["templateid"], hostids=ids,
+        ))
+        templates = unwrap("template.get", self._client.templates.get(
+            output=["templateid", "host"], selectParentTemplates=["templateid", "host"], templateids=ids,
+        ))
+        macros = unwrap("usermacro.get", self._client.user_macro.get(output=["hostid", "macro", "value"], hostids=ids))
+        with self._lock:
+            affected = self._affected(ids)
+            for objectid in ids:
+                self._macros.pop(objectid, None)
+                self._links.pop(objectid, None)
+            for host in hosts:
+                self._links[host["hostid"]] = [parent["templateid"] for parent in host["parentTemplates"]]
+            for template in templates:
+                self.templates.replace(template["templateid"], [parent["templateid"] for parent in template["parentTemplates"]])
+            self._index(macros, [])
+            affected |= self._affected(ids)
+            self._forget(affected)
+
+    def reload_global(self):
+        """
+        Re-read the global macros, dropping every cached result.
+        """
+        global_macros = unwrap("usermacro.get", self._client.user_macro.get(output=["macro", "value"], globalmacro=True))
+        with self._lock:
+            self._macros.pop(GLOBAL, None)
+            self._index([], global_macros)
+            self._resolved.clear()
+
+    def resolve(self, hostid, macro, default=None):
+        """
+        Return the value of `macro` ({$NAME} or {$NAME:"context"}) effective on a host.
+
+        Args:
+            hostid (str): Host (or template) ID.
+            macro (str): User macro, as written in an item key, trigger expression, ...
+            default (optional): Returned when the macro is not defined anywhere.
+                Secret macros resolve to None, as the API does not return their value.
+        """
+        hostid = str(hostid)
+        cached = self._resolved.get(hostid)
+        if cached is not None and macro in cached:
+            value = cached[macro]
+        else:
+            value = self._lookup(hostid, macro)[0]
+            with self._lock:
+                self._resolved.setdefault(hostid, {})[macro] = value
+        return default if value is _MISSING else value
+
+    def resolve_many(self, hostids, macro, default=None):
+        """
+        Return {hostid: value} of `macro` for many hosts.
+        """
+        return {str(hostid): self.resolve(hostid, macro, default) for hostid in hostids}
+
+    def _affected(self, ids):
+        # Hosts/templates whose chain contains one of `ids`
+        ids = set(ids)
+        templateids = {objectid for objectid in ids if objectid in self.templates}
+        templateids |= self.templates.dependents(templateids)
+        owners = ids | templateids
+        owners.update(hostid for hostid, linked in self._links.items() if templateids.intersection(linked))
+        return owners
+
+    def _build_chain(self, hostid):
+        chain, seen = [hostid], {hostid}
+        level = self._links.get(hostid)
+        if level is None:
+            level = self.templates.requires(hostid)
+        while level:
+            level = sorted({templateid for templateid in level if templateid not in seen}, key=int)
+            chain.extend(level)
+            seen.update(level)
+            level = [parent for templateid in level for parent in self.templates.requires(templateid)]
+        chain.append(GLOBAL)
+        return tuple(chain)
+
+    def _forget(self, owners):
+        for owner in owners:
+            self._chains.pop(owner, None)
+            self._resolved.pop(owner, None)
+
+    def _index(self, macros, global_macros):
+        for macro in macros:
+            self._macros.setdefault(macro["hostid"], _Macros()).add(macro["macro"], macro.get("value"))
+        for macro in global_macros:
+            self._macros.setdefault(GLOBAL, _Macros()).add(macro["macro"], macro.get("value"))
+
+    def _lookup(self, hostid, macro):
+        name, context, is_regex = parse_macro(macro)
+        chain = self.chain(hostid)
+        if context is not None and not is_regex:
+            # Every owner is asked for an exact, then a regex context match
+            # before the next (less specific) owner is
+            for owner in chain:
+                macros = self._macros.get(owner)
+                if macros is None:
+                    continue
+                if (name, context) in macros.exact:
+                    return macros.exact[(name, context)], owner
+                for pattern, value in macros.regex.get(name, ()):
+                    if pattern.search(context):
+                        return value, owner
+        for owner in chain:
+            macros = self._macros.get(owner)
+            if macros is not None and name in macros.plain:
+                return macros.plain[name], owner
+        return _MISSING, None
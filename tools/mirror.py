@@ -0,0 +1,292 @@
+# tools/mirror.py
+
+# Local mirror of configuration objects kept current from the audit log
+# The first load fetches every host, item, trigger and template once.
+# After that, refresh() reads the audit log records written since the last
+# refresh (through a Harvester) and re-fetches only the objects they name,
+# so the cost of a refresh follows the change rate instead of the size of
+# the inventory. The mirror can be saved to and loaded from a directory.
+
+import gzip
+import json
+import os
+import time
+
+try:
+    from ..base import chunked, unwrap
+    from .checkpoint import Checkpoint
+    from .harvester import Harvester
+except ImportError:
+    from base import chunked, unwrap
+    from tools.checkpoint import Checkpoint
+    from tools.harvester import Harvester
+
+
+# Audit log actions
+AUDIT_ACTION_ADD = "0"
+AUDIT_ACTION_UPDATE = "1"
+AUDIT_ACTION_DELETE = "2"
+
+# Mirrored object types: API method, audit log resource type, client attribute,
+# ID property, get() parameter taking IDs and the get() parameters used to fetch
+MIRRORED_TYPES = {
+    "host": {
+        "method": "host.get",
+        "resourcetype": "4",
+        "resource": "host",
+        "id": "hostid",
+        "ids_param": "hostids",
+        "params": {"output": "extend", "selectParentTemplates": ["templateid"], "selectHostGroups": ["groupid"]},
+    },
+    "template": {
+        "method": "template.get",
+        "resourcetype": "30",
+        "resource": "templates",
+        "id": "templateid",
+        "ids_param": "templateids",
+        "params": {"output": "extend", "selectParentTemplates": ["templateid"], "selectTemplateGroups": ["groupid"]},
+    },
+    "item": {
+        "method": "item.get",
+        "resourcetype": "15",
+        "resource": "items",
+        "id": "itemid",
+        "ids_param": "itemids",
+        "params": {"output": "extend"},
+    },
+    "trigger": {
+        "method": "trigger.get",
+        "resourcetype": "13",
+        "resource": "triggers",
+        "id": "triggerid",
+        "ids_param": "triggerids",
+        "params": {"output": "extend", "selectHosts": ["hostid"]},
+    },
+    "host_group": {
+        "method": "hostgroup.get",
+        "resourcetype": "14",
+        "resource": "host_group",
+        "id": "groupid",
+        "ids_param": "groupids",
+        "params": {"output": "extend"},
+    },
+    "value_map": {
+        "method": "valuemap.get",
+        "resourcetype": "17",
+        "resource": "value_map",
+        "id": "valuemapid",
+        "ids_param": "valuemapids",
+        "params": {"output": "extend", "selectMappings": "extend"},
+    },
+    "user_macro": {
+        "method": "usermacro.get",
+        "resourcetype": "29",
+        "resource": "user_macro",
+        "id": "hostmacroid",
+        "ids_param": "hostmacroids",
+        "params": {"output": "extend"},
+    },
+}
+
+# Types mirrored when none are given
+DEFAULT_TYPES = ("host", "template", "item", "trigger")
+
+# Types whose objects belong to a host or template and follow its changes
+DEPENDENT_TYPES = ("item", "trigger", "value_map", "user_macro")
+
+
+class ConfigMirror:
+    """
+    In-memory (and optionally on-disk) copy of hosts, templates, items and
+    triggers, refreshed incrementally from auditlog.get.
+
+    Deleting a host or template drops the objects that belong to it (items,
+    triggers, value maps, macros). Adding or updating one re-fetches those
+    as well, since linking templates creates inherited objects. Objects that are not found when
+    re-fetched are removed.
+
+    Args:
+        client (ZabbixClient): Client used for the get() calls.
+        types (tuple, optional): Object types to mirror, keys of MIRRORED_TYPES.
+        path (str, optional): Directory the mirror is saved to and loaded from.
+        chunk_size (int, optional): IDs per get() request when re-fetching.
+        overlap (int, optional): Seconds of audit log re-read on every refresh
+            to catch records committed late.
+
+    Example:
+        >>> mirror = ConfigMirror(zapi, path="mirror")
+        >>> mirror.open()           # full load on the first run, cheap afterwards
+        >>> changes = mirror.refresh()
+        >>> changes
+        {'host': 2, 'template': 0, 'item': 57, 'trigger': 12}
+        >>> mirror.objects["host"]["10105"]["name"]
+        'web01'
+    """
+
+    def __init__(self, client, types=DEFAULT_TYPES, path=None, chunk_size=1000, overlap=60):
+        unknown = [name for name in types if name not in MIRRORED_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown object types: {', '.join(unknown)}")
+        self._client = client
+        self.types = tuple(types)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.objects = {name: {} for name in self.types}
+        self._checkpoint = Checkpoint(os.path.join(path, "mirror.json") if path else None)
+        # The harvester moves its mark in memory only; save() persists it
+        # together with the objects, so the mark never runs ahead of the data
+        self._marks = Checkpoint()
+        self._harvester = None
+
+    def open(self):
+        """
+        Load the mirror from disk if it was saved before, otherwise do a full load.
+        """
+        if self.path and self._checkpoint.get("auditlog") is not None:
+            self._marks.state = dict(self._checkpoint.state)
+            for name in self.types:
+                with gzip.open(self._file(name), "rt", encoding="utf-8") as file:
+                    self.objects[name] = json.load(file)
+            self._harvester = self._make_harvester()
+            self.refresh()
+        else:
+            self.load()
+
+    def load(self):
+        """
+        Fetch every mirrored object with one get() per type.
+        """
+        # Start the audit log mark before loading; changes made while loading
+        # are applied again by the next refresh, which is harmless
+        started = int(time.time())
+        for name in self.types:
+            spec = MIRRORED_TYPES[name]
+            objects = self._get(name, **spec["params"])
+            self.objects[name].clear()
+            self.objects[name].update((obj[spec["id"]], obj) for obj in objects)
+        self._marks.set("auditlog", {"clock": started, "seen": {}})
+        self._harvester = self._make_harvester()
+        self.save()
+
+    def refresh(self):
+        """
+        Apply the changes recorded in the audit log since the last refresh.
+
+        Returns:
+            dict: Number of objects re-fetched or removed per type.
+        """
+        if self._harvester is None:
+            self.load()
+            return {name: 0 for name in self.types}
+
+        changed = {name: set() for name in self.types}
+        deleted = {name: set() for name in self.types}
+        by_resourcetype = {MIRRORED_TYPES[name]["resourcetype"]: name for name in self.types}
+
+        def collect(records):
+            for record in records:
+                name = by_resourcetype.get(str(record["resourcetype"]))
+                if name is None:
+                    continue
+                target = deleted if str(record["action"]) == AUDIT_ACTION_DELETE else changed
+                target[name].add(record["resourceid"])
+
+        # The harvester moves its mark while reading; if applying the changes
+        # fails, the mark is put back so the next refresh reads them again
+        harvester = self._harvester
+        marks = (harvester.clock, dict(harvester.seen), dict(self._marks.state))
+        try:
+            harvester.run_once(collect)
+            counts = {name: 0 for name in self.types}
+
+            owners = deleted.get("host", set()) | deleted.get("template", set())
+            if owners:
+                self._remove_dependents(owners)
+
+            for name in self.types:
+                for objectid in deleted[name]:
+                    counts[name] += self._remove(name, objectid)
+                counts[name] += self._refetch(name, ids=changed[name] - deleted[name])
+
+            # Linking templates or changing a host creates and removes inherited objects
+            owners = changed.get("host", set()) | changed.get("template", set())
+            for name in DEPENDENT_TYPES:
+                if name in self.types and owners:
+                    counts[name] += self._refetch(name, hostids=owners)
+        except BaseException:
+            harvester.clock, harvester.seen, self._marks.state = marks
+            raise
+
+        self.save()
+        return counts
+
+    def save(self):
+        """
+        Write the mirror and the audit log mark to `path` (no-op without a path).
+        """
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        for name in self.types:
+            temp_path = self._file(name) + ".part"
+            with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+                json.dump(self.objects[name], file, separators=(",", ":"))
+            os.replace(temp_path, self._file(name))
+        # The mark goes last: a crash in between only means re-applying changes
+        self._checkpoint.state = dict(self._marks.state)
+        self._checkpoint.save()
+
+    def _make_harvester(self):
+        resourcetypes = [MIRRORED_TYPES[name]["resourcetype"] for name in self.types]
+        return Harvester(
+            self._client.auditlogs, "auditid", checkpoint=self._marks, cursor_key="auditlog",
+            overlap=self.overlap,
+            output=["auditid", "clock", "action", "resourcetype", "resourceid"],
+            filter={"resourcetype": resourcetypes},
+        )
+
+    def _get(self, name, **params):
+        spec = MIRRORED_TYPES[name]
+        return unwrap(spec["method"], getattr(self._client, spec["resource"]).get(**params))
+
+    def _refetch(self, name, ids=None, hostids=None):
+        # Re-fetch by object IDs or by owning host/template IDs and replace
+        # what the mirror holds for them
+        spec = MIRRORED_TYPES[name]
+        param, keys = (spec["ids_param"], ids) if ids is not None else ("hostids", hostids)
+        count = 0
+        for chunk in chunked(sorted(keys), self.chunk_size):
+            objects = self._get(name, **spec["params"], **{param: chunk})
+            found = {obj[spec["id"]]: obj for obj in objects}
+            if ids is not None:
+                stale = set(chunk) - set(found)
+            else:
+                stale = set(self._owned(name, set(chunk))) - set(found)
+            for objectid in stale:
+                count += self._remove(name, objectid)
+            self.objects[name].update(found)
+            count += len(found)
+        return count
+
+    def _remove(self, name, objectid):
+        return 1 if self.objects[name].pop(objectid, None) is not None else 0
+
+    def _remove_dependents(self, owners):
+        for name in DEPENDENT_TYPES:
+            if name in self.types:
+                for objectid in self._owned(name, owners):
+                    del self.objects[name][objectid]
+
+    def _owned(self, name, owners):
+        # IDs of the mirrored objects that belong to one of the given hosts/templates
+        return [objectid for objectid, obj in self.objects[name].items() if self._owners(obj) & owners]
+
+    @staticmethod
+    def _owners(obj):
+        if "hostid" in obj:
+            return {obj["hostid"]}
+        return {host["hostid"] for host in obj.get("hosts", [])}
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.json.gz")
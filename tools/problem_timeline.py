@@ -0,0 +1,260 @@
+# tools/problem_timeline.py
+
+# Reconstruction of the open problem set at a past point in time
+# Looking at the past is cheap once r_eventid is known: a problem event
+# names its recovery event, so replaying events in eventid order just adds
+# problem events and drops the problem a recovery event points back to.
+# Snapshots of the open set are persisted at regular clock boundaries;
+# a query loads the closest snapshot before T and replays the events
+# between it and T. The last materialised state is kept in memory, so a
+# series of queries moving forward in time only replays the difference.
+# Replays rely on eventids growing with event clocks, as Zabbix assigns them.
+# The replayed event stream is limited by scope filters only, since
+# recovery events do not carry the severity and tags of their problems;
+# severity and tag filters are applied to problem events instead.
+
+import gzip
+import json
+import os
+
+try:
+    from ..base import chunked, unwrap
+    from .event_follower import iter_event_pages, matches_problem, scope_filters
+except ImportError:
+    from base import chunked, unwrap
+    from tools.event_follower import iter_event_pages, matches_problem, scope_filters
+
+
+EVENT_FIELDS = ["eventid", "objectid", "clock", "value", "name", "severity", "r_eventid"]
+
+
+class _OpenSet:
+    # Open problems after applying every event up to `cursor` (eventid) / `clock`
+
+    def __init__(self, problems=None, cursor=0, clock=0):
+        self.problems = problems or {}
+        self.cursor = cursor
+        self.clock = clock
+        self._recoveries = {}  # r_eventid -> {eventid}, one OK event can close several problems
+        self._unknown = {}  # objectid -> {eventid} of problems stored before they recovered
+        for problem in self.problems.values():
+            self._track(problem)
+
+    def apply(self, event):
+        if event["value"] == "1":
+            problem = {
+                "eventid": event["eventid"],
+                "objectid": event["objectid"],
+                "clock": int(event["clock"]),
+                "name": event.get("name", ""),
+                "severity": int(event.get("severity", 0)),
+                "r_eventid": event.get("r_eventid", "0"),
+                "hosts": [host["hostid"] for host in event.get("hosts", [])],
+            }
+            self.problems[problem["eventid"]] = problem
+            self._track(problem)
+        else:
+            for eventid in self._recoveries.pop(event["eventid"], ()):
+                problem = self.problems.pop(eventid, None)
+                if problem is not None:
+                    self._unknown.get(problem["objectid"], set()).discard(eventid)
+        self.cursor = max(self.cursor, int(event["eventid"]))
+
+    def stale(self, event):
+        # Open problems of a recovery event's trigger that were stored while
+        # still open (r_eventid "0") and may be the ones it closes
+        if event["value"] == "1" or event["eventid"] in self._recoveries:
+            return []
+        return sorted(self._unknown.get(event.get("objectid"), ()), key=int)
+
+    def recovered_by(self, eventid, r_eventid):
+        problem = self.problems.get(eventid)
+        if problem is not None and r_eventid != "0":
+            self._unknown.get(problem["objectid"], set()).discard(eventid)
+            problem["r_eventid"] = r_eventid
+            self._track(problem)
+
+    def _track(self, problem):
+        if problem["r_eventid"] != "0":
+            self._recoveries.setdefault(problem["r_eventid"], set()).add(problem["eventid"])
+        else:
+            self._unknown.setdefault(problem["objectid"], set()).add(problem["eventid"])
+
+    def copy(self):
+        return _OpenSet({eventid: dict(problem) for eventid, problem in self.problems.items()}, self.cursor, self.clock)
+
+
+class ProblemTimeline:
+    """
+    Answer "which problems were open at time T" from snapshots plus event deltas.
+
+    Without any snapshot the state at T is rebuilt directly from the problem
+    events created before T (optionally limited to `lookback` seconds) and
+    the clocks of their recovery events. build() walks a period once and
+    stores a snapshot every `snapshot_interval` seconds, after which any
+    query in that period replays at most one interval of events.
+
+    Args:
+        client (ZabbixClient): Client used for event.get.
+        snapshot_dir (str, optional): Directory for persisted snapshots. Without
+            it snapshots are only kept in memory.
+        snapshot_interval (int, optional): Seconds between snapshots taken by build().
+        lookback (int, optional): When rebuilding without a snapshot, ignore
+            problems that started more than this many seconds before T.
+        page_size (int, optional): Events per event.get request.
+        **filters: event.get filters limiting the problems (groupids, hostids,
+            severities, tags, evaltype, ...).
+
+    Example:
+        >>> timeline = ProblemTimeline(zapi, snapshot_dir="snapshots", snapshot_interval=3600)
+        >>> timeline.build(time_from=incident_start - 86400, time_till=incident_end)
+        >>> firing = timeline.at(incident_start + 12 * 60)
+        >>> len(firing), firing[0]["name"]
+        (1312, 'Interface eth0 down')
+    """
+
+    def __init__(self, client, snapshot_dir=None, snapshot_interval=3600, lookback=None, page_size=5000, **filters):
+        self._client = client
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = snapshot_interval
+        self.lookback = lookback
+        self.page_size = page_size
+        self.filters = {"source": 0, "object": 0, **filters}
+        self._snapshots = {}  # clock -> _OpenSet in memory, or None when only on disk
+        self._loaded = None  # (clock, _OpenSet) of the last snapshot read from disk
+        self._current = None
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            for name in os.listdir(snapshot_dir):
+                if name.startswith("snapshot-") and name.endswith(".json.gz"):
+                    self._snapshots[int(name[len("snapshot-"):-len(".json.gz")])] = None
+
+    def at(self, timestamp):
+        """
+        Return the problems that were open at `timestamp`, oldest first.
+
+        Returns:
+            list: Problem dicts (eventid, objectid, clock, name, severity,
+            r_eventid, hosts).
+        """
+        timestamp = int(timestamp)
+        state = self._state_before(timestamp)
+        self._replay(state, timestamp)
+        self._current = state
+        return sorted((dict(problem) for problem in state.problems.values()), key=lambda problem: int(problem["eventid"]))
+
+    def build(self, time_from, time_till):
+        """
+        Walk a period once and store a snapshot at every interval boundary.
+
+        Returns:
+            int: Number of snapshots taken.
+        """
+        state = self._state_before(time_from)
+        self._replay(state, time_from)
+        boundary = time_from - time_from % self.snapshot_interval + self.snapshot_interval
+        taken = 0
+        for page in iter_event_pages(self._client.events, state.cursor, self.page_size, **self._stream(time_till)):
+            for event in page:
+                while int(event["clock"]) > boundary and boundary <= time_till:
+                    state.clock = boundary
+                    self._save(state)
+                    taken += 1
+                    boundary += self.snapshot_interval
+                self._apply(state, event)
+        while boundary <= time_till:
+            state.clock = boundary
+            self._save(state)
+            taken += 1
+            boundary += self.snapshot_interval
+        state.clock = time_till
+        self._current = state
+        return taken
+
+    def _state_before(self, timestamp):
+        # Latest known state not after `timestamp`: the in-memory one or a snapshot
+        candidates = [clock for clock in self._snapshots if clock <= timestamp]
+        best = max(candidates) if candidates else None
+        if self._current is not None and self._current.clock <= timestamp and (best is None or self._current.clock >= best):
+            return self._current
+        if best is not None:
+            return self._load(best).copy()
+        return self._rebuild(timestamp)
+
+    def _apply(self, state, event):
+        if event["value"] == "1" and not matches_problem(event, self.filters):
+            state.cursor = max(state.cursor, int(event["eventid"]))
+            return
+        stale = state.stale(event)
+        if stale:
+            # Problems persisted while open do not know their recovery event yet
+            for problem in unwrap("event.get", self._client.events.get(output=["eventid", "r_eventid"], eventids=stale)):
+                state.recovered_by(problem["eventid"], problem.get("r_eventid", "0"))
+        state.apply(event)
+
+    def _replay(self, state, timestamp):
+        if timestamp <= state.clock:
+            return
+        for page in iter_event_pages(self._client.events, state.cursor, self.page_size, **self._stream(timestamp)):
+            for event in page:
+                self._apply(state, event)
+        state.clock = timestamp
+
+    def _stream(self, time_till):
+        # Problem and recovery events in scope; severities and tags are checked in _apply()
+        params = {**scope_filters(self.filters), "output": EVENT_FIELDS, "selectHosts": ["hostid"], "time_till": time_till}
+        if self.filters.get("tags"):
+            params["selectTags"] = ["tag", "value"]
+        return params
+
+    def _rebuild(self, timestamp):
+        # Problems created up to T that were either never recovered or recovered after T
+        params = {
+            **self.filters,
+            "output": EVENT_FIELDS,
+            "selectHosts": ["hostid"],
+            "value": 1,
+            "time_till": timestamp,
+        }
+        if self.lookback:
+            params["time_from"] = timestamp - self.lookback
+        state = _OpenSet(clock=timestamp)
+        recovered = set()  # recovery eventids; one can close several problems
+        for page in iter_event_pages(self._client.events, 0, self.page_size, **params):
+            for event in page:
+                state.apply(event)
+                if event.get("r_eventid", "0") != "0":
+                    recovered.add(event["r_eventid"])
+        for chunk in chunked(sorted(recovered), self.page_size):
+            events = unwrap("event.get", self._client.events.get(output=["eventid", "clock"], eventids=chunk))
+            for event in events:
+                if int(event["clock"]) <= timestamp:
+                    state.apply({"eventid": event["eventid"], "value": "0"})
+        # Later replays continue after the newest event that existed at T
+        latest = unwrap("event.get", self._client.events.get(
+            output=["eventid"], time_till=timestamp, sortfield="eventid", sortorder="DESC", limit=1,
+        ))
+        state.cursor = int(latest[0]["eventid"]) if latest else 0
+        return state
+
+    def _path(self, clock):
+        return os.path.join(self.snapshot_dir, f"snapshot-{clock}.json.gz")
+
+    def _save(self, state):
+        snapshot = state.copy()
+        self._snapshots[snapshot.clock] = None if self.snapshot_dir else snapshot
+        if self.snapshot_dir:
+            path = self._path(snapshot.clock)
+            with gzip.open(path + ".part", "wt", encoding="utf-8") as file:
+                json.dump({"clock": snapshot.clock, "cursor": snapshot.cursor, "problems": snapshot.problems}, file)
+            os.replace(path + ".part", path)
+
+    def _load(self, clock):
+        snapshot = self._snapshots.get(clock)
+        if snapshot is not None:
+            return snapshot
+        if self._loaded is None or self._loaded[0] != clock:
+            with gzip.open(self._path(clock), "rt", encoding="utf-8") as file:
+                data = json.load(file)
+            self._loaded = (clock, _OpenSet(data["problems"], data["cursor"], data["clock"]))
+        return self._loaded[1]
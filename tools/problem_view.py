@@ -0,0 +1,239 @@
+# tools/problem_view.py
+
+# Materialised set of open problems
+# The set is loaded once with problem.get and then kept current from new
+# events: problem events (value=1) are added, and when a recovery event
+# (value=0) arrives the open problems of that trigger are asked for their
+# r_eventid to see which ones it closed. The event stream is limited by
+# scope filters only (groups, hosts, ...), because recovery events do not
+# have the severity and tags of the problems they close; severity and tag
+# filters are applied to problem events as they are added. A cheap countOutput check catches
+# anything the event stream does not show (e.g. changes made while the
+# view was not updated) and triggers a full reload.
+
+import time
+
+try:
+    from ..base import chunked, unwrap
+    from .event_follower import EventFollower, matches_problem, scope_filters
+except ImportError:
+    from base import chunked, unwrap
+    from tools.event_follower import EventFollower, matches_problem, scope_filters
+
+
+EVENT_FIELDS = [
+    "eventid", "source", "object", "objectid", "clock", "ns", "value", "name",
+    "severity", "acknowledged", "r_eventid", "opdata", "suppressed",
+]
+
+PROBLEM_ADDED = "added"
+PROBLEM_RESOLVED = "resolved"
+
+
+class ProblemView:
+    """
+    In-memory view of open trigger problems, updated incrementally from events.
+
+    Problems are kept as problem.get-style dicts with an extra "hosts" list
+    and are indexed by host, severity and tag. Callbacks registered with
+    subscribe() are called with (PROBLEM_ADDED | PROBLEM_RESOLVED, problem).
+
+    Args:
+        client (ZabbixClient): Client used for problem.get and event.get.
+        check_interval (float, optional): Seconds between countOutput
+            consistency checks done by sync().
+        page_size (int, optional): Events per event.get request.
+        **filters: problem.get filters limiting the view (groupids, hostids,
+            severities, tags, evaltype, ...). New events are matched against
+            the scope, severity and tag filters; other filters only take
+            effect on load().
+
+    Example:
+        >>> view = ProblemView(zapi, groupids=["4"])
+        >>> view.subscribe(lambda change, problem: print(change, problem["name"]))
+        >>> view.load()
+        >>> while True:
+        ...     view.sync()
+        ...     escalate(view.by_severity(5))
+        ...     time.sleep(10)
+    """
+
+    def __init__(self, client, check_interval=300, page_size=1000, **filters):
+        self._client = client
+        self.check_interval = check_interval
+        self.page_size = page_size
+        self.filters = {"source": 0, "object": 0, **filters}
+        self.problems = {}  # eventid -> problem
+        self._by_host = {}
+        self._by_severity = {}
+        self._by_tag = {}
+        self._by_trigger = {}
+        self._callbacks = []
+        self._follower = None
+        self._last_check = 0.0
+
+    def __len__(self):
+        return len(self.problems)
+
+    def __contains__(self, eventid):
+        return str(eventid) in self.problems
+
+    def subscribe(self, callback):
+        """
+        Register a callback called with (change, problem) for every added or resolved problem.
+        """
+        self._callbacks.append(callback)
+
+    def by_host(self, hostid):
+        """
+        Return the open problems of a host.
+        """
+        return self._lookup(self._by_host, str(hostid))
+
+    def by_severity(self, severity):
+        """
+        Return the open problems with the given severity.
+        """
+        return self._lookup(self._by_severity, str(severity))
+
+    def by_tag(self, tag, value=None):
+        """
+        Return the open problems carrying a tag, optionally with a given value.
+        """
+        return self._lookup(self._by_tag, (tag, value))
+
+    def load(self):
+        """
+        (Re)load the full problem set with problem.get.
+
+        Changes against the current view are reported to the callbacks, so
+        a reload after a failed consistency check behaves like an update.
+        """
+        # Take the event cursor first: events created while the problems are
+        # loaded are replayed afterwards, and replaying is idempotent
+        latest = unwrap("event.get", self._client.events.get(
+            output=["eventid"], sortfield="eventid", sortorder="DESC", limit=1,
+        ))
+        cursor = latest[0]["eventid"] if latest else 0
+        problems = unwrap("problem.get", self._client.problems.get(
+            output="extend", selectTags="extend", **self.filters,
+        ))
+        self._attach_hosts(problems)
+
+        loaded = {problem["eventid"]: problem for problem in problems}
+        for eventid in [eventid for eventid in self.problems if eventid not in loaded]:
+            self._remove(eventid)
+        for eventid, problem in loaded.items():
+            if eventid not in self.problems:
+                self._add(problem)
+
+        self._follower = EventFollower(
+            self._client.events, start=cursor, page_size=self.page_size,
+            output=EVENT_FIELDS, **scope_filters(self.filters),
+        )
+        self._last_check = time.monotonic()
+        self.update()
+
+    def update(self):
+        """
+        Apply the events created since the last update.
+
+        Returns:
+            int: Number of events applied.
+        """
+        if self._follower is None:
+            self.load()
+            return 0
+        events = self._follower.poll()
+        recovered_triggers = set()
+        for event in events:
+            if event["value"] == "1":
+                if event["eventid"] in self.problems or event.get("r_eventid", "0") != "0":
+                    continue
+                if matches_problem(event, self.filters):
+                    event["tags"] = event.get("tags", [])
+                    event["hosts"] = [host["hostid"] for host in event.get("hosts", [])]
+                    self._add(event)
+            elif event["objectid"] in self._by_trigger:
+                recovered_triggers.add(event["objectid"])
+        if recovered_triggers:
+            self._apply_recoveries(recovered_triggers)
+        return len(events)
+
+    def check(self):
+        """
+        Compare the number of open problems with the server and reload on mismatch.
+
+        Returns:
+            bool: True if the view was consistent.
+        """
+        self._last_check = time.monotonic()
+        count = int(unwrap("problem.get", self._client.problems.get(countOutput=True, **self.filters)))
+        if count == len(self.problems):
+            return True
+        self.load()
+        return False
+
+    def sync(self):
+        """
+        Apply new events and run the consistency check when it is due.
+        """
+        self.update()
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.check()
+
+    def _apply_recoveries(self, triggerids):
+        # Ask the open problems of the recovered triggers for their r_eventid:
+        # a problem is closed once it names a recovery event
+        eventids = sorted({eventid for triggerid in triggerids for eventid in self._by_trigger[triggerid]})
+        for chunk in chunked(eventids, self.page_size):
+            events = unwrap("event.get", self._client.events.get(output=["eventid", "r_eventid"], eventids=chunk))
+            for event in events:
+                if event.get("r_eventid", "0") != "0":
+                    self._remove(event["eventid"])
+
+    def _attach_hosts(self, problems):
+        # problem.get cannot select hosts; fetch them through event.get
+        hosts = {}
+        for chunk in chunked([problem["eventid"] for problem in problems], self.page_size):
+            events = unwrap("event.get", self._client.events.get(
+                output=["eventid"], eventids=chunk, selectHosts=["hostid"],
+            ))
+            for event in events:
+                hosts[event["eventid"]] = [host["hostid"] for host in event.get("hosts", [])]
+        for problem in problems:
+            problem["hosts"] = hosts.get(problem["eventid"], [])
+
+    def _keys(self, problem):
+        yield self._by_trigger, problem["objectid"]
+        yield self._by_severity, str(problem["severity"])
+        for hostid in problem["hosts"]:
+            yield self._by_host, hostid
+        for tag in problem["tags"]:
+            yield self._by_tag, (tag["tag"], None)
+            yield self._by_tag, (tag["tag"], tag.get("value", ""))
+
+    def _add(self, problem):
+        self.problems[problem["eventid"]] = problem
+        for index, key in self._keys(problem):
+            index.setdefault(key, set()).add(problem["eventid"])
+        self._notify(PROBLEM_ADDED, problem)
+
+    def _remove(self, eventid):
+        problem = self.problems.pop(eventid, None)
+        if problem is None:
+            return
+        for index, key in self._keys(problem):
+            eventids = index.get(key)
+            if eventids is not None:
+                eventids.discard(eventid)
+                if not eventids:
+                    del index[key]
+        self._notify(PROBLEM_RESOLVED, problem)
+
+    def _lookup(self, index, key):
+        return [self.problems[eventid] for eventid in sorted(index.get(key, ()), key=int)]
+
+    def _notify(self, change, problem):
+        for callback in self._callbacks:
+            callback(change, problem)
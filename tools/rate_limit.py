@@ -0,0 +1,43 @@
+# tools/rate_limit.py
+
+# Token bucket shared by the worker threads of the bulk tools
+# Keeps the request rate against the frontend below a fixed number of
+# requests per second while still allowing short bursts.
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Allow at most `rate` acquisitions per second, with bursts up to `burst`.
+
+    Args:
+        rate (float): Sustained requests per second. None or 0 disables the limit.
+        burst (int, optional): Requests allowed back to back (default: rate, at least 1).
+
+    Example:
+        >>> limiter = RateLimiter(rate=20)
+        >>> limiter.acquire()  # blocks until a request may be sent
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
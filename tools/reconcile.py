@@ -0,0 +1,408 @@
+# tools/reconcile.py
+
+# Desired-state reconciliation of hosts
+# The desired state (typically exported from a CMDB) is compared with what
+# host.get returns, and only the differences become API calls. Differences
+# shared by many hosts are merged into single mass calls: adding a group to
+# 5000 hosts is one host.massadd, disabling 200 hosts is one host.massupdate.
+# Per-host differences are sent as batched host.update arrays, interface
+# changes as host_interface.replacehostinterfaces. A plan can be printed
+# (dry run) before it is applied on a worker pool.
+
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import ZabbixAPIError, chunked, unwrap
+except ImportError:
+    from base import ZabbixAPIError, chunked, unwrap
+
+
+# Properties compared on interfaces
+INTERFACE_FIELDS = ("type", "main", "useip", "ip", "dns", "port")
+
+# Managed properties that are not plain host fields
+RELATED_FIELDS = ("host", "groups", "templates", "macros", "tags", "interfaces")
+
+# Plain host fields host.massupdate accepts; changes to others (name, ...) go to host.update
+MASS_UPDATE_FIELDS = {
+    "status", "description", "inventory_mode", "monitored_by", "proxyid", "proxy_groupid",
+    "ipmi_authtype", "ipmi_privilege", "ipmi_username", "ipmi_password",
+    "tls_connect", "tls_accept", "tls_issuer", "tls_subject",
+}
+
+# Calls are applied phase by phase; calls inside a phase run in parallel.
+# Templates are unlinked before any are linked: a template sharing item
+# keys with one being replaced cannot be linked while the other still is.
+# Groups are removed after the additions: a host moved from one group to
+# another must not be left without any group on the way.
+PHASE_GROUPS = 0
+PHASE_UNLINK = 1
+PHASE_HOSTS = 2
+PHASE_REMOVE = 3
+PHASE_DELETE = 4
+
+PlannedCall = namedtuple("PlannedCall", ["phase", "resource", "method", "params", "hosts"])
+PlannedCall.__doc__ = """
+One API call of a plan. `params` is a dict, or a list for array calls
+(batched host.create/host.update, host.delete). `hosts` lists the technical
+names of the hosts the call affects.
+"""
+
+CallResult = namedtuple("CallResult", ["call", "result", "error"])
+
+
+def _freeze(value):
+    # Hashable form of a JSON-like value, for grouping identical changes
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _normalize_tags(tags):
+    if isinstance(tags, dict):
+        tags = [{"tag": tag, "value": value} for tag, value in tags.items()]
+    return sorted({(str(tag["tag"]), str(tag.get("value", ""))) for tag in tags})
+
+
+def _normalize_macros(macros):
+    if isinstance(macros, dict):
+        macros = [{"macro": macro, "value": value} for macro, value in macros.items()]
+    return {
+        macro["macro"]: (str(macro.get("value", "")), str(macro.get("type", 0)), macro.get("description", ""))
+        for macro in macros
+    }
+
+
+def _normalize_interfaces(interfaces):
+    normalized = []
+    for interface in interfaces:
+        key = tuple(str(interface.get(field, "")) for field in INTERFACE_FIELDS)
+        details = {name: str(value) for name, value in (interface.get("details") or {}).items()}
+        normalized.append(key + (_freeze(details) if details else "",))
+    return sorted(normalized)
+
+
+class Plan:
+    """
+    Ordered list of PlannedCall produced by Reconciler.plan().
+
+    str(plan) renders the dry run: one line per call with the hosts it touches.
+    """
+
+    def __init__(self, calls, unchanged=0):
+        self.calls = sorted(calls, key=lambda call: call.phase)
+        self.unchanged = unchanged
+
+    def __len__(self):
+        return len(self.calls)
+
+    def __iter__(self):
+        return iter(self.calls)
+
+    def summary(self):
+        """
+        Return the number of calls per API method plus the number of unchanged hosts.
+        """
+        counts = {}
+        for call in self.calls:
+            counts[call.method] = counts.get(call.method, 0) + 1
+        counts["unchanged"] = self.unchanged
+        return counts
+
+    def __str__(self):
+        lines = []
+        for call in self.calls:
+            hosts = ", ".join(call.hosts[:5]) + (f" (+{len(call.hosts) - 5})" if len(call.hosts) > 5 else "")
+            target = f" [{len(call.hosts)} hosts: {hosts}]" if call.hosts else ""
+            if isinstance(call.params, dict):
+                details = {key: value for key, value in call.params.items() if key not in ("hosts", "hostids", "hostid")}
+            else:
+                details = {"objects": len(call.params)}
+            lines.append(f"{call.method}{target} {json.dumps(details, default=str)}")
+        lines.append(f"{self.unchanged} hosts unchanged")
+        return "\n".join(lines)
+
+
+class Reconciler:
+    """
+    Bring hosts to a desired state with as few API calls as possible.
+
+    Each desired host is a dict with the technical name `host` and any of:
+    plain host fields (name, status, description, ...), `groups` and
+    `templates` (names or IDs), `macros` and `tags` (dicts or lists of
+    API objects) and `interfaces` (list of interface objects). Only the
+    properties present in a desired host are managed; the others are left
+    as they are. Groups that do not exist yet are created.
+
+    Args:
+        client (ZabbixClient): Client used for the get and write calls.
+        scope (dict, optional): host.get filters selecting the hosts managed by
+            the reconciler (e.g. {"groupids": ["42"]}). Needed for `prune`.
+        prune (bool, optional): Delete hosts in `scope` that are not desired.
+        clear_templates (bool, optional): Unlink removed templates with
+            templateids_clear (removing inherited entities) instead of templateids.
+        chunk_size (int, optional): Hosts per host.get page and per array call.
+        workers (int, optional): Concurrent requests.
+
+    Example:
+        >>> reconciler = Reconciler(zapi, scope={"groupids": ["42"]}, prune=True)
+        >>> plan = reconciler.plan(cmdb_hosts)
+        >>> print(plan)                    # dry run
+        host.massadd [312 hosts: web01, web02, ...] {"groups": [{"groupid": "17"}]}
+        host.update [3 hosts: db01, db02, db03] {"objects": 3}
+        29688 hosts unchanged
+        >>> failed = [result for result in reconciler.apply(plan) if result.error]
+    """
+
+    def __init__(self, client, scope=None, prune=False, clear_templates=False, chunk_size=500, workers=4):
+        if prune and not scope:
+            raise ValueError("prune requires a scope selecting the managed hosts")
+        self._client = client
+        self.scope = dict(scope or {})
+        self.prune = prune
+        self.clear_templates = clear_templates
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def current(self, names=None):
+        """
+        Fetch the current state of the given hosts (or of every host in scope).
+
+        Hosts are fetched in pages of `chunk_size`, by name or, for the whole
+        scope, by host ID after one host.get that lists the IDs.
+
+        Returns:
+            dict: host name -> host object with groups, parent templates, macros, tags and interfaces.
+        """
+        params = {
+            **self.scope,
+            "output": "extend",
+            "selectHostGroups": ["groupid"],
+            "selectParentTemplates": ["templateid"],
+            "selectMacros": "extend",
+            "selectTags": ["tag", "value"],
+            "selectInterfaces": "extend",
+        }
+        if names is None:
+            hosts = unwrap("host.get", self._client.host.get(**self.scope, output=["hostid"]))
+            hostids = sorted((host["hostid"] for host in hosts), key=int)
+            batches = [{**params, "hostids": chunk} for chunk in chunked(hostids, self.chunk_size)]
+        else:
+            batches = [{**params, "filter": {"host": chunk}} for chunk in chunked(sorted(names), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pages = pool.map(lambda batch: unwrap("host.get", self._client.host.get(**batch)), batches)
+            return {host["host"]: host for page in pages for host in page}
+
+    def plan(self, desired):
+        """
+        Compare the desired hosts with the current state and plan the calls.
+
+        Args:
+            desired (iterable): Desired host dicts, see the class docstring.
+
+        Returns:
+            Plan: Calls needed to reach the desired state.
+        """
+        desired = {host["host"]: host for host in desired}
+        names = None if self.prune else set(desired)
+        current = self.current(names)
+        calls = []
+
+        groups = self._groups(desired.values(), calls)
+        templates = self._templates(desired.values())
+
+        creates = []
+        updates = {}  # host name -> changed fields
+        shared = {}  # frozen fields -> (fields, [host names])
+        massadd = {}
+        massremove = {}
+        unlink = {}
+        unchanged = 0
+
+        for name, want in desired.items():
+            have = current.get(name)
+            if have is None:
+                creates.append(self._create(want, groups, templates))
+                continue
+            changed = False
+            hostid = have["hostid"]
+
+            fields = {
+                field: value for field, value in want.items()
+                if field not in RELATED_FIELDS and str(have.get(field)) != str(value)
+            }
+            if "tags" in want and _normalize_tags(want["tags"]) != _normalize_tags(have.get("tags", [])):
+                fields["tags"] = [{"tag": tag, "value": value} for tag, value in _normalize_tags(want["tags"])]
+            if "macros" in want and self._macros_differ(want["macros"], have.get("macros", [])):
+                fields["macros"] = self._macros(want["macros"])
+            mass_fields = {field: value for field, value in fields.items() if field in MASS_UPDATE_FIELDS | {"tags", "macros"}}
+            own_fields = {field: value for field, value in fields.items() if field not in mass_fields}
+            if mass_fields:
+                shared.setdefault(_freeze(mass_fields), (mass_fields, []))[1].append(name)
+            if own_fields:
+                updates[name] = own_fields
+            changed |= bool(fields)
+
+            add, remove = {}, {}
+            if "groups" in want:
+                want_groups = {groups[group] for group in want["groups"]}
+                have_groups = {group["groupid"] for group in have.get("hostgroups", [])}
+                add["groups"] = sorted(want_groups - have_groups)
+                remove["groups"] = sorted(have_groups - want_groups)
+            if "templates" in want:
+                want_templates = {templates[template] for template in want["templates"]}
+                have_templates = {template["templateid"] for template in have.get("parentTemplates", [])}
+                add["templates"] = sorted(want_templates - have_templates)
+                remove["templates"] = sorted(have_templates - want_templates)
+            add = {key: value for key, value in add.items() if value}
+            unlinked = remove.pop("templates", None)
+            remove = {key: value for key, value in remove.items() if value}
+            if add:
+                massadd.setdefault(_freeze(add), (add, []))[1].append(name)
+            if remove:
+                massremove.setdefault(_freeze(remove), (remove, []))[1].append(name)
+            if unlinked:
+                unlink.setdefault(_freeze(unlinked), (unlinked, []))[1].append(name)
+            changed |= bool(add or remove or unlinked)
+
+            if "interfaces" in want:
+                if _normalize_interfaces(want["interfaces"]) != _normalize_interfaces(have.get("interfaces", [])):
+                    calls.append(PlannedCall(PHASE_HOSTS, "host_interface", "hostinterface.replacehostinterfaces",
+                                             {"hostid": hostid, "interfaces": want["interfaces"]}, [name]))
+                    changed = True
+            unchanged += not changed
+
+        for chunk in chunked(creates, self.chunk_size):
+            calls.append(PlannedCall(PHASE_HOSTS, "host", "host.create", chunk, [host["host"] for host in chunk]))
+
+        # Changes shared by several hosts become one host.massupdate; the rest
+        # are merged into each host's own host.update
+        for fields, hosts in shared.values():
+            if len(hosts) > 1:
+                calls.append(PlannedCall(PHASE_HOSTS, "host", "host.massupdate",
+                                         {"hosts": [{"hostid": current[name]["hostid"]} for name in hosts], **fields}, hosts))
+            else:
+                updates.setdefault(hosts[0], {}).update(fields)
+        for chunk in chunked(sorted(updates), self.chunk_size):
+            objects = [{"hostid": current[name]["hostid"], **updates[name]} for name in chunk]
+            calls.append(PlannedCall(PHASE_HOSTS, "host", "host.update", objects, chunk))
+
+        for add, hosts in massadd.values():
+            params = {"hosts": [{"hostid": current[name]["hostid"]} for name in hosts]}
+            if "groups" in add:
+                params["groups"] = [{"groupid": groupid} for groupid in add["groups"]]
+            if "templates" in add:
+                params["templates"] = [{"templateid": templateid} for templateid in add["templates"]]
+            calls.append(PlannedCall(PHASE_HOSTS, "host", "host.massadd", params, hosts))
+
+        for templateids, hosts in unlink.values():
+            params = {"hostids": [current[name]["hostid"] for name in hosts]}
+            params["templateids_clear" if self.clear_templates else "templateids"] = templateids
+            calls.append(PlannedCall(PHASE_UNLINK, "host", "host.massremove", params, hosts))
+
+        for remove, hosts in massremove.values():
+            params = {"hostids": [current[name]["hostid"] for name in hosts], "groupids": remove["groups"]}
+            calls.append(PlannedCall(PHASE_REMOVE, "host", "host.massremove", params, hosts))
+
+        if self.prune:
+            extra = sorted(name for name in current if name not in desired)
+            for chunk in chunked(extra, self.chunk_size):
+                calls.append(PlannedCall(PHASE_DELETE, "host", "host.delete",
+                                         [current[name]["hostid"] for name in chunk], chunk))
+
+        return Plan(calls, unchanged)
+
+    def apply(self, plan):
+        """
+        Execute a plan phase by phase, running the calls of a phase in parallel.
+
+        Returns:
+            list: CallResult(call, result, error) per call, in plan order. `error`
+            is the ZabbixAPIError of a rejected call.
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for phase in sorted({call.phase for call in plan}):
+                calls = [call for call in plan if call.phase == phase]
+                results += pool.map(self._execute, calls)
+                if phase == PHASE_GROUPS:
+                    # New groups are referenced by name; drop the cached misses
+                    resolver = getattr(self._client, "resolver", None)
+                    if resolver is not None:
+                        resolver.forget([("host_group", obj["name"]) for call in calls for obj in call.params])
+        return results
+
+    def reconcile(self, desired, dry_run=False):
+        """
+        plan() and, unless `dry_run`, apply() in one step.
+
+        Returns:
+            tuple: (Plan, list of CallResult, empty for a dry run).
+        """
+        plan = self.plan(desired)
+        return plan, ([] if dry_run else self.apply(plan))
+
+    def _execute(self, call):
+        resource = getattr(self._client, call.resource)
+        try:
+            if isinstance(call.params, list):
+                response = resource._call_many(call.method, call.params)
+            else:
+                response = resource._call(call.method, **call.params)
+            return CallResult(call, unwrap(call.method, response), None)
+        except ZabbixAPIError as error:
+            return CallResult(call, None, error)
+
+    def _groups(self, hosts, calls):
+        # Group name/ID -> groupid; groups that do not exist are planned for
+        # creation and referenced by name until then
+        wanted = {group for host in hosts for group in host.get("groups", [])}
+        names = [group for group in wanted if not str(group).isdigit()]
+        resolved = self._client.resolver.resolve("host_group", names) if names else {}
+        missing = sorted(name for name, groupid in resolved.items() if groupid is None)
+        if missing:
+            calls.append(PlannedCall(PHASE_GROUPS, "host_group", "hostgroup.create",
+                                     [{"name": name} for name in missing], []))
+        return {group: resolved.get(group) or str(group) for group in wanted}
+
+    def _templates(self, hosts):
+        wanted = {template for host in hosts for template in host.get("templates", [])}
+        names = [template for template in wanted if not str(template).isdigit()]
+        resolved = self._client.resolver.resolve("template", names) if names else {}
+        missing = sorted(name for name, templateid in resolved.items() if templateid is None)
+        if missing:
+            raise ValueError(f"Unknown templates: {', '.join(missing)}")
+        return {template: resolved.get(template) or str(template) for template in wanted}
+
+    def _create(self, want, groups, templates):
+        host = {field: value for field, value in want.items() if field not in RELATED_FIELDS}
+        host["host"] = want["host"]
+        host["groups"] = [{"groupid": groups[group]} for group in want.get("groups", [])]
+        if "templates" in want:
+            host["templates"] = [{"templateid": templates[template]} for template in want["templates"]]
+        if "macros" in want:
+            host["macros"] = self._macros(want["macros"])
+        if "tags" in want:
+            host["tags"] = [{"tag": tag, "value": value} for tag, value in _normalize_tags(want["tags"])]
+        if "interfaces" in want:
+            host["interfaces"] = want["interfaces"]
+        return host
+
+    @staticmethod
+    def _macros(macros):
+        if isinstance(macros, dict):
+            return [{"macro": macro, "value": value} for macro, value in macros.items()]
+        return list(macros)
+
+    @staticmethod
+    def _macros_differ(want, have):
+        want = _normalize_macros(want)
+        have = _normalize_macros(have)
+        if set(want) != set(have):
+            return True
+        for macro, (value, kind, description) in want.items():
+            have_value, have_kind, have_description = have[macro]
+            # Secret macro values are not returned by host.get and cannot be compared
+            if (kind, description) != (have_kind, have_description) or (have_kind != "1" and value != have_value):
+                return True
+        return False
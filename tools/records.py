@@ -0,0 +1,331 @@
+# tools/records.py
+
+# Compact, typed containers for large get() results
+# A RecordSet stores a result column by column (struct of arrays) instead of
+# one dict per object. Columns with few distinct values are dictionary
+# encoded into byte arrays, and the remaining strings are de-duplicated while
+# decoding, so the many copies of "0", of the same hostid or of the same tag
+# name that the JSON decoder produced collapse into one object each. Numeric
+# fields stay as those shared strings and are only converted when they are read.
+# Rows are exposed as small Record views with attribute and item access.
+# Responses are decoded straight from the JSON text one result element at a
+# time, so the full list of dicts never exists in memory.
+
+import json
+import re
+from array import array
+
+try:
+    from ..base import ZabbixAPIError, unwrap
+except ImportError:
+    from base import ZabbixAPIError, unwrap
+
+
+# Value types of items and history
+VALUE_TYPE_FLOAT = 0
+VALUE_TYPE_UNSIGNED = 3
+
+# Integer properties per API object; IDs are kept as strings, as the API returns them
+INTEGER_FIELDS = {
+    "host": {
+        "status", "monitored_by", "maintenance_status", "maintenance_type", "maintenance_from",
+        "inventory_mode", "flags", "ipmi_authtype", "ipmi_privilege", "tls_connect", "tls_accept",
+        "active_available",
+    },
+    "item": {
+        "type", "value_type", "status", "state", "flags", "lastclock", "lastns", "evaltype",
+        "authtype", "inventory_link", "allow_traps",
+    },
+    "trigger": {
+        "priority", "status", "value", "state", "lastchange", "flags", "type", "recovery_mode",
+        "correlation_mode", "manual_close",
+    },
+    "event": {"source", "object", "clock", "ns", "value", "acknowledged", "severity", "suppressed"},
+    "problem": {"source", "object", "clock", "ns", "r_clock", "r_ns", "acknowledged", "severity", "suppressed"},
+    "history": {"clock", "ns"},
+    "trend": {"clock", "num"},
+}
+
+FLOAT_FIELDS = {
+    "trend": {"value_min", "value_avg", "value_max"},
+}
+
+# Fields holding an item value, typed by the item's value type
+VALUE_FIELDS = {
+    "item": {"lastvalue", "prevvalue"},
+    "history": {"value"},
+}
+
+
+def _convert_value(value, value_type):
+    if value_type == VALUE_TYPE_FLOAT:
+        return float(value)
+    if value_type == VALUE_TYPE_UNSIGNED:
+        return int(value)
+    return value
+
+
+class _Column:
+    # One field of a RecordSet. Low-cardinality fields (status, type, hostid,
+    # units, ...) are dictionary encoded: each distinct value is stored once
+    # and rows hold 1- or 2-byte codes. A field falls back to a plain list
+    # once it has more than 65536 distinct values or unhashable ones.
+
+    __slots__ = ("values", "index", "codes", "plain")
+
+    def __init__(self, padding=0):
+        self.values = [None]
+        self.index = {None: 0}
+        self.codes = array("B", bytes(padding))
+        self.plain = None
+
+    def __len__(self):
+        return len(self.plain) if self.plain is not None else len(self.codes)
+
+    def append(self, value, intern):
+        if self.plain is None:
+            try:
+                code = self.index.get(value)
+                if code is None and len(self.values) < 65536:
+                    code = len(self.values)
+                    if code == 256:
+                        self.codes = array("H", self.codes)
+                    value = intern(value)
+                    self.values.append(value)
+                    self.index[value] = code
+            except TypeError:
+                # Unhashable value (list, dict)
+                code = None
+            if code is not None:
+                self.codes.append(code)
+                return
+            self._to_plain()
+        self.plain.append(intern(value))
+
+    def get(self, row):
+        if self.plain is not None:
+            return self.plain[row]
+        return self.values[self.codes[row]]
+
+    def _to_plain(self):
+        values = self.values
+        self.plain = [values[code] for code in self.codes]
+        self.values = self.index = self.codes = None
+
+
+class Record:
+    """
+    One row of a RecordSet. Fields are read as attributes or items and
+    converted to int/float on access.
+
+    Example:
+        >>> item = items[0]
+        >>> item.key_, item["value_type"], item.lastvalue
+        ('system.cpu.util', 0, 3.25)
+    """
+
+    __slots__ = ("_records", "_row")
+
+    def __init__(self, records, row):
+        self._records = records
+        self._row = row
+
+    def __getattr__(self, name):
+        # Private and special names are never fields; copy and pickle probe
+        # them (__setstate__, __deepcopy__) before the slots are filled
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._records._value(name, self._row)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getstate__(self):
+        return self._records, self._row
+
+    def __setstate__(self, state):
+        self._records, self._row = state
+
+    def __getitem__(self, name):
+        return self._records._value(name, self._row)
+
+    def __contains__(self, name):
+        return name in self._records.columns
+
+    def get(self, name, default=None):
+        try:
+            return self._records._value(name, self._row)
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self._records.columns)
+
+    def to_dict(self):
+        """
+        Return the row as a dict of converted values.
+        """
+        return {name: self._records._value(name, self._row) for name in self._records.columns}
+
+    def __repr__(self):
+        return f"Record({self.to_dict()!r})"
+
+
+class RecordSet:
+    """
+    Column-oriented container for a list of API objects.
+
+    Args:
+        objects (iterable): Objects as returned in the "result" of a get() call.
+        schema (str, optional): API object the result belongs to ("host",
+            "item", "trigger", "event", "problem", "history", "trend"),
+            selecting which fields are converted to numbers on access.
+        value_type (int, optional): Value type of history values
+            (the `history` parameter of history.get). Items use their own
+            value_type field.
+
+    Example:
+        >>> items = zapi.items.get(output="extend", groupids=["4"], records=True)
+        >>> len(items), items[0].key_, items[0].lastclock
+        (412873, 'system.cpu.util', 1718000000)
+        >>> keys = items.column("key_")
+    """
+
+    def __init__(self, objects, schema=None, value_type=VALUE_TYPE_UNSIGNED):
+        self.schema = schema
+        self.value_type = int(value_type)
+        self._integer = INTEGER_FIELDS.get(schema, set())
+        self._float = FLOAT_FIELDS.get(schema, set())
+        self._values = VALUE_FIELDS.get(schema, set())
+        strings = {}
+
+        def intern(value):
+            if isinstance(value, str):
+                return strings.setdefault(value, value)
+            if isinstance(value, list):
+                return [intern(element) for element in value]
+            if isinstance(value, dict):
+                return {intern(key): intern(element) for key, element in value.items()}
+            return value
+
+        columns = {}
+        count = 0
+        for obj in objects:
+            for name, value in obj.items():
+                column = columns.get(name)
+                if column is None:
+                    # Field not seen in earlier objects
+                    column = columns[intern(name)] = _Column(count)
+                column.append(value, intern)
+            count += 1
+            if len(obj) != len(columns):
+                for column in columns.values():
+                    if len(column) < count:
+                        column.append(None, intern)
+        self.columns = columns
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield Record(self, row)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [Record(self, index) for index in range(self._count)[row]]
+        if row < 0:
+            row += self._count
+        if not 0 <= row < self._count:
+            raise IndexError("RecordSet index out of range")
+        return Record(self, row)
+
+    def column(self, name):
+        """
+        Return all values of one field, converted, as a list.
+        """
+        return [self._value(name, row) for row in range(self._count)]
+
+    def to_dicts(self):
+        """
+        Return the rows as plain dicts (the shape of the raw API result).
+        """
+        return [record.to_dict() for record in self]
+
+    def _value(self, name, row):
+        value = self.columns[name].get(row)
+        if value is None or not isinstance(value, str):
+            return value
+        if name in self._integer:
+            return int(value)
+        if name in self._float:
+            return float(value)
+        if name in self._values:
+            if self.schema == "item":
+                value_types = self.columns.get("value_type")
+                value_type = value_types.get(row) if value_types is not None else None
+                return _convert_value(value, int(value_type)) if value_type is not None and value else value
+            return _convert_value(value, self.value_type)
+        return value
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def _skip(text, pos, expected=None):
+    pos = _whitespace.match(text, pos).end()
+    if expected is not None:
+        if not text.startswith(expected, pos):
+            raise ValueError(f"Malformed JSON-RPC response at offset {pos}")
+        pos = _whitespace.match(text, pos + 1).end()
+    return pos
+
+
+def _iter_array(text, pos):
+    # Decode the elements of the JSON array starting at `pos` one by one
+    pos = _skip(text, pos, "[")
+    if text[pos:pos + 1] == "]":
+        return
+    while True:
+        element, pos = _decoder.raw_decode(text, pos)
+        yield element
+        pos = _whitespace.match(text, pos).end()
+        if text[pos:pos + 1] == "]":
+            return
+        pos = _skip(text, pos, ",")
+
+
+def to_records(method, response, schema=None, value_type=VALUE_TYPE_UNSIGNED):
+    """
+    Decode a get() response into a RecordSet, raising ZabbixAPIError on "error".
+
+    Args:
+        method (str): API method the response belongs to (used in errors).
+        response (str|dict): Raw JSON text of the response, or the decoded response.
+        schema (str, optional): See RecordSet.
+        value_type (int, optional): See RecordSet.
+
+    Returns:
+        RecordSet, or the result unchanged when it is not a list (countOutput).
+    """
+    if not isinstance(response, str):
+        result = unwrap(method, response)
+        return RecordSet(result, schema=schema, value_type=value_type) if isinstance(result, list) else result
+
+    pos = _skip(response, 0, "{")
+    while response[pos:pos + 1] != "}":
+        key, pos = _decoder.raw_decode(response, pos)
+        pos = _skip(response, pos, ":")
+        if key == "result" and response[pos:pos + 1] == "[":
+            return RecordSet(_iter_array(response, pos), schema=schema, value_type=value_type)
+        value, pos = _decoder.raw_decode(response, pos)
+        if key == "error":
+            raise ZabbixAPIError(method, value)
+        if key == "result":
+            return value
+        pos = _whitespace.match(response, pos).end()
+        if response[pos:pos + 1] == ",":
+            pos = _skip(response, pos, ",")
+    raise ValueError(f"{method}: response has neither result nor error")
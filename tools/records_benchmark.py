@@ -0,0 +1,163 @@
+# tools/records_benchmark.py
+
+# Memory benchmark: raw item.get dicts vs. RecordSet
+# Writes a synthetic item.get response (output="extend") to a file, then
+# decodes it once with json.loads as the client does and once into a
+# RecordSet, reporting the resident set size each result holds. Each mode
+# runs in its own process so that memory freed by one does not hide the
+# cost of the other.
+#
+# Usage:
+#   python -m tools.records_benchmark --items 400000
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    from .records import to_records
+except ImportError:
+    from tools.records import to_records
+
+
+def synthetic_items(count, hosts=2000):
+    """
+    Return a JSON document shaped like an item.get(output="extend") result.
+    """
+    items = []
+    for index in range(count):
+        hostid = str(10000 + index % hosts)
+        value_type = "0" if index % 3 else "3"
+        items.append({
+            "itemid": str(100000 + index),
+            "type": "0",
+            "snmp_oid": "",
+            "hostid": hostid,
+            "name": f"Interface eth{index % 8}: Bits received",
+            "key_": f"net.if.in[eth{index % 8},{index // 8}]",
+            "delay": "1m",
+            "history": "31d",
+            "trends": "365d",
+            "status": "0",
+            "value_type": value_type,
+            "trapper_hosts": "",
+            "units": "bps",
+            "logtimefmt": "",
+            "templateid": str(50000 + index % 500),
+            "valuemapid": "0",
+            "params": "",
+            "ipmi_sensor": "",
+            "authtype": "0",
+            "username": "",
+            "password": "",
+            "publickey": "",
+            "privatekey": "",
+            "flags": "0",
+            "interfaceid": str(20000 + index % hosts),
+            "description": "",
+            "inventory_link": "0",
+            "lifetime": "30d",
+            "evaltype": "0",
+            "jmx_endpoint": "",
+            "master_itemid": "0",
+            "timeout": "",
+            "url": "",
+            "query_fields": [],
+            "posts": "",
+            "status_codes": "200",
+            "follow_redirects": "1",
+            "post_type": "0",
+            "http_proxy": "",
+            "headers": [],
+            "retrieve_mode": "0",
+            "request_method": "0",
+            "output_format": "0",
+            "ssl_cert_file": "",
+            "ssl_key_file": "",
+            "ssl_key_password": "",
+            "verify_peer": "0",
+            "verify_host": "0",
+            "allow_traps": "0",
+            "uuid": "",
+            "state": "0",
+            "error": "",
+            "parameters": [],
+            "lastclock": str(1718000000 + index % 60),
+            "lastns": str(index * 7919 % 1000000000),
+            "lastvalue": f"{index * 0.37:.4f}" if value_type == "0" else str(index),
+            "prevvalue": f"{index * 0.35:.4f}" if value_type == "0" else str(index - 1),
+        })
+    return json.dumps({"jsonrpc": "2.0", "result": items, "id": 1})
+
+
+def rss():
+    """
+    Return the resident set size of this process in bytes (Linux /proc, else peak RSS).
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(mode, path):
+    """
+    Decode the response stored at `path` in the given mode ("dicts" or
+    "records") and return (items, RSS growth in bytes, seconds to decode).
+    """
+    gc.collect()
+    before = rss()
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    started = time.perf_counter()
+    if mode == "records":
+        result = to_records("item.get", text, schema="item")
+    else:
+        result = json.loads(text)["result"]
+    elapsed = time.perf_counter() - started
+    # Only the decoded result counts, not the response text
+    del text
+    gc.collect()
+    return len(result), rss() - before, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the memory used by item.get results held as dicts and as a RecordSet.")
+    parser.add_argument("--items", type=int, default=400000, help="Number of synthetic items")
+    parser.add_argument("--mode", choices=("dicts", "records"), help=argparse.SUPPRESS)
+    parser.add_argument("--response", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        count, grown, elapsed = measure(args.mode, args.response)
+        print(json.dumps({"items": count, "rss": grown, "seconds": elapsed}))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "items.json")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(synthetic_items(args.items))
+        for mode in ("dicts", "records"):
+            output = subprocess.run(
+                [sys.executable, "-m", "tools.records_benchmark", "--mode", mode, "--response", path],
+                check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            ).stdout
+            results[mode] = json.loads(output)
+    print(f"{args.items} items (output=\"extend\")")
+    for mode, result in results.items():
+        per_item = result["rss"] / args.items
+        print(f"  {mode:8} RSS +{result['rss'] / 2 ** 20:8.1f} MiB  {per_item:7.0f} B/item  decode {result['seconds']:.2f}s")
+    print(f"  ratio    {results['dicts']['rss'] / max(results['records']['rss'], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
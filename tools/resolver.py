@@ -0,0 +1,387 @@
+# tools/resolver.py
+
+# Cached lookups from human readable names to Zabbix IDs
+# Lookups are batched: resolving many names costs one get() per resource
+# per batch instead of one get() per name.
+# NameResolver also backs ZabbixBase._call(), which lets resource methods
+# take names wherever they take IDs (hostids=["web01"], groups=[{"groupid": "Linux servers"}]).
+
+import threading
+import time
+
+try:
+    from ..base import chunked, unwrap
+except ImportError:
+    from base import chunked, unwrap
+
+
+class ItemResolver:
+    """
+    Resolve (host name, item key) pairs to item IDs and value types.
+
+    Results are cached, including misses, so every pair is looked up at
+    most once. Unknown hosts are resolved with a single host.get per batch
+    and their items with a single item.get per batch.
+
+    Args:
+        client (ZabbixClient): Client used for the host.get/item.get calls.
+        batch_size (int, optional): Hosts per get() request.
+
+    Example:
+        >>> resolver = ItemResolver(zapi)
+        >>> resolver.resolve([("web01", "system.cpu.util"), ("web02", "vfs.fs.size[/,free]")])
+        {('web01', 'system.cpu.util'): ('23664', 0), ('web02', 'vfs.fs.size[/,free]'): None}
+    """
+
+    def __init__(self, client, batch_size=500):
+        self._client = client
+        self.batch_size = batch_size
+        self._hosts = {}  # host name -> hostid or None
+        self._items = {}  # (host name, key) -> (itemid, value_type) or None
+        self._value_types = {}  # itemid -> value_type or None
+        self._lock = threading.Lock()
+
+    def resolve(self, pairs):
+        """
+        Resolve several (host, key) pairs at once.
+
+        Returns:
+            dict: (host, key) -> (itemid, value_type), or None when the host
+            or the item does not exist.
+        """
+        pairs = set(pairs)
+        with self._lock:
+            missing = [pair for pair in pairs if pair not in self._items]
+            if missing:
+                self._load(missing)
+            return {pair: self._items[pair] for pair in pairs}
+
+    def get(self, host, key):
+        """
+        Resolve a single (host, key) pair, see resolve().
+        """
+        return self.resolve([(host, key)])[(host, key)]
+
+    def value_types(self, itemids):
+        """
+        Look up the value type of items given by ID.
+
+        Returns:
+            dict: itemid -> value_type, or None when the item does not exist.
+        """
+        itemids = {str(itemid) for itemid in itemids}
+        with self._lock:
+            missing = sorted(itemid for itemid in itemids if itemid not in self._value_types)
+            for chunk in chunked(missing, self.batch_size):
+                items = unwrap("item.get", self._client.items.get(output=["itemid", "value_type"], itemids=chunk))
+                found = {item["itemid"]: int(item["value_type"]) for item in items}
+                for itemid in chunk:
+                    self._value_types[itemid] = found.get(itemid)
+            return {itemid: self._value_types[itemid] for itemid in itemids}
+
+    def forget(self, host=None):
+        """
+        Drop cached entries for one host, or the whole cache.
+        """
+        with self._lock:
+            if host is None:
+                self._hosts.clear()
+                self._items.clear()
+                self._value_types.clear()
+                return
+            self._hosts.pop(host, None)
+            for pair in [pair for pair in self._items if pair[0] == host]:
+                del self._items[pair]
+
+    def _load(self, pairs):
+        unknown_hosts = sorted({host for host, _ in pairs if host not in self._hosts})
+        if unknown_hosts:
+            self._hosts.update(_find_ids(self._client, "host", unknown_hosts, self.batch_size))
+        for pair, item in _find_items(self._client, pairs, self._hosts, self.batch_size).items():
+            self._items[pair] = None if item is None else (item["itemid"], int(item["value_type"]))
+
+
+# Resolvable object kinds: client attribute, API method, ID property and the
+# unique name property filtered on
+NAME_KINDS = {
+    "host": {"resource": "host", "method": "host.get", "id": "hostid", "name": "host"},
+    "template": {"resource": "templates", "method": "template.get", "id": "templateid", "name": "host"},
+    "host_group": {"resource": "host_group", "method": "hostgroup.get", "id": "groupid", "name": "name"},
+    "template_group": {"resource": "template_group", "method": "templategroup.get", "id": "groupid", "name": "name"},
+}
+
+# Request parameters that carry IDs, and the kind of object they refer to.
+# "group" is a host group, or a template group for template.* / templategroup.* calls.
+ID_PARAMETERS = {
+    "hostid": "host",
+    "hostids": "host",
+    "templateid": "template",
+    "templateids": "template",
+    "templateids_link": "template",
+    "templateids_clear": "template",
+    "parentTemplateids": "template",
+    "groupid": "group",
+    "groupids": "group",
+    "itemid": "item",
+    "itemids": "item",
+}
+
+# Parameters holding lists of objects that reference others by ID
+OBJECT_PARAMETERS = {
+    "hosts": ("hostid", "host"),
+    "templates": ("templateid", "template"),
+    "templates_link": ("templateid", "template"),
+    "templates_clear": ("templateid", "template"),
+    "groups": ("groupid", "group"),
+}
+
+
+def _is_name(kind, value):
+    # Numeric strings and integers are IDs; items are named by (host, key) tuples
+    if kind == "item":
+        return isinstance(value, tuple) and len(value) == 2
+    return isinstance(value, str) and not value.isdigit()
+
+
+def _find_ids(client, kind, names, batch_size):
+    # name -> ID (None when missing) of objects of a NAME_KINDS kind, one get() per batch
+    spec = NAME_KINDS[kind]
+    ids = {}
+    for chunk in chunked(sorted(names), batch_size):
+        objects = unwrap(spec["method"], getattr(client, spec["resource"]).get(
+            output=[spec["id"], spec["name"]], filter={spec["name"]: chunk},
+        ))
+        found = {obj[spec["name"]]: obj[spec["id"]] for obj in objects}
+        ids.update((name, found.get(name)) for name in chunk)
+    return ids
+
+
+def _find_items(client, pairs, hostids, batch_size):
+    # (host name, key) -> item (itemid, hostid, key_, value_type), or None when the
+    # host or item does not exist; `hostids` maps host names to IDs (None: unknown).
+    # The keys of a batch of hosts are asked for in one item.get.
+    keys_by_host = {}
+    for host, key in pairs:
+        hostid = hostids.get(host)
+        if hostid is not None:
+            keys_by_host.setdefault(hostid, set()).add(key)
+    found = {}
+    for chunk in chunked(sorted(keys_by_host), batch_size):
+        keys = sorted(set().union(*(keys_by_host[hostid] for hostid in chunk)))
+        items = unwrap("item.get", client.items.get(
+            output=["itemid", "hostid", "key_", "value_type"], hostids=chunk, filter={"key_": keys},
+        ))
+        found.update(((item["hostid"], item["key_"]), item) for item in items)
+    return {(host, key): found.get((hostids.get(host), key)) for host, key in pairs}
+
+
+class NameResolver:
+    """
+    Batch-resolve names of hosts, templates, host/template groups and
+    (host, item key) pairs to IDs, with a time-limited index.
+
+    Every resolved name is kept for `ttl` seconds and every miss for
+    `negative_ttl` seconds. Renames are picked up when an ID shows up under
+    a new name (the old name is dropped), when refresh() re-reads the names
+    of all indexed IDs, or when a request built from cached IDs fails
+    (translate() reports the names used, and forget() drops them).
+
+    Args:
+        client (ZabbixClient): Client used for the get() calls.
+        ttl (float, optional): Seconds a resolved name stays valid.
+        negative_ttl (float, optional): Seconds a miss is remembered.
+        batch_size (int, optional): Names per get() request.
+
+    Example:
+        >>> resolver = NameResolver(zapi, ttl=300)
+        >>> resolver.resolve("host", ["web01", "web02", "gone"])
+        {'web01': '10105', 'web02': '10106', 'gone': None}
+        >>> resolver.resolve("item", [("web01", "system.cpu.util")])
+        {('web01', 'system.cpu.util'): '23664'}
+        >>> zapi.host.get(hostids=["web01"], groupids=["Linux servers"])  # resolved by the client
+    """
+
+    def __init__(self, client, ttl=300, negative_ttl=30, batch_size=500):
+        self._client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self._index = {kind: {} for kind in (*NAME_KINDS, "item")}  # name -> (id or None, expiry)
+        self._names = {kind: {} for kind in NAME_KINDS}  # id -> name, to notice renames
+        self._lock = threading.Lock()
+
+    def resolve(self, kind, names):
+        """
+        Resolve several names of one kind, fetching only those not indexed.
+
+        Args:
+            kind (str): "host", "template", "host_group", "template_group" or
+                "item" (names are (host name, item key) tuples).
+            names (iterable): Names to resolve.
+
+        Returns:
+            dict: name -> ID, or None when no such object exists.
+        """
+        if kind not in self._index:
+            raise ValueError(f"Unknown kind: {kind}. Must be one of: {', '.join(self._index)}")
+        names = set(names)
+        with self._lock:
+            now = time.monotonic()
+            index = self._index[kind]
+            missing = [name for name in names if name not in index or index[name][1] <= now]
+            if missing:
+                if kind == "item":
+                    self._load_items(missing, now)
+                else:
+                    self._load(kind, missing, now)
+            return {name: index[name][0] for name in names}
+
+    def get(self, kind, name):
+        """
+        Resolve a single name, see resolve().
+        """
+        return self.resolve(kind, [name])[name]
+
+    def translate(self, method, params):
+        """
+        Replace names by IDs in the ID parameters of a request.
+
+        Args:
+            method (str): API method the parameters are for (e.g. "host.get").
+            params (dict): Request parameters.
+
+        Returns:
+            tuple: (params with names replaced, list of (kind, name) that were replaced).
+
+        Raises:
+            ValueError: When a name does not resolve to any object.
+        """
+        group_kind = "template_group" if method.startswith(("template.", "templategroup.")) else "host_group"
+        wanted = []  # (kind, name)
+        for key, value in params.items():
+            if key in ID_PARAMETERS:
+                kind = group_kind if ID_PARAMETERS[key] == "group" else ID_PARAMETERS[key]
+                values = value if isinstance(value, list) else [value]
+                wanted += [(kind, element) for element in values if _is_name(kind, element)]
+            elif key in OBJECT_PARAMETERS and isinstance(value, list):
+                field, kind = OBJECT_PARAMETERS[key]
+                kind = group_kind if kind == "group" else kind
+                wanted += [(kind, obj[field]) for obj in value if isinstance(obj, dict) and _is_name(kind, obj.get(field))]
+        if not wanted:
+            return params, []
+
+        names_by_kind = {}
+        for kind, name in wanted:
+            names_by_kind.setdefault(kind, set()).add(name)
+        ids = {}
+        for kind, names in names_by_kind.items():
+            resolved = self.resolve(kind, names)
+            if kind == "host":
+                # hostids also take templates (item.get, usermacro.get, ...)
+                missing = [name for name, objectid in resolved.items() if objectid is None]
+                if missing:
+                    resolved.update(self.resolve("template", missing))
+            for name, objectid in resolved.items():
+                if objectid is None:
+                    raise ValueError(f"Unknown {kind.replace('_', ' ')}: {name!r}")
+                ids[(kind, name)] = objectid
+
+        def replace(kind, value):
+            return ids[(kind, value)] if _is_name(kind, value) else value
+
+        translated = {}
+        for key, value in params.items():
+            if key in ID_PARAMETERS:
+                kind = group_kind if ID_PARAMETERS[key] == "group" else ID_PARAMETERS[key]
+                translated[key] = [replace(kind, element) for element in value] if isinstance(value, list) else replace(kind, value)
+            elif key in OBJECT_PARAMETERS and isinstance(value, list):
+                field, kind = OBJECT_PARAMETERS[key]
+                kind = group_kind if kind == "group" else kind
+                translated[key] = [
+                    {**obj, field: replace(kind, obj[field])} if isinstance(obj, dict) and field in obj else obj
+                    for obj in value
+                ]
+            else:
+                translated[key] = value
+        return translated, list(ids)
+
+    def refresh(self, kind=None):
+        """
+        Re-read the current names of every indexed ID (one get() per batch)
+        and re-key the index, so renamed and deleted objects are noticed
+        without waiting for the TTL.
+
+        Returns:
+            int: Number of names that changed or disappeared.
+        """
+        kinds = [kind] if kind else list(NAME_KINDS)
+        changed = 0
+        with self._lock:
+            now = time.monotonic()
+            for kind in kinds:
+                spec = NAME_KINDS[kind]
+                ids = sorted(self._names[kind])
+                current = {}
+                for chunk in chunked(ids, self.batch_size):
+                    objects = unwrap(spec["method"], getattr(self._client, spec["resource"]).get(
+                        output=[spec["id"], spec["name"]], **{f"{spec['id']}s": chunk},
+                    ))
+                    current.update((obj[spec["id"]], obj[spec["name"]]) for obj in objects)
+                for objectid in ids:
+                    old = self._names[kind][objectid]
+                    if current.get(objectid) != old:
+                        changed += 1
+                        self._drop(kind, old)
+                for objectid, name in current.items():
+                    self._store(kind, name, objectid, now)
+        return changed
+
+    def forget(self, names=None):
+        """
+        Drop indexed names, given as (kind, name) pairs, or the whole index.
+        """
+        with self._lock:
+            if names is None:
+                for kind in self._index:
+                    self._index[kind].clear()
+                for kind in self._names:
+                    self._names[kind].clear()
+                return
+            for kind, name in names:
+                self._drop(kind, name)
+
+    def _load(self, kind, names, now):
+        for name, objectid in _find_ids(self._client, kind, names, self.batch_size).items():
+            if objectid is not None:
+                self._store(kind, name, objectid, now)
+            else:
+                self._index[kind][name] = (None, now + self.negative_ttl)
+
+    def _load_items(self, pairs, now):
+        hosts = {host for host, _ in pairs}
+        index = self._index["host"]
+        stale = [host for host in hosts if host not in index or index[host][1] <= now]
+        if stale:
+            self._load("host", stale, now)
+        hostids = {host: index[host][0] for host in hosts}
+        for pair, item in _find_items(self._client, pairs, hostids, self.batch_size).items():
+            itemid = item["itemid"] if item is not None else None
+            expiry = now + (self.ttl if itemid is not None else self.negative_ttl)
+            self._index["item"][pair] = (itemid, expiry)
+
+    def _store(self, kind, name, objectid, now):
+        old = self._names[kind].get(objectid)
+        if old is not None and old != name:
+            # Renamed: the old name no longer points at this object
+            self._drop(kind, old)
+        self._index[kind][name] = (objectid, now + self.ttl)
+        self._names[kind][objectid] = name
+
+    def _drop(self, kind, name):
+        entry = self._index[kind].pop(name, None)
+        if kind in self._names and entry is not None and entry[0] is not None:
+            self._names[kind].pop(entry[0], None)
+        if kind == "host":
+            # Items are indexed by host name
+            for pair in [pair for pair in self._index["item"] if pair[0] == name]:
+                del self._index["item"][pair]
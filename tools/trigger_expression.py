@@ -0,0 +1,385 @@
+# tools/trigger_expression.py
+
+# Parser for trigger expressions (Zabbix 5.4+ syntax)
+# Turns an expression such as
+#     avg(/web01/system.cpu.util[,idle],5m)<10 and nodata(/web01/agent.ping,3m)=0
+# into a small syntax tree of namedtuples. Tokens are matched with one
+# compiled pattern at the current position; item queries (/host/key[...])
+# and macros are scanned by hand because keys nest brackets and quote
+# commas, and macro contexts nest LLD macros ({$LIMIT:"{#FSNAME}"}) and
+# quote regular expressions. The tree is what the trigger index reads item
+# references from and what the backtester evaluates.
+#
+# Command line usage (from the repository root):
+#   python -m tools.trigger_expression                # parse the stock samples
+#   python -m tools.trigger_expression expressions.txt
+
+import argparse
+import re
+import sys
+from collections import namedtuple
+
+
+Number = namedtuple("Number", ["value", "text"])
+String = namedtuple("String", ["value"])
+Macro = namedtuple("Macro", ["text"])
+FunctionRef = namedtuple("FunctionRef", ["functionid"])
+Query = namedtuple("Query", ["host", "key", "filter"])
+Param = namedtuple("Param", ["text"])
+Call = namedtuple("Call", ["name", "args"])
+Unary = namedtuple("Unary", ["op", "operand"])
+Binary = namedtuple("Binary", ["op", "left", "right"])
+
+# Binary operators from lowest to highest precedence ("not" and unary minus bind tighter)
+PRECEDENCE = [("or",), ("and",), ("=", "<>"), ("<", "<=", ">", ">="), ("+", "-"), ("*", "/")]
+_LEVEL = {op: level for level, ops in enumerate(PRECEDENCE) for op in ops}
+
+SUFFIXES = {
+    "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4,
+    "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800,
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?[KMGTsmhdw]?)(?![\w.])
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<ref>\{\d+\})
+      | (?P<word>and|or|not)(?![\w.])
+      | (?P<name>[a-z_][a-z0-9_]*)\s*\(
+      | (?P<op><>|<=|>=|[-+*/=<>(),])
+    )""", re.VERBOSE)
+
+_KEY_NAME = re.compile(r"[0-9A-Za-z_\-.*]+")
+
+# Trigger expressions of the stock templates shipped with Zabbix 7.0
+# (Linux by Zabbix agent and its discovery rules), checked by main()
+STOCK_EXPRESSIONS = [
+    "min(/Linux by Zabbix agent/system.cpu.util,5m)>{$CPU.UTIL.CRIT}",
+    "min(/Linux by Zabbix agent/system.cpu.load[all,avg1],5m)/last(/Linux by Zabbix agent/system.cpu.num)>{$LOAD_AVG_PER_CPU.MAX.WARN}"
+    " and last(/Linux by Zabbix agent/system.cpu.load[all,avg5])>0 and last(/Linux by Zabbix agent/system.cpu.load[all,avg15])>0",
+    "nodata(/Linux by Zabbix agent/agent.ping,{$AGENT.NODATA_TIMEOUT})=1",
+    "last(/Linux by Zabbix agent/system.uptime)<10m",
+    "last(/Linux by Zabbix agent/system.sw.os,#1)<>last(/Linux by Zabbix agent/system.sw.os,#2)"
+    " and length(last(/Linux by Zabbix agent/system.sw.os))>0",
+    "last(/Linux by Zabbix agent/vfs.file.cksum[/etc/passwd,sha256],#1)"
+    "<>last(/Linux by Zabbix agent/vfs.file.cksum[/etc/passwd,sha256],#2)",
+    "max(/Linux by Zabbix agent/vm.memory.utilization,5m)>{$MEMORY.UTIL.MAX}",
+    "last(/Linux by Zabbix agent/vfs.fs.dependent.size[{#FSNAME},pused])>{$VFS.FS.PUSED.MAX.CRIT:\"{#FSNAME}\"}"
+    " and ((last(/Linux by Zabbix agent/vfs.fs.dependent.size[{#FSNAME},total])"
+    "-last(/Linux by Zabbix agent/vfs.fs.dependent.size[{#FSNAME},used]))<{$VFS.FS.FREE.MIN.CRIT:\"{#FSNAME}\"}"
+    " or timeleft(/Linux by Zabbix agent/vfs.fs.dependent.size[{#FSNAME},pused],1h,100)<1d)",
+    "min(/Linux by Zabbix agent/vfs.fs.dependent.inode[{#FSNAME},pfree],5m)<{$VFS.FS.INODE.PFREE.MIN.CRIT:\"{#FSNAME}\"}",
+    "(avg(/Linux by Zabbix agent/net.if.in[\"{#IFNAME}\"],15m)>({$IF.UTIL.MAX:\"{#IFNAME}\"}/100)"
+    "*last(/Linux by Zabbix agent/net.if.speed[\"{#IFNAME}\"]))"
+    " and last(/Linux by Zabbix agent/net.if.speed[\"{#IFNAME}\"])>0",
+    "{$IFCONTROL:\"{#IFNAME}\"}=1 and last(/Linux by Zabbix agent/net.if.status[\"{#IFNAME}\"])=2"
+    " and (last(/Linux by Zabbix agent/net.if.status[\"{#IFNAME}\"],#1)"
+    "<>last(/Linux by Zabbix agent/net.if.status[\"{#IFNAME}\"],#2))",
+    "min(/h/vfs.fs.size[{#FSNAME},pused],5m)>{$LIMIT:\"{#FSNAME}\"}",
+    "last(/h/vfs.fs.size[/,pused])>{$LIMIT:regex:\"^/(var|tmp){1}[a-z]{0,3}$\"}",
+]
+
+
+class ExpressionError(ValueError):
+    """
+    Raised when an expression cannot be parsed.
+    """
+
+    def __init__(self, message, expression, position):
+        self.expression = expression
+        self.position = position
+        super().__init__(f"{message} at position {position}: {expression[position:position + 30]!r}")
+
+
+def parse_number(text):
+    """
+    Return the value of a number with an optional unit suffix ("5m" -> 300, "1K" -> 1024).
+    """
+    if text[-1] in SUFFIXES:
+        value = float(text[:-1]) * SUFFIXES[text[-1]]
+    else:
+        value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def _unquote(text):
+    return re.sub(r"\\(.)", r"\1", text[1:-1])
+
+
+class _Parser:
+
+    def __init__(self, expression):
+        self.text = expression
+        self.pos = 0
+        self.peeked = None
+
+    def peek(self):
+        if self.peeked is None:
+            match = _TOKEN.match(self.text, self.pos)
+            if match is not None:
+                self.peeked = (match.lastgroup, match.group(match.lastgroup), match.end())
+                return self.peeked
+            start = len(self.text) - len(self.text[self.pos:].lstrip())
+            if self.text.startswith("{", start):
+                end = self.macro(start)
+                self.peeked = ("macro", self.text[start:end], end)
+            elif start < len(self.text):
+                raise ExpressionError("Unexpected input", self.text, self.pos)
+            else:
+                self.peeked = (None, None, len(self.text))
+        return self.peeked
+
+    def take(self):
+        token = self.peek()
+        self.pos = token[2]
+        self.peeked = None
+        return token
+
+    def expect(self, value):
+        kind, text, _ = self.take()
+        if text != value:
+            raise ExpressionError(f"Expected {value!r}", self.text, self.pos)
+
+    def expression(self, level=0):
+        if level == len(PRECEDENCE):
+            return self.unary()
+        left = self.expression(level + 1)
+        while True:
+            kind, text, _ = self.peek()
+            if kind not in ("op", "word") or _LEVEL.get(text) != level:
+                return left
+            self.take()
+            left = Binary(text, left, self.expression(level + 1))
+
+    def unary(self):
+        kind, text, _ = self.peek()
+        if (kind, text) in (("op", "-"), ("word", "not")):
+            self.take()
+            return Unary(text, self.unary())
+        return self.operand()
+
+    def operand(self):
+        start = self.pos
+        kind, text, _ = self.take()
+        if kind == "number":
+            return Number(parse_number(text), text)
+        if kind == "string":
+            return String(_unquote(text))
+        if kind == "ref":
+            return FunctionRef(text[1:-1])
+        if kind == "macro":
+            return Macro(text)
+        if kind == "name":
+            return Call(text, self.arguments())
+        if text == "(":
+            node = self.expression()
+            self.expect(")")
+            return node
+        raise ExpressionError("Unexpected token" if kind else "Unexpected end", self.text, start)
+
+    def arguments(self):
+        args = []
+        self.skip_spaces()
+        if self.text.startswith(")", self.pos):
+            self.pos += 1
+            return args
+        history = self.text.startswith("/", self.pos)
+        while True:
+            self.skip_spaces()
+            if not args and history:
+                args.append(self.query())
+            elif history:
+                args.append(self.parameter())
+            else:
+                args.append(self.expression())
+            self.skip_spaces()
+            if self.pos >= len(self.text):
+                raise ExpressionError("Unterminated function call", self.text, self.pos)
+            char = self.text[self.pos]
+            self.pos += 1
+            if char == ")":
+                return args
+            if char != ",":
+                raise ExpressionError("Expected ',' or ')'", self.text, self.pos - 1)
+
+    def parameter(self):
+        # History function parameters: quoted string or raw text (5m, #3, 1h:now/h, ...)
+        if self.text.startswith('"', self.pos):
+            end = self.quoted(self.pos)
+            value = String(_unquote(self.text[self.pos:end]))
+            self.pos = end
+            return value
+        end = self.pos
+        while end < len(self.text) and self.text[end] not in ",)":
+            end += 1
+        value = self.text[self.pos:end].strip()
+        self.pos = end
+        return Param(value)
+
+    def query(self):
+        # /host/key[params]?[filter]
+        text = self.text
+        self.pos += 1
+        slash = text.find("/", self.pos)
+        if slash < 0:
+            raise ExpressionError("Item query without key", text, self.pos)
+        host = text[self.pos:slash]
+        self.pos = slash + 1
+        match = _KEY_NAME.match(text, self.pos)
+        if match is None:
+            raise ExpressionError("Invalid item key", text, self.pos)
+        end = match.end()
+        if text.startswith("[", end):
+            end = self.brackets(end)
+        key = text[self.pos:end]
+        query_filter = None
+        if text.startswith("?[", end):
+            filter_end = self.brackets(end + 1)
+            query_filter = text[end + 2:filter_end - 1]
+            end = filter_end
+        self.pos = end
+        return Query(host, key, query_filter)
+
+    def brackets(self, start):
+        # Index after the bracket matching text[start] == "[", skipping quoted strings
+        depth, pos, text = 0, start, self.text
+        while pos < len(text):
+            char = text[pos]
+            if char == '"':
+                pos = self.quoted(pos)
+                continue
+            if char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+                if depth == 0:
+                    return pos + 1
+            pos += 1
+        raise ExpressionError("Unbalanced brackets", text, start)
+
+    def macro(self, start):
+        # Index after the macro starting with the brace at text[start]; braces
+        # nest ({$M:{#LLD}}, {{ITEM.VALUE}.regsub(...)}) and quoted contexts
+        # may hold any character
+        depth, pos, text = 0, start, self.text
+        while pos < len(text):
+            char = text[pos]
+            if char == '"' and depth:
+                pos = self.quoted(pos)
+                continue
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return pos + 1
+            pos += 1
+        raise ExpressionError("Unterminated macro", text, start)
+
+    def quoted(self, start):
+        # Index after the string starting with the quote at text[start]
+        pos, text = start + 1, self.text
+        while pos < len(text):
+            if text[pos] == "\\":
+                pos += 2
+                continue
+            if text[pos] == '"':
+                return pos + 1
+            pos += 1
+        raise ExpressionError("Unterminated string", text, start)
+
+    def skip_spaces(self):
+        # Hand-scanning starts at self.pos, so a token peeked beyond it is void
+        self.peeked = None
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+
+def parse(expression):
+    """
+    Parse a trigger or calculated item expression into a syntax tree.
+
+    Args:
+        expression (str): Expression in the Zabbix 5.4+ syntax, either
+            expanded (last(/host/key)) or as returned by trigger.get ({functionid}).
+
+    Returns:
+        Number, String, Macro, FunctionRef, Call, Unary or Binary namedtuple.
+        Calls of history functions have a Query as first argument and Param
+        or String nodes as the other arguments.
+
+    Raises:
+        ExpressionError: If the expression is not valid.
+
+    Example:
+        >>> parse("last(/web01/agent.ping)=0 or nodata(/web01/agent.ping,5m)=1")
+        Binary(op='or', left=Binary(op='=', left=Call(name='last', args=[Query(host='web01', ...
+        >>> parse('min(/h/vfs.fs.size[{#FSNAME},pused],5m)>{$LIMIT:"{#FSNAME}"}').right
+        Macro(text='{$LIMIT:"{#FSNAME}"}')
+    """
+    parser = _Parser(expression)
+    tree = parser.expression()
+    kind, text, _ = parser.peek()
+    if kind is not None:
+        raise ExpressionError("Unexpected token", expression, parser.pos)
+    return tree
+
+
+def walk(node):
+    """
+    Yield every node of a syntax tree, depth first.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, Call):
+            stack.extend(reversed(node.args))
+        elif isinstance(node, Binary):
+            stack.extend((node.right, node.left))
+        elif isinstance(node, Unary):
+            stack.append(node.operand)
+
+
+def history_calls(node):
+    """
+    Return the calls of history functions (those with an item query) in a syntax tree.
+    """
+    return [call for call in walk(node) if isinstance(call, Call) and call.args and isinstance(call.args[0], Query)]
+
+
+def references(expression):
+    """
+    Return (function, host, key) of every item reference in an expression.
+
+    Example:
+        >>> references("avg(/web01/system.cpu.util[,idle],5m)<10")
+        [('avg', 'web01', 'system.cpu.util[,idle]')]
+    """
+    return [(call.name, call.args[0].host, call.args[0].key) for call in history_calls(parse(expression))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that trigger expressions parse.")
+    parser.add_argument("files", nargs="*", help="Files with one expression per line (default: the stock samples)")
+    args = parser.parse_args(argv)
+
+    expressions = list(STOCK_EXPRESSIONS)
+    if args.files:
+        expressions = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as file:
+                expressions += [line.strip() for line in file if line.strip()]
+    failed = 0
+    for expression in expressions:
+        try:
+            parse(expression)
+        except ExpressionError as error:
+            failed += 1
+            print(error, file=sys.stderr)
+    print(f"{len(expressions) - failed} of {len(expressions)} expressions parsed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
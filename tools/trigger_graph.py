@@ -0,0 +1,237 @@
+# tools/trigger_graph.py
+
+# Trigger dependencies as a dependency graph
+# Triggers are fetched with selectDependencies in parallel pages of hosts;
+# a trigger "requires" the triggers it depends on, i.e. it is suppressed
+# while one of them is in the problem state. Only triggers that take part
+# in a dependency become graph nodes, so 200k triggers with a few thousand
+# dependencies cost a few thousand adjacency sets. The graph can be kept in
+# a JSON file; reopening it reads the audit log since the last refresh and
+# re-fetches only the triggers that were changed, plus the triggers of the
+# hosts and templates that were changed or deleted (linking, unlinking and
+# deleting them creates and removes triggers without a trigger record).
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+    from .checkpoint import Checkpoint
+    from .dependency import DependencyGraph
+    from .harvester import Harvester
+except ImportError:
+    from base import chunked, unwrap
+    from tools.checkpoint import Checkpoint
+    from tools.dependency import DependencyGraph
+    from tools.harvester import Harvester
+
+
+# Audit log resource types of triggers and of their owners
+RESOURCE_TRIGGER = "13"
+RESOURCE_HOST = "4"
+RESOURCE_TEMPLATE = "30"
+
+
+class TriggerGraph(DependencyGraph):
+    """
+    Trigger dependencies of all hosts, with suppression and root-cause queries.
+
+    Args:
+        client (ZabbixClient): Client used for host.get, trigger.get and auditlog.get.
+        path (str, optional): JSON file the graph is cached in between runs.
+        chunk_size (int, optional): Hosts per trigger.get request when loading;
+            triggers per request when refreshing.
+        workers (int, optional): Concurrent trigger.get requests.
+        overlap (int, optional): Seconds of audit log re-read on every refresh.
+
+    Attributes:
+        triggers (dict): Description per trigger ID (all triggers, not only graph nodes).
+        hosts (dict): Host IDs per trigger ID, to find the triggers of a changed host.
+
+    Example:
+        >>> graph = zapi.triggers.dependency_graph(path="trigger-deps.json")
+        >>> graph.suppressed_by("17085")       # what a problem of 17085 suppresses
+        {'17090', '17112'}
+        >>> graph.root_causes(firing_triggerids)
+        {'17085'}
+        >>> graph.cycles()
+        []
+    """
+
+    def __init__(self, client, path=None, chunk_size=500, workers=4, overlap=60):
+        super().__init__()
+        self._client = client
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.overlap = overlap
+        self.triggers = {}
+        self.hosts = {}
+        self.clock = None
+        self._state = Checkpoint(path)
+        self._suppressed = {}
+
+    def load(self, **filters):
+        """
+        Fetch every trigger of the hosts matching `filters` (host.get parameters)
+        with its dependencies, replacing the current graph.
+
+        Returns:
+            TriggerGraph: self.
+        """
+        started = int(time.time())
+        hosts = unwrap("host.get", self._client.host.get(output=["hostid"], **filters))
+        self._reset()
+        pages = [{"hostids": chunk} for chunk in chunked(sorted(host["hostid"] for host in hosts), self.chunk_size)]
+        for trigger in self._fetch(pages):
+            self._set(trigger)
+        self.clock = started
+        self.save()
+        return self
+
+    def open(self):
+        """
+        Load the graph from its file and refresh it, or load it from the API
+        if there is no file yet.
+
+        Returns:
+            TriggerGraph: self.
+        """
+        if self._state.get("clock") is None or self._state.get("hosts") is None:
+            return self.load()
+        self._reset()
+        self.triggers = self._state.get("triggers")
+        self.hosts = self._state.get("hosts")
+        for triggerid, requires in self._state.get("dependencies").items():
+            self.add(triggerid, requires)
+        self.clock = self._state.get("clock")
+        self.refresh()
+        return self
+
+    def refresh(self):
+        """
+        Re-fetch the triggers changed since the last load/refresh, according to
+        the audit log, and the triggers of the hosts and templates changed or
+        deleted since then.
+
+        Returns:
+            int: Number of changed triggers.
+        """
+        started = int(time.time())
+        changed, owners, templates = set(), set(), set()
+
+        def collect(records):
+            for record in records:
+                resourcetype = str(record["resourcetype"])
+                if resourcetype == RESOURCE_TRIGGER:
+                    changed.add(record["resourceid"])
+                else:
+                    owners.add(record["resourceid"])
+                    if resourcetype == RESOURCE_TEMPLATE:
+                        templates.add(record["resourceid"])
+
+        harvester = Harvester(
+            self._client.auditlogs, "auditid", checkpoint=Checkpoint(), start=self.clock - self.overlap,
+            output=["auditid", "clock", "resourcetype", "resourceid"],
+            filter={"resourcetype": [RESOURCE_TRIGGER, RESOURCE_HOST, RESOURCE_TEMPLATE]},
+        )
+        harvester.run_once(collect)
+        if templates:
+            # Hosts still linked to a changed template inherit its triggers
+            hosts = unwrap("host.get", self._client.host.get(output=["hostid"], templateids=sorted(templates)))
+            owners.update(host["hostid"] for host in hosts)
+        # Triggers of these owners that are not returned any more were
+        # deleted along with the host or by unlinking a template
+        changed.update(triggerid for triggerid, hostids in self.hosts.items() if owners.intersection(hostids))
+        if changed or owners:
+            pages = [{"triggerids": chunk} for chunk in chunked(sorted(changed), self.chunk_size)]
+            pages += [{"hostids": chunk} for chunk in chunked(sorted(owners), self.chunk_size)]
+            found = set()
+            for trigger in self._fetch(pages):
+                found.add(trigger["triggerid"])
+                self._set(trigger)
+            changed |= found
+            for triggerid in changed - found:  # deleted
+                self.triggers.pop(triggerid, None)
+                self.hosts.pop(triggerid, None)
+                self.remove(triggerid)
+            self._suppressed.clear()
+        self.clock = started
+        self.save()
+        return len(changed)
+
+    def roots(self):
+        """
+        Return the triggers other triggers depend on that depend on nothing
+        themselves: the top of every dependency chain.
+        """
+        return {triggerid for triggerid in self if not self.requires(triggerid) and self.required_by(triggerid)}
+
+    def root_causes(self, firing):
+        """
+        Return the firing triggers that are not suppressed by another firing trigger.
+
+        Args:
+            firing (iterable): IDs of the triggers currently in the problem state.
+        """
+        firing = {str(triggerid) for triggerid in firing}
+        return firing - self.suppressed(firing)
+
+    def save(self):
+        """
+        Write the graph to its file (no-op without a path).
+        """
+        self._state.set("triggers", self.triggers)
+        self._state.set("hosts", self.hosts)
+        self._state.set("dependencies", {triggerid: sorted(self.requires(triggerid)) for triggerid in self if self.requires(triggerid)})
+        self._state.set("clock", self.clock, save=True)
+
+    def suppressed(self, firing):
+        """
+        Return the triggers suppressed while the `firing` triggers are in the problem state.
+        """
+        suppressed = set()
+        for triggerid in firing:
+            suppressed |= self.suppressed_by(triggerid)
+        return suppressed
+
+    def suppressed_by(self, triggerid):
+        """
+        Return the IDs of the triggers that depend on `triggerid`, directly or
+        transitively, i.e. those suppressed while it is in the problem state.
+        """
+        triggerid = str(triggerid)
+        cached = self._suppressed.get(triggerid)
+        if cached is None:
+            cached = self._suppressed[triggerid] = frozenset(self.dependents(triggerid))
+        return set(cached)
+
+    def _fetch(self, pages):
+        params = {"output": ["triggerid", "description"], "selectDependencies": ["triggerid"], "selectHosts": ["hostid"]}
+
+        def fetch(page):
+            return unwrap("trigger.get", self._client.triggers.get(**params, **page))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for triggers in pool.map(fetch, pages):
+                yield from triggers
+
+    def _reset(self):
+        self._requires.clear()
+        self._required_by.clear()
+        self.triggers = {}
+        self.hosts = {}
+        self._suppressed.clear()
+
+    def _set(self, trigger):
+        triggerid = trigger["triggerid"]
+        self.triggers[triggerid] = trigger["description"]
+        self.hosts[triggerid] = [host["hostid"] for host in trigger.get("hosts", [])]
+        requires = [dependency["triggerid"] for dependency in trigger.get("dependencies", [])]
+        if not requires and triggerid not in self:
+            return
+        previous = self.requires(triggerid)
+        self.replace(triggerid, requires)
+        # Keep only triggers that still take part in a dependency
+        for other in previous | {triggerid}:
+            if not self.requires(other) and not self.required_by(other):
+                self.remove(other)
@@ -0,0 +1,197 @@
+# tools/trigger_index.py
+
+# Index of which triggers use which items and functions
+# trigger.get and triggerprototype.get can return the functions of every
+# trigger with the item each one reads (selectFunctions) and those items'
+# keys (selectItems), so the server has already resolved the expressions
+# and nothing needs to be parsed here. Triggers are fetched in parallel
+# pages of hosts/templates and stored in flat dicts keyed by ID, with
+# reverse maps item -> functions, key -> items, function name -> triggers
+# and host -> triggers for constant-time lookups and incremental reloads.
+
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..base import chunked, unwrap
+except ImportError:
+    from base import chunked, unwrap
+
+
+TriggerFunction = namedtuple("TriggerFunction", ["functionid", "triggerid", "itemid", "function", "parameter"])
+
+TRIGGER_OUTPUT = ["triggerid", "description", "priority", "status"]
+FUNCTION_OUTPUT = ["functionid", "itemid", "function", "parameter"]
+ITEM_OUTPUT = ["itemid", "hostid", "key_"]
+
+
+class TriggerIndex:
+    """
+    In-memory index of triggers (and trigger prototypes), their functions and items.
+
+    Args:
+        client (ZabbixClient): Client used for host.get, trigger.get and triggerprototype.get.
+        prototypes (bool, optional): Also index trigger prototypes.
+        chunk_size (int, optional): Hosts/templates per trigger.get request.
+        workers (int, optional): Concurrent trigger.get requests.
+
+    Attributes:
+        triggers (dict): (description, priority, status, is_prototype) per trigger ID.
+        functions (dict): TriggerFunction per function ID.
+        items (dict): (hostid, key_) per item ID.
+        host_names (dict): Technical name per host/template ID.
+
+    Example:
+        >>> index = zapi.triggers.index()
+        >>> index.triggers_for_items(["23664", "23665"])
+        {'17085', '17086'}
+        >>> index.triggers_for_key("vfs.fs.size[/,pused]", host="web01")
+        {'17512'}
+    """
+
+    def __init__(self, client, prototypes=True, chunk_size=500, workers=4):
+        self._client = client
+        self.prototypes = prototypes
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.triggers = {}
+        self.functions = {}
+        self.items = {}
+        self.host_names = {}
+        self._item_functions = {}   # itemid -> [functionid]
+        self._key_items = {}        # key_ -> {itemid}
+        self._function_triggers = {}  # function name -> {triggerid}
+        self._host_triggers = {}    # hostid -> {triggerid}
+        self._trigger_functions = {}  # triggerid -> [functionid]
+
+    def load(self, **filters):
+        """
+        Index the triggers of all hosts and templates matching `filters` (host.get parameters).
+
+        Returns:
+            TriggerIndex: self.
+        """
+        hosts = unwrap("host.get", self._client.host.get(output=["hostid", "host"], templated_hosts=True, **filters))
+        self.host_names = {host["hostid"]: host["host"] for host in hosts}
+        self._fetch(sorted(self.host_names))
+        return self
+
+    def functions_for_items(self, itemids):
+        """
+        Return the TriggerFunction entries reading any of `itemids`.
+        """
+        return [
+            self.functions[functionid]
+            for itemid in self._ids(itemids) for functionid in self._item_functions.get(itemid, ())
+        ]
+
+    def impact(self, itemids):
+        """
+        Return {triggerid: [TriggerFunction, ...]} of the triggers that read any
+        of `itemids`, e.g. the triggers an item deletion would remove.
+        """
+        impact = {}
+        for function in self.functions_for_items(itemids):
+            impact.setdefault(function.triggerid, []).append(function)
+        return impact
+
+    def items_of(self, triggerid):
+        """
+        Return the IDs of the items a trigger reads.
+        """
+        return {self.functions[functionid].itemid for functionid in self._trigger_functions.get(str(triggerid), ())}
+
+    def reload(self, hostids):
+        """
+        Re-fetch the triggers of some hosts/templates, e.g. after they were changed.
+        """
+        hostids = self._ids(hostids)
+        hosts = unwrap("host.get", self._client.host.get(output=["hostid", "host"], templated_hosts=True, hostids=hostids))
+        self.host_names.update((host["hostid"], host["host"]) for host in hosts)
+        for hostid in hostids:
+            for triggerid in self._host_triggers.pop(hostid, set()):
+                self._remove(triggerid)
+        self._fetch(sorted(hostids))
+
+    def triggers_for_items(self, itemids):
+        """
+        Return the IDs of the triggers reading any of `itemids`.
+        """
+        return {function.triggerid for function in self.functions_for_items(itemids)}
+
+    def triggers_for_key(self, key, host=None):
+        """
+        Return the IDs of the triggers reading items with item key `key`,
+        optionally only on the host/template named `host`.
+        """
+        itemids = self._key_items.get(key, set())
+        if host is not None:
+            itemids = {itemid for itemid in itemids if self.host_names.get(self.items[itemid][0]) == host}
+        return self.triggers_for_items(itemids)
+
+    def triggers_using(self, function):
+        """
+        Return the IDs of the triggers calling a function (e.g. "nodata").
+        """
+        return set(self._function_triggers.get(function, ()))
+
+    def _add(self, trigger, prototype):
+        triggerid = trigger["triggerid"]
+        if triggerid in self.triggers:
+            # Triggers reading several hosts come back once per host page
+            return
+        self.triggers[triggerid] = (trigger["description"], trigger.get("priority"), trigger.get("status"), prototype)
+        for item in trigger.get("items", []):
+            key = sys.intern(item["key_"])
+            self.items[item["itemid"]] = (item["hostid"], key)
+            self._key_items.setdefault(key, set()).add(item["itemid"])
+            self._host_triggers.setdefault(item["hostid"], set()).add(triggerid)
+        functionids = []
+        for function in trigger.get("functions", []):
+            name = sys.intern(function["function"])
+            entry = TriggerFunction(function["functionid"], triggerid, function["itemid"], name, function["parameter"])
+            self.functions[entry.functionid] = entry
+            self._item_functions.setdefault(entry.itemid, []).append(entry.functionid)
+            self._function_triggers.setdefault(name, set()).add(triggerid)
+            functionids.append(entry.functionid)
+        self._trigger_functions[triggerid] = functionids
+
+    def _fetch(self, hostids):
+        params = {"output": TRIGGER_OUTPUT, "selectFunctions": FUNCTION_OUTPUT, "selectItems": ITEM_OUTPUT}
+        pages = [(self._client.triggers, "trigger.get", False, chunk) for chunk in chunked(hostids, self.chunk_size)]
+        if self.prototypes:
+            pages += [
+                (self._client.trigger_prototype, "triggerprototype.get", True, chunk)
+                for chunk in chunked(hostids, self.chunk_size)
+            ]
+
+        def fetch(page):
+            resource, method, prototype, chunk = page
+            return prototype, unwrap(method, resource.get(hostids=chunk, **params))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Results are indexed on this thread as pages arrive
+            for prototype, triggers in pool.map(fetch, pages):
+                for trigger in triggers:
+                    self._add(trigger, prototype)
+
+    def _ids(self, ids):
+        return [str(ids)] if isinstance(ids, (str, int)) else [str(objectid) for objectid in ids]
+
+    def _remove(self, triggerid):
+        if self.triggers.pop(triggerid, None) is None:
+            return
+        for functionid in self._trigger_functions.pop(triggerid, ()):
+            function = self.functions.pop(functionid)
+            self._function_triggers.get(function.function, set()).discard(triggerid)
+            functionids = self._item_functions.get(function.itemid, [])
+            if functionid in functionids:
+                functionids.remove(functionid)
+            hostid, key = self.items.get(function.itemid, (None, None))
+            self._host_triggers.get(hostid, set()).discard(triggerid)
+            if not functionids:
+                # No other trigger reads the item any more
+                self._item_functions.pop(function.itemid, None)
+                self.items.pop(function.itemid, None)
+                self._key_items.get(key, set()).discard(function.itemid)
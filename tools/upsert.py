@@ -0,0 +1,197 @@
+# tools/upsert.py
+
+# Idempotent create-or-update of hosts, items, triggers and user macros
+# Objects are matched to existing ones by their natural key (host name,
+# host + item key, host + trigger name, host + macro, global macro name).
+# Existence of the whole batch is resolved with one get() per lookup chunk
+# asking only for the ID and key properties; the objects are then split
+# into one batched create and one batched update, sent through the bulk
+# executor. A sync of 10k objects costs a few requests instead of 20k.
+
+import re
+
+try:
+    from ..base import chunked, unwrap
+except ImportError:
+    from base import chunked, unwrap
+
+
+# First host referenced by a trigger expression: last(/host/key)
+EXPRESSION_HOST = re.compile(r"\(/([^/]+)/")
+
+
+def _host_key(obj):
+    return obj["host"]
+
+
+def _item_key(obj):
+    return (str(obj["hostid"]), obj["key_"])
+
+
+def _trigger_key(obj):
+    match = EXPRESSION_HOST.search(obj.get("expression", ""))
+    if match is None:
+        raise ValueError(f"Cannot tell the host of trigger {obj.get('description')!r} from its expression")
+    return (match.group(1), obj["description"])
+
+
+def _macro_key(obj):
+    return (str(obj["hostid"]), obj["macro"])
+
+
+def _global_macro_key(obj):
+    return obj["macro"]
+
+
+def _lookup_hosts(resource, keys):
+    hosts = unwrap("host.get", resource.get(output=["hostid", "host"], filter={"host": keys}))
+    return {host["host"]: host["hostid"] for host in hosts}
+
+
+def _lookup_items(resource, keys):
+    items = unwrap("item.get", resource.get(
+        output=["itemid", "hostid", "key_"],
+        hostids=sorted({hostid for hostid, _ in keys}),
+        filter={"key_": sorted({key for _, key in keys})},
+    ))
+    return {(item["hostid"], item["key_"]): item["itemid"] for item in items}
+
+
+def _lookup_triggers(resource, keys):
+    triggers = unwrap("trigger.get", resource.get(
+        output=["triggerid", "description"],
+        selectHosts=["host"],
+        filter={"description": sorted({description for _, description in keys}), "host": sorted({host for host, _ in keys})},
+    ))
+    return {
+        (host["host"], trigger["description"]): trigger["triggerid"]
+        for trigger in triggers for host in trigger.get("hosts", [])
+    }
+
+
+def _lookup_macros(resource, keys):
+    macros = unwrap("usermacro.get", resource.get(
+        output=["hostmacroid", "hostid", "macro"],
+        hostids=sorted({hostid for hostid, _ in keys}),
+        filter={"macro": sorted({macro for _, macro in keys})},
+    ))
+    return {(macro["hostid"], macro["macro"]): macro["hostmacroid"] for macro in macros}
+
+
+def _lookup_global_macros(resource, keys):
+    macros = unwrap("usermacro.get", resource.get(
+        output=["globalmacroid", "macro"], globalmacro=True, filter={"macro": keys},
+    ))
+    return {macro["macro"]: macro["globalmacroid"] for macro in macros}
+
+
+# Per kind: natural key, lookup, ID property, create/update actions and the
+# properties that identify the owner and cannot be sent to update
+UPSERT_KINDS = {
+    "host": {"key": _host_key, "lookup": _lookup_hosts, "id": "hostid",
+             "create": "create", "update": "update", "fixed": ()},
+    "item": {"key": _item_key, "lookup": _lookup_items, "id": "itemid",
+             "create": "create", "update": "update", "fixed": ("hostid",)},
+    "trigger": {"key": _trigger_key, "lookup": _lookup_triggers, "id": "triggerid",
+                "create": "create", "update": "update", "fixed": ()},
+    "macro": {"key": _macro_key, "lookup": _lookup_macros, "id": "hostmacroid",
+              "create": "create", "update": "update", "fixed": ("hostid",)},
+    "global_macro": {"key": _global_macro_key, "lookup": _lookup_global_macros, "id": "globalmacroid",
+                     "create": "createglobal", "update": "updateglobal", "fixed": ()},
+}
+
+
+class UpsertResult:
+    """
+    Outcome of an upsert.
+
+    Attributes:
+        ids (list): ID of each input object in input order (existing or
+            newly created); None where the write failed.
+        created (list): Input indexes of the objects that were created.
+        updated (list): Input indexes of the objects that were updated.
+        failures (list): BulkFailure(index, element, error), index into the input.
+        requests (int): Number of API requests made, lookups included.
+    """
+
+    def __init__(self, count):
+        self.ids = [None] * count
+        self.created = []
+        self.updated = []
+        self.failures = []
+        self.requests = 0
+
+    @property
+    def ok(self):
+        return not self.failures
+
+    def __repr__(self):
+        return (f"UpsertResult(created={len(self.created)}, updated={len(self.updated)}, "
+                f"failures={len(self.failures)}, requests={self.requests})")
+
+
+def upsert(resource, kind, objects, lookup_size=5000, **options):
+    """
+    Create the objects that do not exist yet and update the others.
+
+    Args:
+        resource (ZabbixBase): Resource to write to (zapi.host, zapi.items, ...).
+        kind (str): Key of UPSERT_KINDS.
+        objects (list): Objects as taken by create(); hosts, items and macros
+            may name their host by ID or by name.
+        lookup_size (int, optional): Keys per existence lookup get().
+        **options: BulkExecutor options for the create and update calls
+            (chunk_size, workers, target_latency, ...).
+
+    Returns:
+        UpsertResult
+    """
+    spec = UPSERT_KINDS[kind]
+    objects = list(objects)
+    resolver = getattr(resource._client, "resolver", None)
+    if resolver is not None:
+        # Host names in hostid are resolved once for the whole batch
+        method = f"{resource.API_METHOD}.{spec['create']}"
+        objects = [resolver.translate(method, obj)[0] for obj in objects]
+
+    result = UpsertResult(len(objects))
+    keys = [spec["key"](obj) for obj in objects]
+    existing = {}
+    for chunk in chunked(sorted(set(keys), key=str), lookup_size):
+        existing.update(spec["lookup"](resource, chunk))
+        result.requests += 1
+
+    creates, updates = [], []
+    for index, (obj, key) in enumerate(zip(objects, keys)):
+        objectid = existing.get(key)
+        if objectid is None:
+            creates.append(index)
+        else:
+            result.ids[index] = objectid
+            updates.append(index)
+
+    executor = resource._bulk(**options)
+    for indexes, action, build in (
+        (creates, spec["create"], lambda obj, objectid: obj),
+        (updates, spec["update"], lambda obj, objectid: {
+            **{field: value for field, value in obj.items() if field not in spec["fixed"]}, spec["id"]: objectid,
+        }),
+    ):
+        if not indexes:
+            continue
+        elements = [build(objects[index], result.ids[index]) for index in indexes]
+        written = executor.run(action, elements)
+        result.requests += written.requests
+        failed = set()
+        for failure in written.failures:
+            index = indexes[failure.index]
+            failed.add(index)
+            result.failures.append(failure._replace(index=index, element=objects[index]))
+        for position, index in enumerate(indexes):
+            if index in failed:
+                result.ids[index] = None
+            else:
+                result.ids[index] = written.ids[position] or result.ids[index]
+                (result.created if action == spec["create"] else result.updated).append(index)
+    result.failures.sort(key=lambda failure: failure.index)
+    return result